@@ -49,6 +49,66 @@ app.add_middleware(
     allow_headers=["*"],  # 允许所有请求头
 )
 
+# 请求级工作单元：每个请求共用一个数据库会话，请求结束时统一提交一次，
+# 提交成功后再批量执行缓存失效
+import json
+from fastapi.responses import JSONResponse, Response
+from starlette.concurrency import run_in_threadpool
+from app.extensions import begin_request_scope, end_request_scope
+
+async def _read_envelope_code(response):
+    """
+    读取JSON响应体中的业务状态码，路由常以HTTP 200返回 {"code": 4xx/5xx} 表示失败
+    读取后响应体已被消费，返回重新构造的响应
+    :param response: call_next返回的响应
+    :return: (业务状态码，非JSON或没有code时为None, 可返回的响应)
+    """
+    if not (response.headers.get('content-type') or '').startswith('application/json'):
+        return None, response
+    body = b''.join([chunk async for chunk in response.body_iterator])
+    buffered = Response(content=body, status_code=response.status_code, background=response.background)
+    buffered.raw_headers = response.raw_headers
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return None, buffered
+    code = payload.get('code') if isinstance(payload, dict) else None
+    return (code if isinstance(code, int) else None), buffered
+
+@app.middleware("http")
+async def request_scope_middleware(request: Request, call_next):
+    scope, token = begin_request_scope()
+    try:
+        try:
+            response = await call_next(request)
+        except Exception:
+            await run_in_threadpool(scope.rollback)
+            raise
+        if scope.db is None:
+            return response
+        # 没有commit过的修改不提交，与不共用会话时关闭会话的行为一致
+        if not scope.has_writes:
+            await run_in_threadpool(scope.rollback)
+            return response
+        # 请求失败时不提交本次请求的修改，HTTP状态码和响应体中的业务状态码任一表示失败即回滚
+        code, response = await _read_envelope_code(response)
+        if response.status_code >= 400 or (code is not None and code >= 400):
+            await run_in_threadpool(scope.rollback)
+            return response
+        try:
+            await run_in_threadpool(scope.commit)
+        except Exception as e:
+            logging.getLogger(__name__).error(f"提交请求事务失败: {str(e)}", exc_info=True)
+            return JSONResponse(status_code=500, content={"code": 500, "message": f"提交事务失败: {str(e)}", "data": None})
+        return response
+    finally:
+        await run_in_threadpool(scope.close)
+        end_request_scope(token)
+
+# 按Accept-Encoding压缩JSON和SVG响应，预压缩的SVG不再重复压缩
+from app.core.compression import CompressionMiddleware
+app.add_middleware(CompressionMiddleware)
+
 # 配置静态文件和模板
 app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
@@ -76,6 +136,18 @@ except Exception as e:
     print(f"Redis初始化失败，将继续运行应用: {str(e)}")
     redis_client = None
 
+# 每个worker进程启动时订阅缓存失效通知，启用进程内一级缓存
+from app.utils.redis_utils import RedisUtils
+
+@app.on_event("startup")
+def start_cache_invalidation_listener():
+    if RedisUtils.start_invalidation_listener(redis_client):
+        print("Cache invalidation listener started")
+
+@app.on_event("shutdown")
+def stop_cache_invalidation_listener():
+    RedisUtils.stop_invalidation_listener()
+
 # 导入并配置日志
 from app.core.logging_config import setup_logging, uvicorn_log_config
 setup_logging()
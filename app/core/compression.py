@@ -0,0 +1,194 @@
+# 响应压缩
+# 按Accept-Encoding协商gzip/brotli，压缩超过阈值的JSON和SVG响应
+# 图片渲染时预先生成的SVG压缩版本直接返回，不在请求中重复压缩
+
+import gzip
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+try:
+    import brotli
+except ImportError:  # 未安装brotli时只使用gzip
+    brotli = None
+
+
+# 小于该字节数的响应不压缩，压缩收益抵不过CPU开销和头部开销
+COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE') or 1024)
+
+# 不小于该字节数的响应在线程池中压缩，避免大响应的压缩阻塞事件循环；更小的响应直接压缩，省去线程切换
+COMPRESS_THREADPOOL_MIN_SIZE = int(os.environ.get('COMPRESS_THREADPOOL_MIN_SIZE') or 32 * 1024)
+
+# 请求中实时压缩使用较快的级别，渲染时预压缩使用最高级别
+GZIP_LEVEL = int(os.environ.get('COMPRESS_GZIP_LEVEL') or 6)
+BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY') or 4)
+PRECOMPRESS_GZIP_LEVEL = 9
+PRECOMPRESS_BROTLI_QUALITY = 11
+
+# 需要压缩的响应类型，PNG等已压缩格式不再压缩
+COMPRESSIBLE_TYPES = ('application/json', 'image/svg+xml')
+
+# 不带响应体的状态码，原样转发，保留路由设置的Content-Length
+BODILESS_STATUS_CODES = (204, 304)
+
+
+def supported_encodings() -> Tuple[str, ...]:
+    """
+    获取当前环境支持的压缩编码，按优先级排列
+    :return: 编码名称元组
+    """
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def compress(data: bytes, encoding: str, precompress: bool = False) -> bytes:
+    """
+    压缩数据
+    :param data: 原始数据
+    :param encoding: 压缩编码（br或gzip）
+    :param precompress: 是否为渲染时预压缩，预压缩使用最高压缩级别
+    :return: 压缩后的数据
+    """
+    if encoding == 'br':
+        return brotli.compress(data, quality=PRECOMPRESS_BROTLI_QUALITY if precompress else BROTLI_QUALITY)
+    # mtime固定为0，相同内容的压缩结果相同
+    return gzip.compress(data, compresslevel=PRECOMPRESS_GZIP_LEVEL if precompress else GZIP_LEVEL, mtime=0)
+
+
+def precompress_variants(data: bytes) -> Dict[str, Optional[bytes]]:
+    """
+    生成数据的所有预压缩版本，供渲染完成后与原始内容一起保存
+    :param data: 原始数据
+    :return: {'gzip': gzip数据, 'br': brotli数据，未安装brotli时为None}
+    """
+    return {
+        'gzip': compress(data, 'gzip', precompress=True),
+        'br': compress(data, 'br', precompress=True) if brotli is not None else None
+    }
+
+
+def _parse_accept_encoding(header: str) -> Dict[str, float]:
+    """
+    解析Accept-Encoding头
+    :param header: Accept-Encoding头的值
+    :return: 编码名称 → q值
+    """
+    accepted = {}
+    for part in header.split(','):
+        token, _, params = part.partition(';')
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token] = q
+    return accepted
+
+
+def choose_encoding(accept_encoding: Optional[str], available: Iterable[str] = None) -> Optional[str]:
+    """
+    按Accept-Encoding选择压缩编码，q值相同时按available的顺序优先
+    :param accept_encoding: Accept-Encoding头的值
+    :param available: 可用的编码，按优先级排列，默认为当前环境支持的编码
+    :return: 选中的编码，客户端不接受任何可用编码时返回None
+    """
+    if not accept_encoding:
+        return None
+    accepted = _parse_accept_encoding(accept_encoding)
+    wildcard = accepted.get('*', 0.0)
+    best, best_q = None, 0.0
+    for encoding in (available if available is not None else supported_encodings()):
+        q = accepted.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def _header_value(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    """获取ASGI响应头的值，不存在返回None"""
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+class CompressionMiddleware:
+    """压缩JSON和SVG响应的ASGI中间件
+
+    JSON和SVG响应体都在内存中生成，收齐后整体压缩（内层的BaseHTTPMiddleware会把响应体拆成多段发送）；
+    其他类型的响应（如文件下载）、已带Content-Encoding的响应（如预压缩的SVG）以及HEAD请求和304等
+    不带响应体的响应原样转发。压缩后的强ETag改为弱ETag，与未压缩的表示区分
+    """
+
+    def __init__(self, app, minimum_size: int = None, threadpool_min_size: int = None):
+        self.app = app
+        self.minimum_size = COMPRESS_MIN_SIZE if minimum_size is None else minimum_size
+        self.threadpool_min_size = (
+            COMPRESS_THREADPOOL_MIN_SIZE if threadpool_min_size is None else threadpool_min_size
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope.get('method') == 'HEAD':
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = None
+        for key, value in scope.get('headers', ()):
+            if key == b'accept-encoding':
+                accept_encoding = value.decode('latin-1')
+                break
+        encoding = choose_encoding(accept_encoding)
+
+        start_message = None
+        chunks: List[bytes] = []
+
+        async def send_wrapper(message):
+            nonlocal start_message
+            if message['type'] == 'http.response.start':
+                headers = message.get('headers', [])
+                content_type = (_header_value(headers, b'content-type') or b'').decode('latin-1').lower()
+                if (message['status'] not in BODILESS_STATUS_CODES
+                        and _header_value(headers, b'content-encoding') is None
+                        and content_type.split(';', 1)[0].strip() in COMPRESSIBLE_TYPES):
+                    # 收齐响应体、确定是否压缩后再发送响应头
+                    start_message = message
+                    return
+                await send(message)
+                return
+
+            if message['type'] != 'http.response.body' or start_message is None:
+                await send(message)
+                return
+
+            chunks.append(message.get('body', b''))
+            if message.get('more_body', False):
+                return
+
+            start, start_message = start_message, None
+            body = b''.join(chunks)
+            chunks.clear()
+            headers = [(key, value) for key, value in start.get('headers', []) if key.lower() != b'content-length']
+            if len(body) >= self.minimum_size:
+                vary = _header_value(headers, b'vary') or b''
+                if b'accept-encoding' not in vary.lower():
+                    headers.append((b'vary', b'Accept-Encoding'))
+                if encoding is not None:
+                    if len(body) >= self.threadpool_min_size:
+                        body = await run_in_threadpool(compress, body, encoding)
+                    else:
+                        body = compress(body, encoding)
+                    headers.append((b'content-encoding', encoding.encode('latin-1')))
+                    headers = [
+                        (key, b'W/' + value if key.lower() == b'etag' and not value.startswith(b'W/') else value)
+                        for key, value in headers
+                    ]
+            headers.append((b'content-length', str(len(body)).encode('latin-1')))
+            await send(dict(start, headers=headers))
+            await send({'type': 'http.response.body', 'body': body, 'more_body': False})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,39 @@
+# 并发工具
+# 将阻塞的数据库和Redis调用放到有界线程池中执行，避免阻塞事件循环
+
+import os
+from functools import partial
+from typing import Any, Callable, Optional
+
+import anyio
+from anyio import CapacityLimiter
+
+
+# 公开接口阻塞调用的最大并发线程数，默认与数据库连接池大小一致，避免公开流量耗尽连接池
+PUBLIC_THREADPOOL_SIZE = int(os.environ.get('PUBLIC_THREADPOOL_SIZE') or 20)
+
+# 并发限制器需要在事件循环中创建，首次使用时初始化
+_public_limiter: Optional[CapacityLimiter] = None
+
+
+def get_public_limiter() -> CapacityLimiter:
+    """
+    获取公开接口使用的并发限制器
+    :return: 并发限制器
+    """
+    global _public_limiter
+    if _public_limiter is None:
+        _public_limiter = CapacityLimiter(PUBLIC_THREADPOOL_SIZE)
+    return _public_limiter
+
+
+async def run_blocking(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    在有界线程池中执行阻塞函数，供async路由调用同步的服务层
+    线程中可以读取当前请求的上下文变量（包括请求级工作单元）
+    :param func: 阻塞函数
+    :param args: 位置参数
+    :param kwargs: 关键字参数
+    :return: 函数的返回值
+    """
+    return await anyio.to_thread.run_sync(partial(func, *args, **kwargs), limiter=get_public_limiter())
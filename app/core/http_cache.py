@@ -0,0 +1,130 @@
+# HTTP缓存工具
+# 生成ETag/Last-Modified校验器，处理条件请求并返回304，按路由配置Cache-Control策略
+
+import hashlib
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional
+
+from fastapi import Request, Response
+
+
+# 各类路由的Cache-Control策略，可通过环境变量 HTTP_CACHE_CONTROL_<策略名大写> 覆盖
+# 默认要求每次重新验证，重复访问只需一次条件请求，未变化时返回不带内容的304
+CACHE_CONTROL_POLICIES = {
+    'catalog': os.environ.get('HTTP_CACHE_CONTROL_CATALOG') or 'public, no-cache',
+    'suggest': os.environ.get('HTTP_CACHE_CONTROL_SUGGEST') or 'public, max-age=30',
+    'image': os.environ.get('HTTP_CACHE_CONTROL_IMAGE') or 'public, no-cache',
+    # 带版本号的图片地址内容不会变化，浏览器和CDN可以缓存一年且无需重新验证
+    'image_immutable': os.environ.get('HTTP_CACHE_CONTROL_IMAGE_IMMUTABLE') or 'public, max-age=31536000, immutable',
+}
+
+
+def get_cache_control(policy: str) -> str:
+    """
+    获取路由的Cache-Control策略
+    :param policy: 策略名
+    :return: Cache-Control头的值
+    """
+    return CACHE_CONTROL_POLICIES.get(policy, 'no-cache')
+
+
+def make_etag(*parts: Any, weak: bool = False) -> str:
+    """
+    根据版本信息生成ETag
+    :param parts: 决定响应内容的版本信息，如表代数、数据版本号、请求参数
+    :param weak: 是否生成弱ETag（内容语义相同但字节可能不同时使用）
+    :return: 带引号的ETag
+    """
+    digest = hashlib.md5('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()[:20]
+    return f'W/"{digest}"' if weak else f'"{digest}"'
+
+
+def format_http_date(value: datetime) -> str:
+    """
+    格式化为HTTP日期，不带时区的时间按UTC处理（模型中的时间均为utcnow）
+    :param value: 时间
+    :return: HTTP日期字符串
+    """
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """
+    按弱比较判断If-None-Match是否命中
+    :param header: If-None-Match头的值
+    :param etag: 当前ETag
+    :return: 命中返回True
+    """
+    if header.strip() == '*':
+        return True
+    current = etag[2:] if etag.startswith('W/') else etag
+    for candidate in header.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == current:
+            return True
+    return False
+
+
+def is_not_modified(request: Request, etag: Optional[str] = None,
+                    last_modified: Optional[datetime] = None) -> bool:
+    """
+    判断条件请求是否可以返回304
+    同时存在If-None-Match时忽略If-Modified-Since
+    :param request: 请求对象
+    :param etag: 当前ETag
+    :param last_modified: 当前最后修改时间
+    :return: 客户端缓存仍然有效返回True
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        return etag is not None and _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get('if-modified-since')
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        modified = last_modified if last_modified.tzinfo else last_modified.replace(tzinfo=timezone.utc)
+        # HTTP日期精确到秒
+        return modified.replace(microsecond=0) <= since
+    return False
+
+
+def set_cache_headers(response: Response, policy: str, etag: Optional[str] = None,
+                      last_modified: Optional[datetime] = None) -> None:
+    """
+    为响应设置Cache-Control和校验器
+    :param response: 响应对象
+    :param policy: Cache-Control策略名
+    :param etag: ETag
+    :param last_modified: 最后修改时间
+    """
+    response.headers['Cache-Control'] = get_cache_control(policy)
+    if etag:
+        response.headers['ETag'] = etag
+    if last_modified is not None:
+        response.headers['Last-Modified'] = format_http_date(last_modified)
+
+
+def not_modified_response(policy: str, etag: Optional[str] = None,
+                          last_modified: Optional[datetime] = None) -> Response:
+    """
+    生成304响应，不包含响应体
+    :param policy: Cache-Control策略名
+    :param etag: ETag
+    :param last_modified: 最后修改时间
+    :return: 304响应
+    """
+    response = Response(status_code=304)
+    set_cache_headers(response, policy, etag, last_modified)
+    return response
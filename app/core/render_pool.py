@@ -0,0 +1,200 @@
+# 图片渲染进程池
+# PNG渲染是受GIL限制的PIL计算，放到进程池中执行，同一检测项目的各设备类型、不同检测项目可以在多个CPU核上并行渲染
+# 进程池由图片渲染worker在启动时创建并预热；未启动进程池的进程（如Web服务）在当前进程中依次渲染
+# 子进程由forkserver（不支持时用spawn）创建，不从已启动渲染线程和连接的worker进程fork，
+# 子进程异常退出后在运行中重建进程池也不会复制其他线程持有的锁
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# 创建日志记录器
+logger = logging.getLogger(__name__)
+
+
+# 进程池大小，默认与CPU核数相同，最多同时渲染的图片数量
+RENDER_POOL_SIZE = int(os.environ.get('RENDER_POOL_SIZE') or os.cpu_count() or 1)
+
+# 传给子进程的检测参数行：(字段名元组, 行元组的元组)，字段名只传一次
+PackedRows = Tuple[Tuple[str, ...], Tuple[tuple, ...]]
+
+# 预热使用的一行示例数据，让子进程在处理第一个任务前完成模块导入和字体加载
+_WARMUP_ROWS: PackedRows = (
+    ('param_name', 'standards', 'is_regular_param', 'sort_order'),
+    (('预热', '', 0, 0),)
+)
+
+_pool: Optional[ProcessPoolExecutor] = None
+# 启动参数，进程池因子进程异常退出被丢弃后按相同参数重建
+_pool_args: Optional[Tuple[Tuple[str, ...], int]] = None
+_pool_lock = threading.Lock()
+
+
+def pack_rows(params: Sequence[dict]) -> PackedRows:
+    """
+    把清洗后的检测参数列表压缩为字段名元组和行元组，减少传给子进程的序列化数据
+    :param params: ImageService.clean_detection_params 返回的检测参数列表
+    :return: (字段名元组, 行元组的元组)
+    """
+    fields = tuple(sorted({key for param in params for key in param}))
+    return fields, tuple(tuple(param.get(key) for key in fields) for param in params)
+
+
+def unpack_rows(packed: PackedRows) -> List[dict]:
+    """
+    还原pack_rows压缩的检测参数列表
+    :param packed: (字段名元组, 行元组的元组)
+    :return: 检测参数列表
+    """
+    fields, rows = packed
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def _render_png(packed: PackedRows, device_type: str) -> bytes:
+    """
+    渲染一个设备类型的PNG，在子进程中执行
+    :param packed: 压缩后的检测参数行
+    :param device_type: 设备类型
+    :return: PNG二进制数据
+    """
+    from app.utils.data_to_png_direct_converter import data_to_png_direct_converter
+    return data_to_png_direct_converter.convert_data_to_png(unpack_rows(packed), device_type)
+
+
+def _init_worker(device_types: Tuple[str, ...]) -> None:
+    """
+    子进程初始化：加载渲染用到的所有字体，导入渲染模块，并按每个设备类型渲染一次示例数据
+    :param device_types: 需要预热的设备类型
+    """
+    from app.utils.data_to_png_direct_converter import data_to_png_direct_converter as converter
+    from app.utils.font_registry import font_registry
+    font_registry.preload({
+        'body': sorted(set(converter.device_font_sizes.values())),
+        'bold': sorted(set(converter.device_header_font_sizes.values())),
+        'watermark': [16]
+    })
+    for device_type in device_types:
+        try:
+            _render_png(_WARMUP_ROWS, device_type)
+        except Exception as e:
+            logger.warning(f"渲染进程预热失败: {device_type}, {str(e)}")
+
+
+def _get_context() -> multiprocessing.context.BaseContext:
+    """
+    获取创建子进程的上下文，优先forkserver，不支持时使用spawn
+    forkserver预先导入渲染模块，之后的子进程从单线程的forkserver进程fork，启动快且不继承worker的线程状态
+    :return: 多进程上下文
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        # forkserver启动后再设置不生效，只影响第一次创建进程池
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context('spawn')
+
+
+def start_render_pool(device_types: Iterable[str], size: Optional[int] = None) -> bool:
+    """
+    创建并预热渲染进程池，已创建时直接返回
+    :param device_types: 需要预热的设备类型
+    :param size: 进程数，默认RENDER_POOL_SIZE，小于1时不创建进程池
+    :return: 进程池可用返回True
+    """
+    global _pool, _pool_args
+    size = RENDER_POOL_SIZE if size is None else size
+    if size < 1:
+        return False
+    with _pool_lock:
+        if _pool is None:
+            device_types = tuple(device_types)
+            _pool_args = (device_types, size)
+            _pool = ProcessPoolExecutor(
+                max_workers=size, mp_context=_get_context(), initializer=_init_worker, initargs=(device_types,)
+            )
+            # 提交与进程数相同的空任务，让子进程在启动阶段创建并完成预热
+            for future in [_pool.submit(len, ()) for _ in range(size)]:
+                future.result()
+            logger.info(f"渲染进程池已启动，进程数: {size}")
+    return True
+
+
+def shutdown_render_pool() -> None:
+    """关闭渲染进程池"""
+    global _pool, _pool_args
+    with _pool_lock:
+        pool, _pool = _pool, None
+        _pool_args = None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _reset_broken_pool(pool: ProcessPoolExecutor) -> None:
+    """子进程异常退出后进程池不可再用，丢弃并在下次渲染时按原配置重建"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    """获取渲染进程池，被丢弃的进程池按启动参数重建"""
+    if _pool is None and _pool_args is not None:
+        try:
+            start_render_pool(*_pool_args)
+        except Exception as e:
+            logger.error(f"重建渲染进程池失败: {str(e)}")
+    return _pool
+
+
+def submit_pngs(params: Sequence[dict], device_types: Iterable[str]) -> Dict[str, Future]:
+    """
+    提交各设备类型的PNG渲染任务，调用方可以在等待结果期间处理其他工作（如生成SVG）
+    进程池未启动时在当前进程中依次渲染，返回已完成的Future
+    :param params: 清洗后的检测参数列表
+    :param device_types: 设备类型
+    :return: 设备类型 → 结果为PNG二进制数据的Future
+    """
+    device_types = tuple(device_types)
+    packed = pack_rows(params)
+    pool = _get_pool()
+    if pool is not None:
+        try:
+            return {device_type: pool.submit(_render_png, packed, device_type) for device_type in device_types}
+        except BrokenProcessPool:
+            _reset_broken_pool(pool)
+            logger.error("渲染进程池不可用，在当前进程中渲染")
+
+    futures = {}
+    for device_type in device_types:
+        future = Future()
+        try:
+            future.set_result(_render_png(packed, device_type))
+        except Exception as e:
+            future.set_exception(e)
+        futures[device_type] = future
+    return futures
+
+
+def collect_pngs(futures: Dict[str, Future]) -> Dict[str, bytes]:
+    """
+    等待submit_pngs提交的渲染任务完成
+    :param futures: 设备类型 → Future
+    :return: 设备类型 → PNG二进制数据
+    :raises Exception: 任一设备类型渲染失败时抛出
+    """
+    results = {}
+    for device_type, future in futures.items():
+        try:
+            results[device_type] = future.result()
+        except BrokenProcessPool:
+            pool = _pool
+            if pool is not None:
+                _reset_broken_pool(pool)
+            raise Exception(f"渲染进程异常退出: {device_type}")
+    return results
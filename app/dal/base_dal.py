@@ -1,10 +1,16 @@
 # 基础数据访问层
 # 封装数据库和Redis操作，确保数据一致性
 
-from typing import Any, Optional, Type, TypeVar, List, Dict
-from sqlalchemy.orm import Session
+import base64
+import hashlib
+import json
+from datetime import datetime, date
+from typing import Any, Callable, Optional, Type, TypeVar, List, Dict, Tuple
+from sqlalchemy import inspect as sa_inspect, DateTime, Date, Boolean, LargeBinary
+from sqlalchemy.orm import Session, make_transient_to_detached
 from redis import Redis
-from app.utils.redis_utils import RedisUtils
+from app.extensions import RequestScope, get_request_scope
+from app.utils.redis_utils import RedisUtils, LocalLRUCache, local_cache
 
 
 ModelType = TypeVar('ModelType')
@@ -13,6 +19,20 @@ ModelType = TypeVar('ModelType')
 class BaseDAL:
     """基础数据访问层，封装了MySQL和Redis操作"""
     
+    # 是否启用get_by_id的读穿透缓存（命中时直接从Redis数据还原实例，不查询数据库）
+    cache_read_through = True
+    
+    # 是否缓存get_all、get_by_condition和count等列表查询
+    # 缓存键包含所读表的代数，只有所有写操作都经过DAL（会递增代数）的模型才能开启
+    cache_list_queries = False
+    
+    # 进程内一级缓存的容量和过期时间（秒），子类可按模型调整
+    local_cache_size = LocalLRUCache.DEFAULT_MAX_SIZE
+    local_cache_ttl = LocalLRUCache.DEFAULT_TTL
+    
+    # 按缓存前缀统计的命中/未命中次数（进程内）
+    _cache_stats: Dict[str, Dict[str, int]] = {}
+    
     def __init__(self, db: Session, redis: Redis, model: Type[ModelType]):
         """
         初始化DAL
@@ -27,6 +47,8 @@ class BaseDAL:
         self.cache_prefix = model.__name__.lower()
         # 默认缓存过期时间（秒）
         self.default_expire = 3600
+        # 设置该前缀在一级缓存中的容量和过期时间
+        local_cache.configure(self.cache_prefix, self.local_cache_size, self.local_cache_ttl)
     
     def _get_cache_key(self, id: Any) -> str:
         """
@@ -34,24 +56,63 @@ class BaseDAL:
         :param id: 数据ID
         :return: 带版本号的缓存键字符串
         """
-        # 添加版本号v1，便于后续缓存结构变更时升级
-        return f"{self.cache_prefix}:v1:{id}"
+        # 版本号v2：缓存内容只包含列字段，可直接还原为模型实例
+        return f"{self.cache_prefix}:v2:{id}"
+    
+    def _use_local_cache(self) -> bool:
+        """
+        是否使用进程内一级缓存
+        只有在Redis可用且已订阅失效通知时才启用，保证多个worker之间的一致性
+        :return: 启用返回True
+        """
+        return bool(self.redis) and RedisUtils.is_invalidation_listening()
+    
+    def _deferred_scope(self) -> Optional[RequestScope]:
+        """
+        获取推迟提交的请求级工作单元
+        只有DAL使用的是请求共享的会话时才返回，此时缓存失效要等请求事务提交后执行
+        :return: 工作单元，不在请求中或使用独立会话时返回None
+        """
+        scope = get_request_scope()
+        if scope is not None and scope.deferring and scope.db is self.db:
+            return scope
+        return None
+    
+    def _cache_bypassed(self) -> bool:
+        """
+        本次请求已写入但尚未提交时不读写缓存
+        避免读到提交前的旧缓存，也避免把未提交的数据写入缓存
+        :return: 需要绕过缓存返回True
+        """
+        scope = self._deferred_scope()
+        return scope is not None and scope.has_writes
     
     def get_cache(self, key: str) -> Optional[Any]:
         """
-        获取缓存数据
+        获取缓存数据，先查进程内一级缓存，再查Redis
         :param key: 缓存键
         :return: 缓存值，不存在或解析失败返回None
         """
+        if self._cache_bypassed():
+            return None
         try:
-            return RedisUtils.get_cache(self.redis, key)
+            use_local = self._use_local_cache()
+            if use_local:
+                value = local_cache.get(key)
+                if value is not None:
+                    self._record_cache_stat('local_hits')
+                    return value
+            value = RedisUtils.get_cache(self.redis, key)
+            if use_local and value is not None:
+                local_cache.set(key, value)
+            return value
         except Exception as e:
             print(f"获取缓存失败: {e}")
             return None
     
     def set_cache(self, key: str, value: Any, expire: Optional[int] = None) -> bool:
         """
-        设置缓存数据
+        设置缓存数据，同时写入Redis和进程内一级缓存
         :param key: 缓存键
         :param value: 缓存值
         :param expire: 缓存过期时间（秒），默认使用类的默认值
@@ -59,37 +120,284 @@ class BaseDAL:
         """
         if expire is None:
             expire = self.default_expire
+        if self._cache_bypassed():
+            return False
         
         try:
-            return RedisUtils.set_cache(self.redis, key, value, expire)
+            success = RedisUtils.set_cache(self.redis, key, value, expire)
+            if success and self._use_local_cache():
+                local_cache.set(key, value)
+            return success
         except Exception as e:
             print(f"设置缓存失败: {e}")
             return False
     
+    def get_or_compute_cache(self, key: str, loader: Callable[[], Any], expire: Optional[int] = None) -> Any:
+        """
+        获取缓存数据，未命中时由集群中的一个worker执行loader并回填缓存，其他请求等待结果
+        先查进程内一级缓存，再通过RedisUtils.get_or_compute读取或计算
+        :param key: 缓存键
+        :param loader: 无参函数，返回要缓存的值，返回None时不缓存
+        :param expire: 缓存过期时间（秒），默认使用类的默认值
+        :return: 缓存值或loader的返回值
+        """
+        if expire is None:
+            expire = self.default_expire
+        if self._cache_bypassed():
+            return loader()
+        
+        use_local = self._use_local_cache()
+        if use_local:
+            value = local_cache.get(key)
+            if value is not None:
+                self._record_cache_stat('local_hits')
+                return value
+        
+        value = RedisUtils.get_or_compute(self.redis, key, loader, ttl=expire)
+        if use_local and value is not None:
+            local_cache.set(key, value)
+        return value
+    
+    def get_many_cache(self, keys: List[str]) -> List[Optional[Any]]:
+        """
+        批量获取缓存数据，先查进程内一级缓存，剩余的键用一次MGET从Redis获取
+        :param keys: 缓存键列表
+        :return: 与keys顺序一致的缓存值列表，未命中的位置为None
+        """
+        if self._cache_bypassed():
+            return [None] * len(keys)
+        try:
+            use_local = self._use_local_cache()
+            values: List[Optional[Any]] = [None] * len(keys)
+            remote_positions = []
+            for position, key in enumerate(keys):
+                value = local_cache.get(key) if use_local else None
+                if value is not None:
+                    self._record_cache_stat('local_hits')
+                    values[position] = value
+                else:
+                    remote_positions.append(position)
+            
+            if remote_positions:
+                remote_values = RedisUtils.get_many_cache(self.redis, [keys[p] for p in remote_positions])
+                for position, value in zip(remote_positions, remote_values):
+                    values[position] = value
+                    if use_local and value is not None:
+                        local_cache.set(keys[position], value)
+            return values
+        except Exception as e:
+            print(f"批量获取缓存失败: {e}")
+            return [None] * len(keys)
+    
+    def set_many_cache(self, mapping: Dict[str, Any], expire: Optional[int] = None) -> bool:
+        """
+        批量设置缓存数据，使用一个pipeline写入Redis
+        :param mapping: 缓存键到缓存值的字典
+        :param expire: 缓存过期时间（秒），默认使用类的默认值
+        :return: 设置成功返回True，失败返回False
+        """
+        if expire is None:
+            expire = self.default_expire
+        if self._cache_bypassed():
+            return False
+        
+        try:
+            success = RedisUtils.set_many_cache(self.redis, mapping, expire)
+            if success and self._use_local_cache():
+                for key, value in mapping.items():
+                    local_cache.set(key, value)
+            return success
+        except Exception as e:
+            print(f"批量设置缓存失败: {e}")
+            return False
+    
     def delete_cache(self, key: str) -> bool:
         """
-        删除缓存数据
+        删除缓存数据，同时清除进程内一级缓存
         :param key: 缓存键
         :return: 删除成功返回True，失败返回False
         """
+        scope = self._deferred_scope()
+        if scope is not None:
+            # 请求事务提交后统一删除
+            scope.invalidate(keys=[key])
+            return True
         try:
+            local_cache.delete(key)
             return RedisUtils.delete_cache(self.redis, key)
         except Exception as e:
             print(f"删除缓存失败: {e}")
             return False
     
+    def _publish_invalidation(self, *keys: str) -> None:
+        """
+        广播缓存失效通知，使其他worker清除一级缓存中的对应键
+        :param keys: 失效的缓存键
+        """
+        scope = self._deferred_scope()
+        if scope is not None:
+            # 请求事务提交后统一删除并广播，提交前写入的新值不会进入缓存
+            scope.invalidate(keys=keys)
+            return
+        RedisUtils.publish_invalidation(self.redis, keys)
+    
+    def _bump_generation(self, *tables: str) -> None:
+        """
+        递增表的代数，使读取这些表的列表缓存失效，应在事务提交后调用
+        :param tables: 表名，默认为当前模型的表
+        """
+        tables = tables or (self.model.__tablename__,)
+        scope = self._deferred_scope()
+        if scope is not None:
+            scope.invalidate(tables=tables)
+            return
+        RedisUtils.bump_generations(self.redis, *tables)
+    
+    def cached_query(self, name: str, params: Any, loader: Callable[[], Any],
+                     tables: Optional[List[str]] = None, expire: Optional[int] = None) -> Any:
+        """
+        缓存查询结果，缓存键包含所读各表的当前代数，任一表变更后自动使用新键
+        会话中有未提交的修改时不使用缓存，保证能读到本事务的修改
+        :param name: 查询名称
+        :param params: 查询参数，需可JSON序列化
+        :param loader: 无参函数，执行查询并返回可缓存的结果
+        :param tables: 查询读取的表名列表，默认为当前模型的表
+        :param expire: 缓存过期时间（秒），默认使用类的默认值
+        :return: 查询结果
+        """
+        if not self.cache_list_queries or not self.redis or self._cache_bypassed():
+            return loader()
+        if self.db.new or self.db.dirty or self.db.deleted:
+            return loader()
+        
+        tables = tables or [self.model.__tablename__]
+        generations = RedisUtils.get_generations(self.redis, tables)
+        if generations is None:
+            return loader()
+        
+        digest = hashlib.md5(json.dumps(params, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+        generation = '.'.join(str(g) for g in generations)
+        cache_key = f"{self.cache_prefix}:q:{name}:{digest}:g{generation}"
+        return self.get_or_compute_cache(cache_key, loader, expire=expire)
+    
+    def _cached_instances(self, name: str, params: Any, query: Callable[[], List[ModelType]],
+                          tables: Optional[List[str]] = None) -> List[ModelType]:
+        """
+        缓存返回模型实例列表的查询，缓存中保存序列化后的行，命中时还原为实例
+        :param name: 查询名称
+        :param params: 查询参数
+        :param query: 无参函数，执行查询并返回实例列表
+        :param tables: 查询读取的表名列表，默认为当前模型的表
+        :return: 数据模型实例列表
+        """
+        # 本次请求执行了查询时，直接使用查询得到的实例
+        loaded = {}
+        
+        def load():
+            loaded['instances'] = query()
+            return [self._serialize_instance(instance) for instance in loaded['instances']]
+        
+        rows = self.cached_query(name, params, load, tables=tables)
+        if 'instances' in loaded:
+            return loaded['instances']
+        
+        instances = []
+        for row in rows:
+            try:
+                instance = self._deserialize_instance(row)
+            except Exception as e:
+                print(f"还原缓存实例失败: {e}")
+                instance = None
+            if instance is None:
+                # 缓存结构不完整，直接查询数据库
+                self._record_cache_stat('errors')
+                return query()
+            instances.append(instance)
+        return instances
+    
     def _serialize_instance(self, instance: ModelType) -> dict:
         """
-        将模型实例转换为可序列化的字典，排除SQLAlchemy内部属性
+        将模型实例转换为可序列化的字典，只保留已加载的列字段
+        排除SQLAlchemy内部状态和关系属性，保证缓存内容可以还原为实例
         :param instance: 模型实例
         :return: 可序列化的字典
         """
-        # 排除SQLAlchemy内部状态属性
-        return {k: v for k, v in instance.__dict__.items() if k != '_sa_instance_state'}
+        column_keys = [attr.key for attr in sa_inspect(self.model).column_attrs]
+        return {k: instance.__dict__[k] for k in column_keys if k in instance.__dict__}
+    
+    @staticmethod
+    def _coerce_column_value(column, value: Any) -> Any:
+        """
+        将缓存中的值转换为列对应的Python类型
+        二进制编码的缓存值已保留原始类型，这里主要兼容旧版本JSON缓存中的字符串
+        :param column: SQLAlchemy列对象
+        :param value: 缓存中的原始值
+        :return: 转换后的值
+        :raises ValueError: 值无法转换为列类型时抛出
+        """
+        if value is None:
+            return None
+        column_type = column.type
+        if isinstance(column_type, DateTime) and isinstance(value, str):
+            return datetime.fromisoformat(value)
+        if isinstance(column_type, Date) and isinstance(value, str):
+            return date.fromisoformat(value)
+        if isinstance(column_type, Boolean):
+            return bool(value)
+        if isinstance(column_type, LargeBinary) and not isinstance(value, (bytes, bytearray)):
+            # 旧版本JSON缓存中的二进制字段已被转为字符串，无法还原
+            raise ValueError(f"列 {column.key} 的缓存值不是二进制数据")
+        return value
+    
+    def _deserialize_instance(self, data: Any) -> Optional[ModelType]:
+        """
+        将缓存数据还原为与当前会话关联的模型实例，不访问数据库
+        :param data: _serialize_instance生成的字典
+        :return: 模型实例，缓存数据不完整或无法解析时返回None
+        """
+        if not isinstance(data, dict):
+            return None
+        
+        values = {}
+        for attr in sa_inspect(self.model).column_attrs:
+            if attr.key not in data:
+                # 缓存结构不完整（如旧版本数据），视为未命中
+                return None
+            values[attr.key] = self._coerce_column_value(attr.columns[0], data[attr.key])
+        
+        instance = self.model(**values)
+        # 转为游离状态，属性历史被重置为“刚从数据库加载”
+        make_transient_to_detached(instance)
+        
+        # 会话中已存在同一主键的实例时直接复用，避免覆盖未提交的修改
+        existing = self.db.identity_map.get(sa_inspect(instance).key)
+        if existing is not None:
+            return existing
+        
+        # 关联到会话，之后的关系属性访问、更新和删除与查询得到的实例一致
+        self.db.add(instance)
+        return instance
+    
+    def _record_cache_stat(self, stat: str) -> None:
+        """
+        记录缓存统计
+        :param stat: 统计项：hits/misses/errors
+        """
+        stats = BaseDAL._cache_stats.setdefault(self.cache_prefix, {'hits': 0, 'local_hits': 0, 'misses': 0, 'errors': 0})
+        stats[stat] += 1
+    
+    @classmethod
+    def get_cache_stats(cls) -> Dict[str, Dict[str, int]]:
+        """
+        获取按缓存前缀统计的命中/未命中次数
+        :return: {缓存前缀: {'hits': 命中次数, 'local_hits': 一级缓存命中次数, 'misses': 未命中次数, 'errors': 解析失败次数}}
+        """
+        return {prefix: dict(stats) for prefix, stats in BaseDAL._cache_stats.items()}
     
     def get_by_id(self, id: Any, cache_expire: Optional[int] = None) -> Optional[ModelType]:
         """
         根据ID获取数据，优先从缓存获取
+        命中缓存时直接还原实例，未命中或解析失败时查询数据库并回填缓存
         :param id: 数据ID
         :param cache_expire: 缓存过期时间（秒），默认使用类的默认值
         :return: 数据模型实例，不存在则返回None
@@ -97,35 +405,117 @@ class BaseDAL:
         if cache_expire is None:
             cache_expire = self.default_expire
         
+        cache_key = self._get_cache_key(id)
+        
         # 使用统一的方法获取ID字段名
         id_field = self._get_id_field_name()
         
-        # 直接从数据库获取实例，确保实例与会话关联
+        if self.cache_read_through:
+            # 本次请求执行了loader时，直接使用查询得到的实例
+            loaded = {}
+            
+            def load():
+                loaded['instance'] = self.db.query(self.model).filter_by(**{id_field: id}).first()
+                if loaded['instance'] is None:
+                    return None
+                return self._serialize_instance(loaded['instance'])
+            
+            # 未命中时只有一个worker查询数据库，其他请求等待回填结果
+            cached_data = self.get_or_compute_cache(cache_key, load, expire=cache_expire)
+            if 'instance' in loaded:
+                self._record_cache_stat('misses')
+                return loaded['instance']
+            if cached_data is None:
+                return None
+            try:
+                instance = self._deserialize_instance(cached_data)
+            except Exception as e:
+                print(f"还原缓存实例失败: {e}")
+                instance = None
+            if instance is not None:
+                self._record_cache_stat('hits')
+                return instance
+            self._record_cache_stat('errors')
+        
+        # 从数据库获取实例，确保实例与会话关联
         instance = self.db.query(self.model).filter_by(**{id_field: id}).first()
         
         if instance:
             # 将数据存入缓存，使用序列化方法排除内部属性
-            cache_key = self._get_cache_key(id)
-            RedisUtils.set_cache(self.redis, cache_key, self._serialize_instance(instance), expire=cache_expire)
+            self.set_cache(cache_key, self._serialize_instance(instance), expire=cache_expire)
         
         return instance
     
+    def get_many(self, ids: List[Any], cache_expire: Optional[int] = None) -> List[ModelType]:
+        """
+        根据ID列表批量获取数据
+        先用一次MGET读取缓存，未命中的ID用一条IN查询从数据库获取，并用一个pipeline回填缓存
+        :param ids: 数据ID列表
+        :param cache_expire: 缓存过期时间（秒），默认使用类的默认值
+        :return: 数据模型实例列表，按传入ID的顺序排列（去重），不存在的ID被忽略
+        """
+        if cache_expire is None:
+            cache_expire = self.default_expire
+        
+        # 去重并保持调用方的顺序
+        unique_ids = list(dict.fromkeys(ids))
+        if not unique_ids:
+            return []
+        
+        found: Dict[Any, ModelType] = {}
+        missing_ids = unique_ids
+        
+        if self.cache_read_through:
+            cached_values = self.get_many_cache([self._get_cache_key(id) for id in unique_ids])
+            missing_ids = []
+            for id, cached_data in zip(unique_ids, cached_values):
+                instance = None
+                if cached_data is not None:
+                    try:
+                        instance = self._deserialize_instance(cached_data)
+                    except Exception as e:
+                        print(f"还原缓存实例失败: {e}")
+                    if instance is None:
+                        self._record_cache_stat('errors')
+                if instance is not None:
+                    self._record_cache_stat('hits')
+                    found[id] = instance
+                else:
+                    self._record_cache_stat('misses')
+                    missing_ids.append(id)
+        
+        if missing_ids:
+            id_column = getattr(self.model, self._get_id_field_name())
+            rows = self.db.query(self.model).filter(id_column.in_(missing_ids)).all()
+            
+            # 回填缓存
+            cache_mapping = {}
+            for row in rows:
+                row_id = self._get_instance_id(row)
+                found[row_id] = row
+                cache_mapping[self._get_cache_key(row_id)] = self._serialize_instance(row)
+            self.set_many_cache(cache_mapping, expire=cache_expire)
+        
+        return [found[id] for id in unique_ids if id in found]
+    
     def get_all(self) -> List[ModelType]:
         """
         获取所有数据
-        注意：此方法不使用缓存，因为数据量可能很大，且频繁变化
+        开启cache_list_queries时按表代数缓存，表变更后自动失效
         :return: 数据模型实例列表
         """
-        return self.db.query(self.model).all()
+        return self._cached_instances('all', None, lambda: self.db.query(self.model).all())
     
     def get_by_condition(self, condition: Dict[str, Any]) -> List[ModelType]:
         """
         根据条件获取数据
-        注意：此方法不使用缓存，因为条件查询的结果可能多样
+        开启cache_list_queries时按表代数缓存，表变更后自动失效
         :param condition: 查询条件字典
         :return: 数据模型实例列表
         """
-        return self.db.query(self.model).filter_by(**condition).all()
+        return self._cached_instances(
+            'condition', condition, lambda: self.db.query(self.model).filter_by(**condition).all()
+        )
     
     def _get_id_field_name(self) -> str:
         """
@@ -189,7 +579,10 @@ class BaseDAL:
         # 将数据存入缓存，使用序列化方法排除内部属性
         instance_id = self._get_instance_id(instance)
         cache_key = self._get_cache_key(instance_id)
-        RedisUtils.set_cache(self.redis, cache_key, self._serialize_instance(instance), expire=cache_expire)
+        self.set_cache(cache_key, self._serialize_instance(instance), expire=cache_expire)
+        # 通知其他worker清除一级缓存，并使列表缓存失效
+        self._publish_invalidation(cache_key)
+        self._bump_generation()
         
         return instance
     
@@ -220,10 +613,55 @@ class BaseDAL:
         
         # 更新缓存，使用序列化方法排除内部属性
         cache_key = self._get_cache_key(id)
-        RedisUtils.set_cache(self.redis, cache_key, self._serialize_instance(instance), expire=cache_expire)
+        self.set_cache(cache_key, self._serialize_instance(instance), expire=cache_expire)
+        # 通知其他worker清除一级缓存，并使列表缓存失效
+        self._publish_invalidation(cache_key)
+        self._bump_generation()
         
         return instance
     
+    def update_many(self, ids: List[Any], data: Dict[str, Any], cache_expire: Optional[int] = None) -> List[ModelType]:
+        """
+        批量更新多条数据为相同的值，只提交一次事务，并用一个pipeline更新缓存
+        :param ids: 数据ID列表
+        :param data: 要更新的数据字典
+        :param cache_expire: 缓存过期时间（秒），默认使用类的默认值
+        :return: 更新后的数据模型实例列表，不存在的ID被忽略
+        """
+        if cache_expire is None:
+            cache_expire = self.default_expire
+        
+        instances = self.get_many(ids)
+        if not instances:
+            return []
+        
+        # 更新实例属性
+        for instance in instances:
+            for key, value in data.items():
+                if hasattr(instance, key):
+                    setattr(instance, key, value)
+        
+        # 提交前记录ID，提交后实例属性会过期
+        instance_ids = [self._get_instance_id(instance) for instance in instances]
+        
+        # 保存到数据库
+        self.db.commit()
+        
+        # 用一条IN查询重新加载提交后过期的属性，代替逐条refresh
+        id_column = getattr(self.model, self._get_id_field_name())
+        instances = self.db.query(self.model).filter(id_column.in_(instance_ids)).all()
+        
+        # 更新缓存并通知其他worker
+        cache_mapping = {
+            self._get_cache_key(self._get_instance_id(instance)): self._serialize_instance(instance)
+            for instance in instances
+        }
+        self.set_many_cache(cache_mapping, expire=cache_expire)
+        self._publish_invalidation(*cache_mapping.keys())
+        self._bump_generation()
+        
+        return instances
+    
     def delete(self, id: Any) -> bool:
         """
         删除数据，同时删除缓存
@@ -237,11 +675,13 @@ class BaseDAL:
         
         # 删除缓存
         cache_key = self._get_cache_key(id)
-        RedisUtils.delete_cache(self.redis, cache_key)
+        self.delete_cache(cache_key)
+        self._publish_invalidation(cache_key)
         
         # 删除数据库中的数据
         self.db.delete(instance)
         self.db.commit()
+        self._bump_generation()
         
         return True
     
@@ -263,7 +703,10 @@ class BaseDAL:
         # 更新缓存，使用序列化方法排除内部属性
         instance_id = self._get_instance_id(instance)
         cache_key = self._get_cache_key(instance_id)
-        RedisUtils.set_cache(self.redis, cache_key, self._serialize_instance(instance), expire=cache_expire)
+        self.set_cache(cache_key, self._serialize_instance(instance), expire=cache_expire)
+        # 通知其他worker清除一级缓存，并使列表缓存失效
+        self._publish_invalidation(cache_key)
+        self._bump_generation()
         
         return instance
     
@@ -277,18 +720,231 @@ class BaseDAL:
         instances = [self.model(**data) for data in data_list]
         self.db.add_all(instances)
         self.db.commit()
+        self._bump_generation()
         return instances
     
+    def _build_upsert(self, chunk: List[Dict[str, Any]], key_columns: List[str], update_columns: List[str]):
+        """
+        构建批量插入或更新语句
+        MySQL使用 INSERT ... ON DUPLICATE KEY UPDATE，其他数据库使用 ON CONFLICT DO UPDATE
+        :param chunk: 数据字典列表
+        :param key_columns: 唯一键列名
+        :param update_columns: 键冲突时需要更新的列名
+        :return: SQL语句
+        """
+        table = self.model.__table__
+        dialect = self.db.get_bind().dialect.name
+        
+        # 键冲突时更新带有onupdate的列（如update_time），与ORM更新的行为一致
+        extra_updates = {}
+        for column in table.columns:
+            if column.name in update_columns or column.onupdate is None or not column.onupdate.is_callable:
+                continue
+            extra_updates[column.name] = column.onupdate.arg(None)
+        
+        if dialect == 'mysql':
+            from sqlalchemy.dialects.mysql import insert
+            stmt = insert(table).values(chunk)
+            updates = {name: stmt.inserted[name] for name in update_columns}
+            updates.update(extra_updates)
+            if not updates:
+                # ON DUPLICATE KEY UPDATE至少需要一个赋值，使用无副作用的赋值
+                updates = {key_columns[0]: table.c[key_columns[0]]}
+            return stmt.on_duplicate_key_update(updates)
+        
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).values(chunk)
+        updates = {name: stmt.excluded[name] for name in update_columns}
+        updates.update(extra_updates)
+        if not updates:
+            return stmt.on_conflict_do_nothing(index_elements=key_columns)
+        return stmt.on_conflict_do_update(index_elements=key_columns, set_=updates)
+    
+    def bulk_upsert(self, rows: List[Dict[str, Any]], key_columns: List[str], chunk_size: int = 1000,
+                    update_columns: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        按唯一键批量插入或更新数据，在一个事务中分块执行 INSERT ... ON DUPLICATE KEY UPDATE
+        每块先用一条查询找出已存在的键，用于统计插入/更新数量和清除缓存；
+        每块使用独立的保存点，某一块失败只回滚该块，其余块照常提交。
+        提交后用一个pipeline删除被更新记录的缓存，并使列表缓存失效。
+        :param rows: 数据字典列表，键为列名；同一唯一键出现多次时以最后一条为准
+        :param key_columns: 唯一键列名列表，需对应数据库中的主键或唯一约束
+        :param chunk_size: 每块的行数，默认1000
+        :param update_columns: 键冲突时更新的列，默认为rows中除唯一键和主键外的所有列
+        :return: {'inserted': 插入数, 'updated': 更新数, 'failed': 失败数,
+                  'chunks': [{'chunk': 块序号, 'inserted', 'updated', 'failed', 'error'}]}
+        """
+        from sqlalchemy import select, tuple_
+        
+        result = {'inserted': 0, 'updated': 0, 'failed': 0, 'chunks': []}
+        if not rows:
+            return result
+        
+        # 按唯一键去重，保留最后一条
+        unique_rows: Dict[tuple, Dict[str, Any]] = {}
+        for row in rows:
+            unique_rows[tuple(row.get(column) for column in key_columns)] = row
+        rows = list(unique_rows.values())
+        
+        id_field = self._get_id_field_name()
+        if update_columns is None:
+            columns = []
+            for row in rows:
+                for column in row:
+                    if column not in columns and column not in key_columns and column != id_field:
+                        columns.append(column)
+            update_columns = columns
+        
+        table = self.model.__table__
+        key_expr = tuple_(*[table.c[column] for column in key_columns])
+        id_column = table.c[id_field]
+        updated_ids = []
+        
+        for index, start in enumerate(range(0, len(rows), chunk_size)):
+            chunk = rows[start:start + chunk_size]
+            keys = [tuple(row.get(column) for column in key_columns) for row in chunk]
+            chunk_result = {'chunk': index + 1, 'inserted': 0, 'updated': 0, 'failed': 0, 'error': None}
+            savepoint = self.db.begin_nested()
+            try:
+                # 一条查询找出本块中已存在的记录
+                existing = self.db.execute(select(id_column).where(key_expr.in_(keys))).scalars().all()
+                # 多行VALUES要求每行的列相同，按列集合分组执行，缺少的列使用默认值而不是NULL
+                groups: Dict[tuple, List[Dict[str, Any]]] = {}
+                for row in chunk:
+                    groups.setdefault(tuple(sorted(row)), []).append(row)
+                for columns, group in groups.items():
+                    group_updates = [column for column in update_columns if column in columns]
+                    self.db.execute(self._build_upsert(group, key_columns, group_updates))
+                savepoint.commit()
+                chunk_result['updated'] = len(existing)
+                chunk_result['inserted'] = len(chunk) - len(existing)
+                updated_ids.extend(existing)
+            except Exception as e:
+                savepoint.rollback()
+                chunk_result['failed'] = len(chunk)
+                # 只保留数据库返回的错误信息，不包含整块的SQL参数
+                chunk_result['error'] = str(getattr(e, 'orig', None) or e)
+            result['inserted'] += chunk_result['inserted']
+            result['updated'] += chunk_result['updated']
+            result['failed'] += chunk_result['failed']
+            result['chunks'].append(chunk_result)
+        
+        self.db.commit()
+        
+        # 清除被更新记录的缓存，新插入的记录没有缓存
+        cache_keys = [self._get_cache_key(id) for id in updated_ids]
+        if cache_keys:
+            if self._deferred_scope() is None:
+                RedisUtils.delete_many_cache(self.redis, cache_keys)
+                for key in cache_keys:
+                    local_cache.delete(key)
+            self._publish_invalidation(*cache_keys)
+        if result['inserted'] or result['updated']:
+            self._bump_generation()
+        
+        return result
+    
     def count(self, condition: Optional[Dict[str, Any]] = None) -> int:
         """
         统计数据数量
-        注意：此方法不使用缓存，因为数量可能频繁变化
+        开启cache_list_queries时按表代数缓存，表变更后自动失效
         :param condition: 查询条件字典，默认统计所有数据
         :return: 数据数量
         """
-        if condition:
-            return self.db.query(self.model).filter_by(**condition).count()
-        return self.db.query(self.model).count()
+        def load():
+            if condition:
+                return self.db.query(self.model).filter_by(**condition).count()
+            return self.db.query(self.model).count()
+        
+        return self.cached_query('count', condition, load)
+    
+    @staticmethod
+    def encode_id_cursor(last_id: int) -> str:
+        """
+        将上一页最后一条记录的ID编码为不透明的游标字符串
+        :param last_id: 最后一条记录的ID
+        :return: 游标字符串
+        """
+        raw = json.dumps([last_id], separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('utf-8').rstrip('=')
+    
+    @staticmethod
+    def decode_id_cursor(cursor: str) -> int:
+        """
+        解析encode_id_cursor生成的游标
+        :param cursor: 游标字符串
+        :return: 上一页最后一条记录的ID
+        :raises ValueError: 游标格式不正确时抛出
+        """
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            last_id, = json.loads(base64.urlsafe_b64decode(padded.encode('utf-8')))
+        except Exception:
+            raise ValueError("无效的分页游标")
+        if not isinstance(last_id, int) or isinstance(last_id, bool):
+            raise ValueError("无效的分页游标")
+        return last_id
+    
+    def get_page(self, page: int = 1, limit: int = 100, condition: Optional[Dict[str, Any]] = None,
+                 keyword: Optional[str] = None, keyword_fields: Optional[List[str]] = None,
+                 cursor: Optional[str] = None, with_total: bool = True) -> Tuple[List[ModelType], Optional[str], Optional[int]]:
+        """
+        在数据库中分页查询，按主键升序排列，每页只读取limit+1条记录
+        传入cursor时按主键游标定位（不使用OFFSET，任意深度的页面开销相同），否则按页码定位
+        开启cache_list_queries时本页记录和总数都按表代数缓存
+        :param page: 页码，从1开始，传入cursor时忽略
+        :param limit: 每页数量
+        :param condition: 精确匹配的查询条件字典
+        :param keyword: 模糊搜索关键词，匹配keyword_fields中任一字段
+        :param keyword_fields: 模糊搜索字段列表
+        :param cursor: 上一页返回的游标
+        :param with_total: 是否统计总记录数
+        :return: (本页数据模型实例列表, 下一页游标, 总记录数)，没有下一页时游标为None，未统计时总记录数为None
+        :raises ValueError: 游标格式不正确时抛出
+        """
+        from sqlalchemy import or_
+        
+        id_field = self._get_id_field_name()
+        id_column = getattr(self.model, id_field)
+        last_id = self.decode_id_cursor(cursor) if cursor else None
+        keyword_fields = keyword_fields if keyword else None
+        
+        def build_query():
+            query = self.db.query(self.model)
+            if condition:
+                query = query.filter_by(**condition)
+            if keyword_fields:
+                query = query.filter(or_(*[
+                    getattr(self.model, field).ilike(f"%{keyword}%") for field in keyword_fields
+                ]))
+            return query
+        
+        def load_page():
+            query = build_query()
+            if last_id is not None:
+                query = query.filter(id_column > last_id)
+            query = query.order_by(id_column.asc())
+            if last_id is None:
+                query = query.offset((page - 1) * limit)
+            # 多取一条判断是否还有下一页
+            return query.limit(limit + 1).all()
+        
+        filters = {'condition': condition, 'keyword': keyword, 'keyword_fields': keyword_fields}
+        position = {'after': last_id} if last_id is not None else {'page': page}
+        items = self._cached_instances('page', dict(filters, limit=limit, **position), load_page)
+        
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            next_cursor = self.encode_id_cursor(getattr(items[-1], id_field))
+        
+        total = None
+        if with_total:
+            total = self.cached_query('page_count', filters, lambda: build_query().count())
+        return items, next_cursor, total
     
     def search(self, search_params: Dict[str, Any], fuzzy_fields: Optional[List[str]] = None, related_fields: Optional[Dict[str, Any]] = None) -> List[ModelType]:
         """
@@ -1,18 +1,23 @@
 # 数据图片数据访问层
 # 封装数据图片相关的数据库和Redis操作，确保数据一致性
 
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Tuple
 from sqlalchemy.orm import Session
 from redis import Redis
 from app.models.image.data_image import DataImage
 from app.dal.base_dal import BaseDAL
+from app.utils.redis_utils import local_cache
 
 
 class DataImageDAL(BaseDAL):
     """数据图片数据访问层，处理数据图片相关的数据访问操作"""
     
+    # 图片数据体积大，不放入进程内一级缓存
+    local_cache_size = 0
+    
     def __init__(self, db: Session, redis: Redis):
         super().__init__(db, redis, DataImage)
+        local_cache.configure("data_img", 0, 0)
     
     def get_by_data_and_device(self, data_unique_id: str, device_type: str) -> Optional[DataImage]:
         """
@@ -21,17 +26,86 @@ class DataImageDAL(BaseDAL):
         :param device_type: 设备类型
         :return: 数据图片实例，不存在则返回None
         """
-        instance = self.db.query(self.model).filter_by(
+        # 不在这里写缓存，data_img:{data_unique_id}:{device_type} 由ImageService.get_image统一回填
+        return self.db.query(self.model).filter_by(
             data_unique_id=data_unique_id,
             device_type=device_type
         ).first()
+    
+    def get_meta_by_data_and_device(self, data_unique_id: str, device_type: str) -> Optional[Dict[str, any]]:
+        """
+        获取数据图片的版本信息，只查询版本号和更新时间，不读取图片内容
+        :param data_unique_id: 数据唯一标识
+        :param device_type: 设备类型
+        :return: {'version': 版本号, 'updated_at': 更新时间}，不存在则返回None
+        """
+        row = self.db.query(self.model.version, self.model.updated_at).filter_by(
+            data_unique_id=data_unique_id,
+            device_type=device_type
+        ).first()
+        if not row:
+            return None
+        return {'version': row.version, 'updated_at': row.updated_at}
+    
+    def get_meta_by_data_ids(self, data_unique_ids: List[str], device_type: str) -> Dict[str, Dict[str, any]]:
+        """
+        批量获取数据图片的版本信息，一条IN查询，不读取图片内容
+        :param data_unique_ids: 数据唯一标识列表
+        :param device_type: 设备类型
+        :return: 数据唯一标识 → {'version': 版本号, 'updated_at': 更新时间}，不存在的不包含
+        """
+        metas = self.get_meta_by_data_ids_and_devices(data_unique_ids, [device_type])
+        return {data_unique_id: meta for (data_unique_id, _), meta in metas.items()}
+    
+    def get_meta_by_data_ids_and_devices(self, data_unique_ids: List[str],
+                                         device_types: List[str]) -> Dict[Tuple[str, str], Dict[str, any]]:
+        """
+        批量获取多个设备类型的数据图片版本信息，一条IN查询，不读取图片内容
+        :param data_unique_ids: 数据唯一标识列表
+        :param device_types: 设备类型列表
+        :return: (数据唯一标识, 设备类型) → {'version': 版本号, 'updated_at': 更新时间}，不存在的不包含
+        """
+        if not data_unique_ids or not device_types:
+            return {}
+        rows = self.db.query(
+            self.model.data_unique_id, self.model.device_type, self.model.version, self.model.updated_at
+        ).filter(
+            self.model.data_unique_id.in_(data_unique_ids),
+            self.model.device_type.in_(device_types)
+        ).all()
+        return {
+            (row.data_unique_id, row.device_type): {'version': row.version, 'updated_at': row.updated_at}
+            for row in rows
+        }
+    
+    def get_content_hashes(self, data_unique_id: str) -> Dict[str, Optional[str]]:
+        """
+        获取数据各设备类型图片的渲染内容指纹，不读取图片内容
+        :param data_unique_id: 数据唯一标识
+        :return: 设备类型 → 内容指纹，旧数据没有指纹时为None
+        """
+        rows = self.db.query(self.model.device_type, self.model.content_hash).filter_by(
+            data_unique_id=data_unique_id
+        ).all()
+        return {row.device_type: row.content_hash for row in rows}
+    
+    def get_by_content_hash(self, content_hash: str, exclude_data_unique_id: Optional[str] = None) -> Dict[str, DataImage]:
+        """
+        查找内容指纹相同的图片，每个设备类型取一条，用于复用其他数据已渲染的相同表格
+        :param content_hash: 内容指纹
+        :param exclude_data_unique_id: 排除的数据唯一标识
+        :return: 设备类型 → 数据图片实例
+        """
+        from sqlalchemy import func
         
-        if instance:
-            # 将数据存入缓存
-            cache_key = f"data_img:{data_unique_id}:{device_type}"
-            self.set_cache(cache_key, self._serialize_instance(instance))
-        
-        return instance
+        query = self.db.query(func.min(self.model.image_id)).filter(self.model.content_hash == content_hash)
+        if exclude_data_unique_id is not None:
+            query = query.filter(self.model.data_unique_id != exclude_data_unique_id)
+        image_ids = [row[0] for row in query.group_by(self.model.device_type).all()]
+        if not image_ids:
+            return {}
+        images = self.db.query(self.model).filter(self.model.image_id.in_(image_ids)).all()
+        return {image.device_type: image for image in images}
     
     def get_by_data_id(self, data_unique_id: str) -> List[DataImage]:
         """
@@ -65,6 +139,9 @@ class DataImageDAL(BaseDAL):
         for device_type in device_types:
             cache_key = f"data_img:{data_unique_id}:{device_type[0]}"
             self.delete_cache(cache_key)
+            self.delete_cache(f"data_img_meta:{data_unique_id}:{device_type[0]}")
+        # 带图片地址的公开接口的ETag随之变化
+        self._bump_generation()
         
         return result
     
@@ -82,12 +159,14 @@ class DataImageDAL(BaseDAL):
         for device_type in device_types:
             cache_key = f"data_img:{data_unique_id}:{device_type[0]}"
             self.delete_cache(cache_key)
+            self.delete_cache(f"data_img_meta:{data_unique_id}:{device_type[0]}")
         
         # 删除数据库中的记录
         result = self.db.query(self.model).filter_by(
             data_unique_id=data_unique_id
         ).delete()
         self.db.commit()
+        self._bump_generation()
         
         return result
     
@@ -102,6 +181,9 @@ class DataImageDAL(BaseDAL):
         self.db.add(instance)
         self.db.commit()
         self.db.refresh(instance)
+        # 清除批量读取时缓存的"图片不存在"
+        self.delete_cache(f"data_img_meta:{instance.data_unique_id}:{instance.device_type}")
+        self._bump_generation()
         return instance
     
     def update(self, id: int, data: Dict[str, any]) -> DataImage:
@@ -123,4 +205,9 @@ class DataImageDAL(BaseDAL):
         
         self.db.commit()
         self.db.refresh(instance)
+        
+        # 清除按ID缓存的数据，保证get_by_id读取到最新内容
+        self.delete_cache(self._get_cache_key(id))
+        self._publish_invalidation(self._get_cache_key(id))
+        self._bump_generation()
         return instance
@@ -1,7 +1,9 @@
 # 检测相关数据访问层
 # 包含所有检测相关模型的DAL类
 
-from typing import List, Optional, Dict, Any
+import base64
+import json
+from typing import List, Optional, Dict, Any, Tuple
 from app.models.detection import DetectionItem, DetectionParam, DetectionStandard, Category, DelegationFormTemplate, DetectionObject
 from app.dal.base_dal import BaseDAL
 
@@ -13,6 +15,9 @@ from app.dal.base_dal import BaseDAL
 class DetectionParamDAL(BaseDAL):
     """检测参数数据访问层"""
     
+    # 检测规范和委托单模板是selectin预加载的关系，从缓存还原的实例会逐条加载，因此不缓存列表查询
+    cache_list_queries = False
+    
     def __init__(self, db, redis):
         super().__init__(db, redis, DetectionParam)
     
@@ -90,16 +95,14 @@ class DetectionParamDAL(BaseDAL):
         
         return items, total
     
-    def search(self, search_params: Dict[str, Any], fuzzy_fields: Optional[List[str]] = None, 
-              related_fields: Optional[Dict[str, Any]] = None, page: int = 1, limit: int = 10) -> tuple:
+    def _build_search_query(self, search_params: Dict[str, Any], fuzzy_fields: Optional[List[str]] = None,
+                            related_fields: Optional[Dict[str, Any]] = None):
         """
-        搜索检测参数并分页
+        根据搜索参数构建查询，各条件之间为或关系
         :param search_params: 搜索参数字典
         :param fuzzy_fields: 模糊搜索字段列表
         :param related_fields: 关联表搜索配置
-        :param page: 当前页码，默认1
-        :param limit: 每页数量，默认10
-        :return: (检测参数列表, 总记录数)
+        :return: 查询对象
         """
         from sqlalchemy import or_
         
@@ -135,6 +138,110 @@ class DetectionParamDAL(BaseDAL):
         if conditions:
             query = query.filter(or_(*conditions))
         
+        return query
+    
+    @staticmethod
+    def encode_cursor(sort_order: Optional[int], param_id: int) -> str:
+        """
+        将排序键编码为不透明的游标字符串
+        :param sort_order: 最后一条记录的排序序号
+        :param param_id: 最后一条记录的参数ID
+        :return: 游标字符串
+        """
+        raw = json.dumps([sort_order, param_id], separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('utf-8').rstrip('=')
+    
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[Optional[int], int]:
+        """
+        解析游标字符串
+        :param cursor: encode_cursor生成的游标
+        :return: (排序序号, 参数ID)
+        :raises ValueError: 游标格式不正确时抛出
+        """
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            sort_order, param_id = json.loads(base64.urlsafe_b64decode(padded.encode('utf-8')))
+        except Exception:
+            raise ValueError("无效的分页游标")
+        if (sort_order is not None and not isinstance(sort_order, int)) or not isinstance(param_id, int):
+            raise ValueError("无效的分页游标")
+        return sort_order, param_id
+    
+    def get_page_by_cursor(self, cursor: Optional[str] = None, limit: int = 10,
+                           condition: Optional[Dict[str, Any]] = None,
+                           search_params: Optional[Dict[str, Any]] = None,
+                           fuzzy_fields: Optional[List[str]] = None,
+                           related_fields: Optional[Dict[str, Any]] = None,
+                           with_total: bool = False) -> tuple:
+        """
+        按 (sort_order, param_id) 游标分页获取检测参数列表
+        每页只读取limit+1条记录，不使用OFFSET，任意深度的页面开销相同
+        :param cursor: 上一页返回的游标，None表示第一页
+        :param limit: 每页数量，默认10
+        :param condition: 精确匹配的查询条件字典
+        :param search_params: 搜索参数字典，与search方法的规则一致
+        :param fuzzy_fields: 模糊搜索字段列表
+        :param related_fields: 关联表搜索配置
+        :param with_total: 是否统计总记录数（额外执行一次COUNT查询）
+        :return: (检测参数列表, 下一页游标, 总记录数)，没有下一页时游标为None，未统计时总记录数为None
+        :raises ValueError: 游标格式不正确时抛出
+        """
+        from sqlalchemy import and_, or_
+        from sqlalchemy.orm import joinedload, selectinload
+        
+        if search_params:
+            query = self._build_search_query(search_params, fuzzy_fields, related_fields)
+        else:
+            query = self.db.query(self.model)
+        if condition:
+            query = query.filter_by(**condition)
+        
+        total = query.count() if with_total else None
+        
+        sort_column = self.model.sort_order
+        id_column = self.model.param_id
+        if cursor:
+            last_sort_order, last_param_id = self.decode_cursor(cursor)
+            if last_sort_order is None:
+                # 升序排列时sort_order为NULL的记录排在最前
+                query = query.filter(or_(
+                    sort_column.isnot(None),
+                    and_(sort_column.is_(None), id_column > last_param_id)
+                ))
+            else:
+                query = query.filter(or_(
+                    sort_column > last_sort_order,
+                    and_(sort_column == last_sort_order, id_column > last_param_id)
+                ))
+        
+        # 多取一条判断是否还有下一页；规范是一对多关系，使用selectinload避免LIMIT作用在连接后的行上
+        items = query.options(
+            selectinload(self.model.standards),
+            joinedload(self.model.template),
+            joinedload(self.model.item).joinedload(DetectionItem.detection_object)
+        ).order_by(sort_column.asc(), id_column.asc()).limit(limit + 1).all()
+        
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            next_cursor = self.encode_cursor(items[-1].sort_order, items[-1].param_id)
+        
+        return items, next_cursor, total
+    
+    def search(self, search_params: Dict[str, Any], fuzzy_fields: Optional[List[str]] = None, 
+              related_fields: Optional[Dict[str, Any]] = None, page: int = 1, limit: int = 10) -> tuple:
+        """
+        搜索检测参数并分页
+        :param search_params: 搜索参数字典
+        :param fuzzy_fields: 模糊搜索字段列表
+        :param related_fields: 关联表搜索配置
+        :param page: 当前页码，默认1
+        :param limit: 每页数量，默认10
+        :return: (检测参数列表, 总记录数)
+        """
+        query = self._build_search_query(search_params, fuzzy_fields, related_fields)
+        
         # 获取总记录数
         total = query.count()
         
@@ -149,6 +256,19 @@ class DetectionParamDAL(BaseDAL):
         
         return items, total
     
+    def get_standard_ids(self, param_id: int) -> List[int]:
+        """
+        获取检测参数关联的检测规范ID
+        :param param_id: 检测参数ID
+        :return: 升序排列的检测规范ID列表
+        """
+        from app.models.associations import DetectionParamStandard
+        
+        rows = self.db.query(DetectionParamStandard.standard_id).filter(
+            DetectionParamStandard.param_id == param_id
+        ).order_by(DetectionParamStandard.standard_id).all()
+        return [row.standard_id for row in rows]
+    
     def update_standards(self, param_id: int, standard_ids: List[int]) -> bool:
         """
         更新检测参数关联的检测规范
@@ -173,6 +293,8 @@ class DetectionParamDAL(BaseDAL):
             
             # 提交事务
             self.db.commit()
+            # 关联表变化，同时使检测参数的列表缓存失效
+            self._bump_generation(self.model.__tablename__, DetectionParamStandard.__tablename__)
             return True
         except Exception as e:
             self.db.rollback()
@@ -182,6 +304,9 @@ class DetectionParamDAL(BaseDAL):
 class DetectionItemDAL(BaseDAL):
     """检测项目数据访问层"""
     
+    # 所有写操作都经过DAL，列表查询可以按表代数缓存
+    cache_list_queries = True
+    
     def __init__(self, db, redis):
         super().__init__(db, redis, DetectionItem)
     
@@ -198,6 +323,12 @@ class DetectionItemDAL(BaseDAL):
 class DetectionStandardDAL(BaseDAL):
     """检测标准数据访问层"""
     
+    # 所有写操作都经过DAL，列表查询可以按表代数缓存
+    cache_list_queries = True
+    
+    # 数据量小且很少变化，一级缓存保留更久
+    local_cache_ttl = 300
+    
     def __init__(self, db, redis):
         super().__init__(db, redis, DetectionStandard)
     
@@ -215,7 +346,7 @@ class DetectionStandardDAL(BaseDAL):
         :param standard_ids: 检测标准ID列表
         :return: 检测标准列表
         """
-        return self.db.query(self.model).filter(self.model.standard_id.in_(standard_ids)).all()
+        return self.get_many(standard_ids)
     
     def get_by_code(self, standard_code: str) -> Optional[DetectionStandard]:
         """
@@ -230,6 +361,12 @@ class DetectionStandardDAL(BaseDAL):
 class CategoryDAL(BaseDAL):
     """分类数据访问层"""
     
+    # 所有写操作都经过DAL，列表查询可以按表代数缓存
+    cache_list_queries = True
+    
+    # 数据量小且很少变化，一级缓存保留更久
+    local_cache_ttl = 300
+    
     def __init__(self, db, redis):
         super().__init__(db, redis, Category)
     
@@ -271,6 +408,12 @@ class CategoryDAL(BaseDAL):
 class DetectionObjectDAL(BaseDAL):
     """检测对象数据访问层"""
     
+    # 所有写操作都经过DAL，列表查询可以按表代数缓存
+    cache_list_queries = True
+    
+    # 数据量小且很少变化，一级缓存保留更久
+    local_cache_ttl = 300
+    
     def __init__(self, db, redis):
         super().__init__(db, redis, DetectionObject)
     
@@ -305,7 +448,7 @@ class DetectionObjectDAL(BaseDAL):
         :param object_ids: 检测对象ID列表
         :return: 检测对象列表
         """
-        return self.db.query(self.model).filter(self.model.object_id.in_(object_ids)).all()
+        return self.get_many(object_ids)
     
     def search(self, keyword: str, status: Optional[int] = None) -> List[DetectionObject]:
         """
@@ -322,8 +465,7 @@ class DetectionObjectDAL(BaseDAL):
         # 尝试从缓存获取
         cached_result = self.get_cache(cache_key)
         if cached_result:
-            # 缓存中的数据是序列化的，需要重新查询数据库获取关联的对象
-            # 我们可以从缓存中获取ID列表，然后批量查询数据库
+            # 缓存中只保存搜索结果，按ID列表批量获取实例（优先读取按ID的缓存）
             object_ids = [item["object_id"] for item in cached_result]
             if object_ids:
                 return self.get_by_ids(object_ids)
@@ -361,6 +503,9 @@ class DetectionObjectDAL(BaseDAL):
 class DelegationFormTemplateDAL(BaseDAL):
     """委托单模板数据访问层"""
     
+    # 所有写操作都经过DAL，列表查询可以按表代数缓存
+    cache_list_queries = True
+    
     def __init__(self, db, redis):
         super().__init__(db, redis, DelegationFormTemplate)
     
@@ -11,6 +11,9 @@ from app.dal.base_dal import BaseDAL
 class UserDAL(BaseDAL):
     """用户数据访问层，处理用户相关的数据访问操作"""
     
+    # 用户数据涉及认证和权限，始终从数据库读取，不使用读穿透缓存
+    cache_read_through = False
+    
     def __init__(self, db: Session, redis: Redis):
         super().__init__(db, redis, User)
     
@@ -54,5 +57,7 @@ class UserDAL(BaseDAL):
             self.delete_cache(self._get_cache_key(user_id))
             # 删除用户名缓存
             self.delete_cache(f"{self.cache_prefix}username:{username}")
+            # 通知其他worker清除一级缓存
+            self._publish_invalidation(self._get_cache_key(user_id), f"{self.cache_prefix}username:{username}")
         except Exception as e:
             print(f"Redis删除用户缓存失败: {e}")
\ No newline at end of file
@@ -3,10 +3,11 @@
 
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
 from flask_migrate import Migrate
 import redis
-from typing import Generator
+from contextvars import ContextVar
+from typing import Callable, Generator, Iterable, List, Optional, Set
 
 
 # 创建模型基类
@@ -23,6 +24,203 @@ SessionLocal = None
 redis_client = None
 redis_pool = None
 
+# 请求级工作单元
+# 中间件为每个请求创建一个RequestScope，请求内所有服务和DAL共用同一个数据库会话，
+# 请求结束时统一提交一次，缓存失效在提交成功后批量执行
+
+class RequestSession(Session):
+    """
+    数据库会话，在请求级工作单元中commit只执行flush，由RequestScope在请求结束时统一提交
+    每次推迟的commit之后开启一个SAVEPOINT，之后的rollback只回滚到上一次commit的位置，
+    与不推迟提交时一样，已commit的修改不会被之后的失败撤销
+    """
+    
+    def commit(self) -> None:
+        scope = self.info.get('request_scope')
+        if scope is not None and scope.deferring:
+            self.flush()
+            savepoint = self.info.pop('request_savepoint', None)
+            if savepoint is not None and savepoint.is_active:
+                savepoint.commit()
+            self.info['request_savepoint'] = self.begin_nested()
+            # 与真正提交一样使所有实例过期，提交后重新加载的关系（如检测参数的规范）读到的是本次写入的数据
+            self.expire_all()
+            scope.has_writes = True
+            return
+        self.info.pop('request_savepoint', None)
+        super().commit()
+    
+    def rollback(self) -> None:
+        scope = self.info.get('request_scope')
+        savepoint = self.info.pop('request_savepoint', None)
+        if scope is not None and scope.deferring:
+            if savepoint is not None and savepoint.is_active:
+                try:
+                    # 只撤销上一次commit之后的修改；已登记的缓存失效保留，多删除缓存只会多一次未命中
+                    savepoint.rollback()
+                    self.info['request_savepoint'] = self.begin_nested()
+                    return
+                except Exception:
+                    # 数据库已回滚整个事务（如死锁），之前commit的修改也已丢失，请求不能再提交
+                    scope.failed = True
+            elif scope.has_writes:
+                scope.failed = True
+            super().rollback()
+            return
+        if scope is not None:
+            # 事务回滚后，已登记的缓存失效和提交后回调都不再执行
+            scope.discard_pending()
+        super().rollback()
+
+
+class RequestScope:
+    """请求级工作单元，持有请求内共享的数据库会话和提交后执行的缓存失效"""
+    
+    def __init__(self):
+        self.db: Optional[Session] = None
+        # 请求处理中为True，此时会话的commit被推迟到请求结束
+        self.deferring = True
+        self.closed = False
+        # 本次请求是否已执行过写操作（调用过commit）
+        self.has_writes = False
+        # 已commit的修改是否已随整个事务回滚，为True时请求结束时不再提交
+        self.failed = False
+        self.invalidated_keys: Set[str] = set()
+        self.generation_tables: Set[str] = set()
+        self.after_commit_callbacks: List[Callable[[], None]] = []
+    
+    @property
+    def redis(self):
+        return redis_client
+    
+    def get_db(self) -> Session:
+        """获取请求共享的数据库会话，首次使用时才创建（检出连接）"""
+        if self.db is None:
+            self.db = SessionLocal()
+            self.db.info['request_scope'] = self
+        return self.db
+    
+    def invalidate(self, keys: Iterable[str] = (), tables: Iterable[str] = ()) -> None:
+        """
+        登记提交成功后需要删除并广播失效的缓存键，以及需要递增代数的表
+        :param keys: 缓存键
+        :param tables: 表名
+        """
+        self.invalidated_keys.update(keys)
+        self.generation_tables.update(tables)
+    
+    def after_commit(self, callback: Callable[[], None]) -> None:
+        """
+        登记提交成功后执行的回调
+        :param callback: 无参函数
+        """
+        self.after_commit_callbacks.append(callback)
+    
+    def discard_pending(self) -> None:
+        """丢弃已登记的缓存失效和回调"""
+        self.invalidated_keys.clear()
+        self.generation_tables.clear()
+        self.after_commit_callbacks.clear()
+    
+    def commit(self) -> None:
+        """提交请求事务，成功后批量执行缓存失效和回调；失败时回滚并抛出异常"""
+        self.deferring = False
+        if self.db is None:
+            return
+        if self.failed:
+            self.rollback()
+            raise RuntimeError("请求中已commit的修改已随事务回滚，不能提交")
+        try:
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        self._run_after_commit()
+    
+    def rollback(self) -> None:
+        """回滚请求事务"""
+        self.deferring = False
+        if self.db is not None:
+            self.db.rollback()
+        self.discard_pending()
+    
+    def close(self) -> None:
+        """关闭请求共享的数据库会话，归还连接"""
+        self.deferring = False
+        self.closed = True
+        if self.db is not None:
+            try:
+                self.db.close()
+            except Exception:
+                pass
+    
+    def _run_after_commit(self) -> None:
+        """批量执行提交后的缓存失效：一次pipeline删除、一次广播、一次递增代数"""
+        from app.utils.redis_utils import RedisUtils, local_cache
+        
+        keys = list(self.invalidated_keys)
+        tables = list(self.generation_tables)
+        callbacks = list(self.after_commit_callbacks)
+        self.discard_pending()
+        
+        for key in keys:
+            local_cache.delete(key)
+        if self.redis:
+            if keys:
+                RedisUtils.delete_many_cache(self.redis, keys)
+                RedisUtils.publish_invalidation(self.redis, keys)
+            if tables:
+                RedisUtils.bump_generations(self.redis, *tables)
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"执行提交后回调失败: {str(e)}")
+
+
+# 当前请求的工作单元，由中间件设置
+_request_scope: ContextVar[Optional[RequestScope]] = ContextVar('request_scope', default=None)
+
+
+def begin_request_scope():
+    """
+    为当前请求创建工作单元
+    :return: (工作单元, 用于end_request_scope的令牌)
+    """
+    scope = RequestScope()
+    return scope, _request_scope.set(scope)
+
+
+def end_request_scope(token) -> None:
+    """
+    结束当前请求的工作单元
+    :param token: begin_request_scope返回的令牌
+    """
+    _request_scope.reset(token)
+
+
+def get_request_scope() -> Optional[RequestScope]:
+    """
+    获取当前请求的工作单元
+    :return: 请求处理中返回工作单元，否则（脚本、后台线程或请求已结束）返回None
+    """
+    scope = _request_scope.get()
+    if scope is None or scope.closed:
+        return None
+    return scope
+
+
+def run_after_commit(callback: Callable[[], None]) -> None:
+    """
+    在请求事务提交成功后执行回调，不在请求中时立即执行
+    :param callback: 无参函数
+    """
+    scope = get_request_scope()
+    if scope is not None and scope.deferring:
+        scope.after_commit(callback)
+    else:
+        callback()
+
 # 初始化数据库函数
 
 def init_db(app_config):
@@ -90,13 +288,18 @@ def init_db(app_config):
         pool_recycle=3600  # 连接的回收时间，默认为-1（不回收）
     )
     print(f"Engine created: {engine}")
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=RequestSession)
     print(f"SessionLocal created: {SessionLocal}")
     return engine, SessionLocal
 
 # 获取数据库会话的依赖函数
 def get_db():
-    """获取数据库会话的依赖函数"""
+    """获取数据库会话的依赖函数，请求中返回请求共享的会话"""
+    scope = get_request_scope()
+    if scope is not None:
+        # 请求共享的会话由中间件提交和关闭
+        yield scope.get_db()
+        return
     db = SessionLocal()
     try:
         yield db
@@ -160,7 +363,14 @@ def get_db_and_redis() -> Generator[tuple, None, None]:
     支持两种使用方式：
     1. 作为FastAPI依赖注入：yield的finally块会自动执行，关闭数据库会话
     2. 直接调用next()：返回(db, redis)元组，需要手动关闭数据库会话
+    请求中返回请求共享的会话，由中间件提交和关闭
     """
+    scope = get_request_scope()
+    if scope is not None:
+        if not redis_client:
+            raise RuntimeError("Redis client not initialized. Call init_redis() first.")
+        yield scope.get_db(), redis_client
+        return
     db = None
     try:
         # 获取数据库会话
@@ -187,7 +397,16 @@ def get_db_redis_direct() -> tuple:
     - db: 数据库会话
     - redis_client: Redis客户端，如果未初始化则返回None
     - close_func: 关闭资源的函数，调用后会关闭数据库会话
+    
+    请求中返回请求共享的会话，close_func不做任何操作，会话由中间件提交和关闭
     """
+    # 获取Redis客户端，如果未初始化则返回None
+    redis_instance = redis_client if redis_client else None
+    
+    scope = get_request_scope()
+    if scope is not None:
+        return scope.get_db(), redis_instance, lambda: None
+    
     # 创建新的数据库会话
     db = SessionLocal()
     
@@ -198,7 +417,4 @@ def get_db_redis_direct() -> tuple:
         except Exception:
             pass
     
-    # 获取Redis客户端，如果未初始化则返回None
-    redis_instance = redis_client if redis_client else None
-    
     return db, redis_instance, close_func
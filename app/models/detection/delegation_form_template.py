@@ -53,9 +53,21 @@ class DelegationFormTemplate(Base):
         根据检测项目名称、模板名称、模板编号和文件类型生成统一的文件路径
         文件路径格式：/static/templates/delegation_form_templates/{模板名称}{模板编号}.{文件类型}
         """
+        return DelegationFormTemplate.build_file_path(self.template_name, self.template_code, self.file_type)
+    
+    @staticmethod
+    def build_file_path(template_name, template_code, file_type):
+        """
+        由模板名称、模板编号和文件类型生成文件路径，只查询这几列时无需加载模板实例
+        
+        :param template_name: 模板名称
+        :param template_code: 模板编号
+        :param file_type: 文件类型
+        :return: 文件路径
+        """
         # 移除file_type中的点，因为这里会添加
-        file_extension = self.file_type[1:] if self.file_type.startswith('.') else self.file_type
-        return f"/static/templates/delegation_form_templates/{self.template_name}{self.template_code}.{file_extension}"
+        file_extension = file_type[1:] if file_type.startswith('.') else file_type
+        return f"/static/templates/delegation_form_templates/{template_name}{template_code}.{file_extension}"
     
     def to_dict(self):
         """
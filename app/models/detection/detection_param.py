@@ -3,7 +3,7 @@
 # 主要用于管理单个检测参数的详细信息，如名称、价格、单位等
 
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from app.extensions import Base
 
@@ -48,8 +48,10 @@ class DetectionParam(Base):
     sample_image_path = Column(String(255), nullable=True, comment='取样方法示意图路径')
     
     # 唯一约束：同一项目下参数名称唯一
+    # 索引：游标分页按 (sort_order, param_id) 排序和定位
     __table_args__ = (
         UniqueConstraint('item_id', 'param_name', name='_item_param_uc'),
+        Index('ix_detection_param_sort_order_param_id', 'sort_order', 'param_id'),
     )
     
     # 时间戳
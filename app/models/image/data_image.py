@@ -19,7 +19,10 @@ class DataImage(Base):
     device_type = Column(String(20), nullable=False, index=True, comment="设备类型：pc/phone/tablet")
     svg_content = Column(Text(length=16777215), nullable=False, comment="SVG原始字符串")
     png_data = Column(LargeBinary(length=16777215), nullable=False, comment="PNG位图二进制数据")
+    svg_gzip = Column(LargeBinary(length=16777215), nullable=True, comment="SVG的gzip预压缩数据")
+    svg_br = Column(LargeBinary(length=16777215), nullable=True, comment="SVG的brotli预压缩数据")
     version = Column(Integer, default=1, comment="版本号")
+    content_hash = Column(String(64), nullable=True, index=True, comment="渲染内容指纹：清洗后的参数行和渲染配置的哈希")
     
     # 时间戳
     created_at = Column(DateTime, default=datetime.utcnow, comment="创建时间")
@@ -10,11 +10,13 @@ def register_admin_routes():
     from .users import router as users_router
     from .roles import router as roles_router
     from .permissions import router as permissions_router
+    from .diagnostics import router as diagnostics_router
     
     # 注册路由
     router.include_router(users_router)
     router.include_router(roles_router)
     router.include_router(permissions_router)
+    router.include_router(diagnostics_router)
     
     return router
 
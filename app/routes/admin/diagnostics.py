@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends
+from app.models.user.user import User
+from app.schemas.detection import ResponseModel
+from app.utils.font_registry import font_registry
+from .dependencies import get_current_admin
+
+
+router = APIRouter(prefix="/diagnostics", tags=["系统诊断"])
+
+
+@router.get("/fonts", response_model=ResponseModel, summary="获取字体解析结果")
+def get_font_diagnostics(
+    current_admin: User = Depends(get_current_admin)
+):
+    """
+    获取图片渲染使用的字体（仅管理员）
+
+    返回的是Web服务进程的字体注册表，渲染worker进程使用相同的搜索路径和解析规则
+
+    - **search_path**: 字体搜索路径及目录是否存在
+    - **font_files**: 扫描到的字体文件数量
+    - **roles**: 正文、表头、水印解析到的字体文件，cjk为false时中文会显示为方框
+    - **loaded**: 当前进程已加载的字体和字号
+    """
+    return ResponseModel(data=font_registry.diagnostics(), message="获取字体解析结果成功")
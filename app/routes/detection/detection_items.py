@@ -5,6 +5,7 @@ from app.schemas.detection import (
     ResponseModel, ListResponseModel
 )
 from app.services.detection import DetectionItemService
+from app.services.image.render_queue_service import RenderQueueService
 
 # 创建路由实例
 router = APIRouter()
@@ -79,3 +80,28 @@ def delete_item(item_id: int):
             return ResponseModel(code=400, message=error, data=None)
         return ResponseModel(code=500, message=error, data=None)
     return ResponseModel(code=200, message="删除检测项目成功", data=None)
+
+
+@router.get("/items/{item_id}/render-job", response_model=ResponseModel)
+def get_item_render_job(item_id: int):
+    """获取检测项目图片渲染任务的状态：pending/running/retrying/done/failed"""
+    job, error = RenderQueueService.get_job_status(item_id)
+    if error:
+        if "没有渲染任务" in error:
+            return ResponseModel(code=404, message=error, data=None)
+        return ResponseModel(code=500, message=error, data=None)
+    return ResponseModel(code=200, message="获取渲染任务状态成功", data=job)
+
+
+@router.post("/items/{item_id}/render-job", response_model=ResponseModel)
+def create_item_render_job(item_id: int):
+    """立即把检测项目的图片重新生成任务放入渲染队列"""
+    item, error = DetectionItemService.get_by_id(item_id)
+    if error:
+        if "不存在" in error:
+            return ResponseModel(code=404, message=error, data=None)
+        return ResponseModel(code=500, message=error, data=None)
+    job, error = RenderQueueService.request_render(item_id, item['item_name'])
+    if error:
+        return ResponseModel(code=500, message=error, data=None)
+    return ResponseModel(code=202, message="渲染任务已入队", data=job)
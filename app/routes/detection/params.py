@@ -2,7 +2,7 @@ from fastapi import APIRouter, HTTPException, Query
 from typing import Optional
 from app.schemas.detection import (
     DetectionParamCreate, DetectionParamUpdate, DetectionParamResponse,
-    ResponseModel, ListResponseModel
+    ResponseModel, ListResponseModel, CursorListResponseModel
 )
 from app.services.detection import DetectionParamService
 
@@ -10,16 +10,23 @@ from app.services.detection import DetectionParamService
 router = APIRouter()
 
 
-@router.get("/params", response_model=ListResponseModel[DetectionParamResponse])
+@router.get("/params", response_model=CursorListResponseModel[DetectionParamResponse])
 def get_params(
     page: int = Query(1, ge=1, description="当前页码"),
     limit: int = Query(100, ge=1, le=1000, description="每页数量"),
     param_name: Optional[str] = Query(None, description="检测参数名称"),
     material_name: Optional[str] = Query(None, description="材料名称"),
     item_id: Optional[int] = Query(None, description="项目ID"),
-    status: Optional[int] = Query(None, description="状态：1=启用，0=禁用")
+    status: Optional[int] = Query(None, description="状态：1=启用，0=禁用"),
+    mode: str = Query("page", pattern="^(page|cursor)$", description="分页方式：page=页码分页，cursor=游标分页"),
+    cursor: Optional[str] = Query(None, description="游标分页时上一页返回的next_cursor，不传表示第一页"),
+    include_total: bool = Query(False, description="游标分页时是否统计总数（额外执行一次COUNT查询）")
 ):
-    """获取所有检测参数，支持分页和过滤"""
+    """获取所有检测参数，支持分页和过滤
+    
+    mode=cursor时按 (sort_order, param_id) 游标分页，响应中的next_cursor用于获取下一页，
+    每页开销与页码无关；未设置include_total时total为-1
+    """
     # 构建过滤参数
     filter_params = {}
     if item_id is not None:
@@ -27,6 +34,28 @@ def get_params(
     if status is not None:
         filter_params["status"] = status
     
+    if mode == "cursor":
+        search_params = {}
+        if param_name:
+            search_params["param_name"] = param_name
+        if material_name:
+            search_params["material_name"] = material_name
+        
+        params, next_cursor, total, error = DetectionParamService.get_by_cursor(
+            cursor=cursor, limit=limit, condition=filter_params or None,
+            search_params=search_params or None, with_total=include_total
+        )
+        if error:
+            if "游标" in error:
+                raise HTTPException(status_code=400, detail=error)
+            raise HTTPException(status_code=500, detail=error)
+        
+        param_dicts = [param.to_dict(include_standards=True, include_template=True) for param in params]
+        return CursorListResponseModel(
+            code=200, message="获取检测参数列表成功", data=param_dicts,
+            total=total if total is not None else -1, next_cursor=next_cursor
+        )
+    
     # 判断是否需要搜索
     if param_name or material_name:
         search_params = {}
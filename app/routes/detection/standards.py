@@ -1,8 +1,8 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from typing import Optional
 from app.schemas.detection import (
     DetectionStandardCreate, DetectionStandardUpdate, DetectionStandardResponse,
-    ResponseModel, ListResponseModel
+    ResponseModel, CursorListResponseModel
 )
 from app.services.detection import DetectionStandardService
 
@@ -10,25 +10,38 @@ from app.services.detection import DetectionStandardService
 router = APIRouter()
 
 
-@router.get("/standards", response_model=ListResponseModel[DetectionStandardResponse])
-def get_standards(page: int = 1, limit: int = 100, status: Optional[int] = None):
-    """获取所有检测规范，支持分页和状态筛选"""
-    if status is not None:
-        # 按状态获取检测规范
-        standards, error = DetectionStandardService.get_by_status(status)
-    else:
-        # 获取所有检测规范
-        standards, error = DetectionStandardService.get_all()
+@router.get("/standards", response_model=CursorListResponseModel[DetectionStandardResponse])
+def get_standards(
+    page: int = Query(1, ge=1, description="当前页码"),
+    limit: int = Query(100, ge=1, le=1000, description="每页数量"),
+    status: Optional[int] = Query(None, description="状态：1=有效，0=作废，2=待生效"),
+    mode: str = Query("page", pattern="^(page|cursor)$", description="分页方式：page=页码分页，cursor=游标分页"),
+    cursor: Optional[str] = Query(None, description="游标分页时上一页返回的next_cursor，不传表示第一页"),
+    include_total: bool = Query(False, description="游标分页时是否统计总数（额外执行一次COUNT查询）")
+):
+    """获取所有检测规范，支持分页和状态筛选
+    
+    分页和筛选在数据库中完成，按规范ID排序；mode=cursor时按规范ID游标分页，
+    响应中的next_cursor用于获取下一页，未设置include_total时total为-1
+    """
+    use_cursor = mode == "cursor"
+    standards, next_cursor, total, error = DetectionStandardService.get_page(
+        page=1 if use_cursor else page, limit=limit, status=status,
+        cursor=cursor if use_cursor else None,
+        with_total=include_total or not use_cursor
+    )
     
     if error:
+        if "游标" in error:
+            raise HTTPException(status_code=400, detail=error)
         raise HTTPException(status_code=500, detail=error)
     
-    # 处理分页
-    start = (page - 1) * limit
-    end = start + limit
-    paginated_standards = standards[start:end]
-    
-    return {"data": paginated_standards, "total": len(standards), "message": "获取检测规范列表成功"}
+    return {
+        "data": standards,
+        "total": total if total is not None else -1,
+        "next_cursor": next_cursor if use_cursor else None,
+        "message": "获取检测规范列表成功"
+    }
 
 
 @router.get("/standards/{standard_id}", response_model=ResponseModel[DetectionStandardResponse])
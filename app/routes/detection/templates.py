@@ -1,8 +1,8 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends, Query
 from typing import Optional
 from app.schemas.detection import (
     DelegationFormTemplateCreate, DelegationFormTemplateUpdate, DelegationFormTemplateResponse,
-    ResponseModel, ListResponseModel
+    ResponseModel, CursorListResponseModel
 )
 from app.services.detection import DelegationFormTemplateService
 from app.services.detection.utils.file_utils import is_allowed_file
@@ -13,28 +13,39 @@ from app.models.user.user import User
 router = APIRouter()
 
 
-@router.get("/templates", response_model=ListResponseModel[DelegationFormTemplateResponse])
-def get_templates(page: int = 1, limit: int = 100, search_keyword: Optional[str] = None, status: Optional[int] = None):
-    """获取委托单模板列表，支持分页、搜索和状态筛选"""
-    if search_keyword:
-        # 执行搜索，同时传递status参数进行过滤
-        templates, error = DelegationFormTemplateService.search(search_keyword, status)
-    elif status is not None:
-        # 按状态获取模板
-        templates, error = DelegationFormTemplateService.get_by_status(status)
-    else:
-        # 获取所有模板
-        templates, error = DelegationFormTemplateService.get_all()
+@router.get("/templates", response_model=CursorListResponseModel[DelegationFormTemplateResponse])
+def get_templates(
+    page: int = Query(1, ge=1, description="当前页码"),
+    limit: int = Query(100, ge=1, le=1000, description="每页数量"),
+    search_keyword: Optional[str] = Query(None, description="搜索关键词，匹配模板名称或模板编号"),
+    status: Optional[int] = Query(None, description="状态：1=启用，0=禁用"),
+    mode: str = Query("page", pattern="^(page|cursor)$", description="分页方式：page=页码分页，cursor=游标分页"),
+    cursor: Optional[str] = Query(None, description="游标分页时上一页返回的next_cursor，不传表示第一页"),
+    include_total: bool = Query(False, description="游标分页时是否统计总数（额外执行一次COUNT查询）")
+):
+    """获取委托单模板列表，支持分页、搜索和状态筛选
+    
+    分页、搜索和筛选在数据库中完成，按模板ID排序，只为本页模板生成下载链接；
+    mode=cursor时按模板ID游标分页，未设置include_total时total为-1
+    """
+    use_cursor = mode == "cursor"
+    templates, next_cursor, total, error = DelegationFormTemplateService.get_page(
+        page=1 if use_cursor else page, limit=limit, search_keyword=search_keyword, status=status,
+        cursor=cursor if use_cursor else None,
+        with_total=include_total or not use_cursor
+    )
     
     if error:
+        if "游标" in error:
+            raise HTTPException(status_code=400, detail=error)
         raise HTTPException(status_code=500, detail=error)
     
-    # 处理分页
-    start = (page - 1) * limit
-    end = start + limit
-    paginated_templates = templates[start:end]
-    
-    return {"data": paginated_templates, "total": len(templates), "message": "获取委托单模板列表成功"}
+    return {
+        "data": templates,
+        "total": total if total is not None else -1,
+        "next_cursor": next_cursor if use_cursor else None,
+        "message": "获取委托单模板列表成功"
+    }
 
 
 @router.get("/templates/{template_id}", response_model=ResponseModel[DelegationFormTemplateResponse])
@@ -1,11 +1,13 @@
 # 图片相关路由
 # 包含公开的图片获取接口
 
-from fastapi import APIRouter, Query, Response, HTTPException, status, Body
+from fastapi import APIRouter, Path, Query, Request, Response, HTTPException, status, Body
+from fastapi.responses import RedirectResponse
 from pydantic import BaseModel
 from app.services.image.image_service import ImageService
 from app.services.detection.detection_param_service import DetectionParamService
-from app.schemas.detection import ResponseModel
+from app.schemas.detection import ResponseModel, ItemImageBatchRequest
+from app.core.http_cache import make_etag, is_not_modified, not_modified_response, set_cache_headers
 
 
 # 创建路由实例
@@ -20,6 +22,81 @@ class DetectionImageRequest(BaseModel):
     device_type: str = "pc"
 
 
+@router.post(":batch", response_model=ResponseModel, summary="批量获取检测项目图片地址")
+def get_images_batch(
+    request: ItemImageBatchRequest = Body(..., description="检测项目图片地址批量请求")
+):
+    """
+    批量获取多个检测项目的图片地址，一个页面的所有检测项目只需一次请求
+    
+    - **item_ids**: 检测项目ID列表，最多100个
+    - **device_type**: 设备类型，可选值：pc/phone/tablet，默认：pc
+    - **image_type**: 图片类型，可选值：png或svg，默认：png
+    
+    返回检测项目ID → 带版本号的图片地址，图片尚未生成的检测项目对应null
+    """
+    data_unique_ids = {item_id: f"detection:{item_id}" for item_id in request.item_ids}
+    metas = ImageService.get_image_metas(list(data_unique_ids.values()), request.device_type)
+    
+    result = {}
+    for item_id, data_unique_id in data_unique_ids.items():
+        meta = metas.get(data_unique_id)
+        result[item_id] = ImageService.get_image_url(
+            data_unique_id, request.device_type, meta['version'], request.image_type
+        ) if meta else None
+    
+    return ResponseModel(data=result, message="批量获取图片地址成功")
+
+
+@router.get("/{data_unique_id}/{device_type}/v{version}.{image_type}", summary="获取指定版本的图片")
+def get_versioned_image(
+    request: Request,
+    data_unique_id: str,
+    device_type: str = Path(..., description="设备类型：pc/phone/tablet", regex="^(pc|phone|tablet)$"),
+    version: int = Path(..., description="图片版本号", ge=1),
+    image_type: str = Path(..., description="图片类型：png或svg", regex="^(png|svg)$")
+):
+    """
+    根据数据唯一标识、设备类型和版本号获取图片
+    
+    - **data_unique_id**: 数据唯一标识
+    - **device_type**: 设备类型，必须是pc、phone或tablet中的一个
+    - **version**: 图片版本号
+    - **image_type**: 图片类型，png或svg
+    
+    同一地址的内容不会变化，返回长期缓存的PNG或SVG图片；版本号不是当前版本时重定向到当前版本的地址
+    """
+    etag = make_etag('img', data_unique_id, device_type, image_type, version)
+    if is_not_modified(request, etag):
+        return not_modified_response('image_immutable', etag)
+    
+    image_data, content_encoding = ImageService.get_versioned_image(
+        data_unique_id, device_type, version, image_type, request.headers.get('accept-encoding')
+    )
+    if image_data is None:
+        # 旧版本不再保存，重定向到当前版本，重定向本身不能长期缓存
+        meta = ImageService.get_image_meta(data_unique_id, device_type)
+        if not meta or meta['version'] < version:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="图片版本不存在")
+        response = RedirectResponse(
+            ImageService.get_image_url(data_unique_id, device_type, meta['version'], image_type),
+            status_code=status.HTTP_302_FOUND
+        )
+        set_cache_headers(response, 'image')
+        return response
+    
+    media_type = "image/png" if image_type == "png" else "image/svg+xml"
+    response = Response(content=image_data, media_type=media_type)
+    if image_type == "svg":
+        # 预压缩的SVG直接返回，压缩后的表示使用弱ETag
+        response.headers['Vary'] = 'Accept-Encoding'
+        if content_encoding:
+            response.headers['Content-Encoding'] = content_encoding
+            etag = 'W/' + etag
+    set_cache_headers(response, 'image_immutable', etag)
+    return response
+
+
 @router.get("/{data_unique_id}", summary="获取图片")
 def get_image(
     data_unique_id: str,
@@ -33,8 +110,18 @@ def get_image(
     - **device_type**: 设备类型，必须是pc、phone或tablet中的一个
     - **image_type**: 图片类型，可选值：png或svg，默认：png
     
-    返回PNG或SVG图片，可直接用于img标签的src属性
+    图片存在时重定向到带版本号的地址，可直接用于img标签的src属性；图片不存在时返回占位图
     """
+    # 只读取缓存的版本号，不读取图片内容
+    meta = ImageService.get_image_meta(data_unique_id, device_type)
+    if meta:
+        response = RedirectResponse(
+            ImageService.get_image_url(data_unique_id, device_type, meta['version'], image_type),
+            status_code=status.HTTP_302_FOUND
+        )
+        set_cache_headers(response, 'image')
+        return response
+    
     # 使用ImageService获取图片数据
     image_data = ImageService.get_image(data_unique_id, device_type, image_type)
     
@@ -42,7 +129,10 @@ def get_image(
     media_type = "image/png" if image_type == "png" else "image/svg+xml"
     
     # 返回Response对象，包含图片数据和正确的media_type
-    return Response(content=image_data, media_type=media_type)
+    # 占位图不带校验器，图片生成后客户端能立即获取到新图片
+    response = Response(content=image_data, media_type=media_type)
+    set_cache_headers(response, 'image')
+    return response
 
 
 @router.post("/detection", response_model=ResponseModel, summary="生成检测参数图片")
@@ -1,46 +1,104 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, Request, Response
 from typing import Optional
 from app.schemas.detection import (
-    ListResponseModel
-)
-from app.services.detection import (
-    CategoryService,
-    DetectionObjectService,
-    DetectionItemService,
-    DetectionParamService
+    ListResponseModel, ResponseModel, ItemBatchRequest
 )
+from app.services.detection import CatalogSnapshotService, SuggestService, ItemBundleService
+from app.services.image.image_service import ImageService
 from app.services.utils.link_generator import LinkGeneratorService
+from app.core.concurrency import run_blocking
+from app.core.http_cache import make_etag, is_not_modified, not_modified_response, set_cache_headers
 
 # 创建路由实例
 router = APIRouter(prefix="/detection", tags=["public/detection"])
 
 
+async def _get_snapshot(version=None):
+    """
+    获取目录快照，需要重建时在线程池中查询数据库
+    :param version: 已读取的目录表代数
+    :return: 目录快照
+    """
+    snapshot, error = await run_blocking(CatalogSnapshotService.get_snapshot, version)
+    if error:
+        raise HTTPException(status_code=500, detail=error)
+    return snapshot
+
+
+async def _with_images(items) -> list:
+    """
+    为检测项目列表附加各设备类型带版本号的图片地址，图片版本不在目录快照中，按请求批量读取
+    :param items: 检测项目列表，每项包含item_id
+    :return: 新的检测项目列表，每项增加images字段（设备类型 → 图片地址）
+    """
+    image_urls = await run_blocking(ImageService.get_detection_image_urls, [item['item_id'] for item in items])
+    return [dict(item, images=image_urls.get(item['item_id'], {})) for item in items]
+
+
+async def _check_not_modified(request: Request, *parts, use_last_modified: bool = True, with_images: bool = False):
+    """
+    用目录表代数生成ETag并处理条件请求，只读取Redis，不访问数据库和快照
+    Last-Modified取各表最近一次递增代数的时间，删除记录、修改关联表和模板后同样会变化
+    :param request: 请求对象
+    :param parts: 除表代数外决定响应内容的其他信息
+    :param use_last_modified: 是否支持If-Modified-Since，响应内容还随时间变化时应关闭
+    :param with_images: 响应是否包含检测项目图片地址，包含时ETag和Last-Modified也随图片重新生成变化
+    :return: (校验器, 可返回的304响应或None)，校验器包含version、parts、etag和last_modified，Redis不可用时均为None
+    """
+    version, image_generation, last_modified = await run_blocking(
+        CatalogSnapshotService.get_validators, with_images
+    )
+    if version is None:
+        return {'version': None, 'parts': parts, 'etag': None, 'last_modified': None}, None
+    if with_images:
+        parts = (*parts, 'img', image_generation)
+    etag = make_etag('catalog', version, *parts, weak=True)
+    if not use_last_modified:
+        last_modified = None
+    validators = {'version': version, 'parts': parts, 'etag': etag, 'last_modified': last_modified}
+    if is_not_modified(request, etag, last_modified):
+        return validators, not_modified_response('catalog', etag, last_modified)
+    return validators, None
+
+
+def _set_served_cache_headers(response: Response, snapshot_version, validators: dict) -> None:
+    """
+    按实际使用的快照设置缓存头
+    其他线程正在重建快照时使用的是旧快照，此时ETag按旧快照的版本生成，并且不返回Last-Modified，
+    避免旧内容以新版本的校验器被客户端缓存，之后的条件请求一直返回304
+    :param response: 响应对象
+    :param snapshot_version: 实际使用的快照的表代数
+    :param validators: _check_not_modified返回的校验器
+    """
+    if snapshot_version is None:
+        set_cache_headers(response, 'catalog')
+    elif snapshot_version == validators['version']:
+        set_cache_headers(response, 'catalog', validators['etag'], validators['last_modified'])
+    else:
+        set_cache_headers(response, 'catalog', make_etag('catalog', snapshot_version, *validators['parts'], weak=True))
+
+
+def _signed_url_bucket() -> int:
+    """
+    当前时间所在的下载链接时间段，同一时间段内生成的下载链接完全相同
+    :return: 时间段内链接的过期时间戳
+    """
+    return LinkGeneratorService.get_signed_url_window()[1]
+
+
 @router.get("/categories", response_model=ListResponseModel[dict])
-async def get_public_categories():
+async def get_public_categories(request: Request, response: Response):
     """
     获取所有分类的（id和名称）列表，按排序号顺序返回（只返回状态为启用的数据）
     """
     try:
-        # 获取所有分类
-        categories, error = CategoryService.get_all()
-        if error:
-            raise HTTPException(status_code=500, detail=error)
-        
-        # 确保categories不是None
-        if not categories:
-            categories = []
-        
-        # 过滤出状态为启用的数据，按排序号排序
-        enabled_categories = sorted(
-            [cat for cat in categories if cat['status'] == 1],
-            key=lambda x: x['sort_order']
-        )
-        
-        # 只返回id和名称
-        result = [{
-            "category_id": cat["category_id"],
-            "category_name": cat["category_name"]
-        } for cat in enabled_categories]
+        validators, not_modified = await _check_not_modified(request)
+        if not_modified is not None:
+            return not_modified
+        # 目录快照中的分类已过滤并排序
+        snapshot = await _get_snapshot(validators['version'])
+        _set_served_cache_headers(response, snapshot.version, validators)
+        result = list(snapshot.categories)
         
         return {
             "code": 200,
@@ -55,31 +113,17 @@ async def get_public_categories():
 
 
 @router.get("/categories/{category_id}/objects", response_model=ListResponseModel[dict])
-async def get_public_category_objects(category_id: int):
+async def get_public_category_objects(category_id: int, request: Request, response: Response):
     """
     获取某一ID分类下所有检测对象的（id和名称）列表，按排序号顺序返回（只返回状态为启用的数据）
     """
     try:
-        # 获取分类下的所有检测对象
-        objects, error = DetectionObjectService.get_by_category_id(category_id)
-        if error:
-            raise HTTPException(status_code=500, detail=error)
-        
-        # 确保objects不是None
-        if not objects:
-            objects = []
-        
-        # 过滤出状态为启用的数据，按排序号排序
-        enabled_objects = sorted(
-            [obj for obj in objects if obj['status'] == 1],
-            key=lambda x: x['sort_order']
-        )
-        
-        # 只返回id和名称
-        result = [{
-            "object_id": obj['object_id'],
-            "object_name": obj['object_name']
-        } for obj in enabled_objects]
+        validators, not_modified = await _check_not_modified(request)
+        if not_modified is not None:
+            return not_modified
+        snapshot = await _get_snapshot(validators['version'])
+        _set_served_cache_headers(response, snapshot.version, validators)
+        result = list(snapshot.get_objects(category_id))
         
         return {
             "code": 200,
@@ -94,31 +138,17 @@ async def get_public_category_objects(category_id: int):
 
 
 @router.get("/objects/{object_id}/items", response_model=ListResponseModel[dict])
-async def get_public_object_items(object_id: int):
+async def get_public_object_items(object_id: int, request: Request, response: Response):
     """
-    获取某一ID检测对象下所有检测项目的（id和名称）列表，按排序号顺序返回（只返回状态为启用的数据）
+    获取某一ID检测对象下所有检测项目的（id、名称和各设备类型带版本号的图片地址）列表，按排序号顺序返回（只返回状态为启用的数据）
     """
     try:
-        # 获取检测对象下的所有检测项目
-        items, error = DetectionItemService.get_by_object_id(object_id)
-        if error:
-            raise HTTPException(status_code=500, detail=error)
-        
-        # 确保items不是None
-        if not items:
-            items = []
-        
-        # 过滤出状态为启用的数据，按排序号排序
-        enabled_items = sorted(
-            [item for item in items if item['status'] == 1],
-            key=lambda x: x['sort_order']
-        )
-        
-        # 只返回id和名称
-        result = [{
-            "item_id": item['item_id'],
-            "item_name": item['item_name']
-        } for item in enabled_items]
+        validators, not_modified = await _check_not_modified(request, with_images=True)
+        if not_modified is not None:
+            return not_modified
+        snapshot = await _get_snapshot(validators['version'])
+        _set_served_cache_headers(response, snapshot.version, validators)
+        result = await _with_images(snapshot.get_items(object_id))
         
         return {
             "code": 200,
@@ -133,45 +163,29 @@ async def get_public_object_items(object_id: int):
 
 
 @router.get("/items/{item_id}/templates", response_model=ListResponseModel["TemplateDownloadInfo"])
-async def get_item_templates(item_id: int):
+async def get_item_templates(item_id: int, request: Request, response: Response):
     """
     获取检测项目下所有检测参数关联的委托单模板列表
     :param item_id: 检测项目ID
     :return: 委托单模板列表，包含id、name、code、下载链接
     """
     try:
-        # 获取检测项目下的所有检测参数
-        params, total, error = DetectionParamService.get_by_item_id(item_id, page=1, limit=1000)
-        if error:
-            raise HTTPException(status_code=500, detail=error)
-        
-        # 确保params不是None
-        if not params:
-            params = []
-        
-        # 过滤出状态为启用的数据
-        enabled_params = [param for param in params if param.status == 1]
-        
-        # 收集所有唯一的委托单模板
-        template_dict = {}
-        for param in enabled_params:
-            # 检查是否关联了委托单模板
-            if hasattr(param, 'template') and param.template:
-                template = param.template
-                if template.template_id not in template_dict and template.file_path:
-                    # 生成带签名的下载链接
-                    download_url = LinkGeneratorService.generate_signed_url(template.file_path)
-                    
-                    # 将模板信息添加到字典中，去重
-                    template_dict[template.template_id] = {
-                        "id": template.template_id,
-                        "name": template.template_name,
-                        "code": template.template_code,
-                        "download_url": download_url
-                    }
+        # 下载链接按时间段复用，ETag随时间段变化，客户端重新验证后使用的链接至少还有半个有效期
+        validators, not_modified = await _check_not_modified(
+            request, _signed_url_bucket(), use_last_modified=False
+        )
+        if not_modified is not None:
+            return not_modified
+        snapshot = await _get_snapshot(validators['version'])
+        _set_served_cache_headers(response, snapshot.version, validators)
         
-        # 将字典转换为列表
-        result = list(template_dict.values())
+        # 下载链接带有效期，同一时间段内复用相同的签名链接
+        result = [{
+            "id": template["id"],
+            "name": template["name"],
+            "code": template["code"],
+            "download_url": LinkGeneratorService.generate_window_signed_url(template["file_path"])
+        } for template in snapshot.get_templates(item_id)]
         
         return {
             "code": 200,
@@ -185,61 +199,94 @@ async def get_item_templates(item_id: int):
         raise HTTPException(status_code=500, detail=f"获取委托单模板列表失败: {str(e)}")
 
 
-@router.get("/categories/objects", response_model=ListResponseModel[dict])
-async def get_categories_with_objects():
+@router.get("/items/{item_id}/bundle", response_model=ResponseModel[dict])
+async def get_item_bundle(item_id: int, request: Request, response: Response):
     """
-    获取所有分类及其下的检测对象列表
-    :return: 分类列表，每个分类包含id、name和objects字段，objects是检测对象列表
+    获取公开检测项目页面需要的全部数据，一次请求代替检测项目、委托单模板、图片和检测参数多个接口
+    :param item_id: 检测项目ID
+    :return: 检测项目详情，包含item（项目信息）、params（启用的检测参数，格式与检测参数图片一致）、
+             templates（委托单模板及下载链接）和images（各设备类型带版本号的图片地址）
     """
     try:
-        # 获取所有分类
-        categories, error = CategoryService.get_all()
+        # 详情包含下载链接，与委托单模板列表一样按链接时间段生成ETag
+        validators, not_modified = await _check_not_modified(
+            request, _signed_url_bucket(), use_last_modified=False, with_images=True
+        )
+        if not_modified is not None:
+            return not_modified
+        snapshot = await _get_snapshot(validators['version'])
+        bundle, error = await run_blocking(ItemBundleService.get_bundle, item_id, snapshot)
         if error:
             raise HTTPException(status_code=500, detail=error)
+        if bundle is None:
+            raise HTTPException(status_code=404, detail="检测项目不存在")
+        _set_served_cache_headers(response, snapshot.version, validators)
         
-        # 确保categories不是None
-        if not categories:
-            categories = []
-        
-        # 过滤出状态为启用的数据，按排序号排序
-        enabled_categories = sorted(
-            [cat for cat in categories if cat['status'] == 1],
-            key=lambda x: x['sort_order']
+        return {
+            "code": 200,
+            "message": "获取检测项目详情成功",
+            "data": bundle
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取检测项目详情失败: {str(e)}")
+
+
+@router.post("/items/templates:batch", response_model=ResponseModel[dict])
+async def get_items_templates_batch(request_data: ItemBatchRequest, request: Request, response: Response):
+    """
+    批量获取多个检测项目的委托单模板列表，一个页面的所有检测项目只需一次请求
+    与get_item_templates一样按目录表代数、下载链接时间段和检测项目ID生成ETag；POST响应不会被浏览器和CDN缓存，
+    不返回304，ETag供客户端判断结果是否变化
+    :param request_data: 检测项目ID列表
+    :return: 检测项目ID → 委托单模板列表（格式与get_item_templates一致），不存在或未启用的检测项目对应空列表
+    """
+    try:
+        item_ids = sorted(set(request_data.item_ids))
+        validators, not_modified = await _check_not_modified(
+            request, _signed_url_bucket(), *item_ids, use_last_modified=False
         )
+        if not_modified is not None:
+            return not_modified
+        snapshot = await _get_snapshot(validators['version'])
+        _set_served_cache_headers(response, snapshot.version, validators)
         
-        # 结果列表
-        result = []
+        # 同一模板常被多个检测项目引用，同一时间段内复用相同的签名链接
+        result = {}
+        for item_id in dict.fromkeys(request_data.item_ids):
+            result[item_id] = [{
+                "id": template["id"],
+                "name": template["name"],
+                "code": template["code"],
+                "download_url": LinkGeneratorService.generate_window_signed_url(template["file_path"])
+            } for template in snapshot.get_templates(item_id)]
         
-        # 遍历每个分类，获取其下的检测对象
-        for cat in enabled_categories:
-            # 获取分类下的检测对象
-            objects, error = DetectionObjectService.get_by_category_id(cat['category_id'])
-            if error:
-                raise HTTPException(status_code=500, detail=error)
-            
-            # 确保objects不是None
-            if not objects:
-                objects = []
-            
-            # 过滤出状态为启用的数据，按排序号排序
-            enabled_objects = sorted(
-                [obj for obj in objects if obj['status'] == 1],
-                key=lambda x: x['sort_order']
-            )
-            
-            # 构造分类及其检测对象信息
-            category_info = {
-                "id": cat['category_id'],
-                "name": cat['category_name'],
-                "objects": [{
-                    "id": obj['object_id'],
-                    "name": obj['object_name'],
-                    "code": obj['object_code']
-                } for obj in enabled_objects]
-            }
-            
-            # 添加到结果列表
-            result.append(category_info)
+        return {
+            "code": 200,
+            "message": "批量获取委托单模板列表成功",
+            "data": result
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"批量获取委托单模板列表失败: {str(e)}")
+
+
+@router.get("/categories/objects", response_model=ListResponseModel[dict])
+async def get_categories_with_objects(request: Request, response: Response):
+    """
+    获取所有分类及其下的检测对象列表
+    :return: 分类列表，每个分类包含id、name和objects字段，objects是检测对象列表
+    """
+    try:
+        validators, not_modified = await _check_not_modified(request)
+        if not_modified is not None:
+            return not_modified
+        # 目录快照中已预先构建分类及其检测对象的树
+        snapshot = await _get_snapshot(validators['version'])
+        _set_served_cache_headers(response, snapshot.version, validators)
+        result = list(snapshot.tree)
         
         return {
             "code": 200,
@@ -255,6 +302,9 @@ async def get_categories_with_objects():
 
 @router.get("/items/search", response_model=ListResponseModel[dict])
 async def search_items(
+    request: Request,
+    response: Response,
+    background_tasks: BackgroundTasks,
     keyword: str = Query(..., description="搜索关键词，支持检测对象、规范名称、规范代码、检测参数")
 ):
     """
@@ -263,58 +313,16 @@ async def search_items(
     :return: 检测项目列表，格式与get_public_object_items一致
     """
     try:
-        # 获取所有检测项目
-        items, error = DetectionItemService.get_all()
-        if error:
-            raise HTTPException(status_code=500, detail=error)
-        
-        # 确保items不是None
-        if not items:
-            items = []
+        validators, not_modified = await _check_not_modified(request, with_images=True)
+        if not_modified is not None:
+            return not_modified
+        snapshot = await _get_snapshot(validators['version'])
+        _set_served_cache_headers(response, snapshot.version, validators)
+        search_result = await _with_images(snapshot.search_items(keyword))
         
-        # 过滤出状态为启用的数据
-        enabled_items = [item for item in items if item['status'] == 1]
-        
-        # 处理关键词搜索
-        keyword_lower = keyword.lower()
-        
-        # 搜索结果列表
-        search_result = []
-        
-        # 遍历所有启用的检测项目
-        for item in enabled_items:
-            # 基础搜索条件：检测对象名称和检测项目名称
-            basic_match = keyword_lower in item['object_name'].lower() or keyword_lower in item['item_name'].lower()
-            
-            # 扩展搜索条件：检测参数、规范名称、规范代码
-            extended_match = False
-            
-            # 获取检测项目关联的检测参数
-            params, total, error = DetectionParamService.get_by_item_id(item['item_id'], page=1, limit=1000)
-            if not error and params:
-                for param in params:
-                    # 检查检测参数名称
-                    if hasattr(param, 'param_name') and keyword_lower in param.param_name.lower():
-                        extended_match = True
-                        break
-                    
-                    # 检查检测参数关联的规范
-                    if hasattr(param, 'standards') and param.standards:
-                        for standard in param.standards:
-                            # 检查规范名称和代码
-                            if (hasattr(standard, 'standard_name') and keyword_lower in standard.standard_name.lower()) or \
-                               (hasattr(standard, 'standard_code') and keyword_lower in standard.standard_code.lower()):
-                                extended_match = True
-                                break
-                        if extended_match:
-                            break
-            
-            # 如果任何一个条件匹配，添加到搜索结果
-            if basic_match or extended_match:
-                search_result.append({
-                    "item_id": item['item_id'],
-                    "item_name": item['item_name']
-                })
+        # 关键词是完整词条时，响应后增加其联想热度
+        if snapshot.suggest_trie.contains(keyword):
+            background_tasks.add_task(SuggestService.record_query, keyword)
         
         return {
             "code": 200,
@@ -326,3 +334,34 @@ async def search_items(
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"搜索检测项目列表失败: {str(e)}")
+
+
+@router.get("/suggest", response_model=ListResponseModel[dict])
+async def suggest(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=50, description="用户输入的前缀"),
+    limit: int = Query(10, ge=1, le=20, description="最多返回的联想词数量")
+):
+    """
+    输入联想，按前缀匹配检测项目、检测对象、检测参数名称以及规范代码和名称，按搜索热度排序
+    :param q: 用户输入的前缀
+    :param limit: 最多返回的联想词数量
+    :return: 联想词列表，每项包含text和type（item/object/param/standard_code/standard_name）
+    """
+    try:
+        suggestions, error = await run_blocking(SuggestService.suggest, q, limit)
+        if error:
+            raise HTTPException(status_code=500, detail=error)
+        # 联想结果随搜索热度变化，不做条件请求，只允许短时间缓存
+        set_cache_headers(response, 'suggest')
+        
+        return {
+            "code": 200,
+            "message": "获取联想词成功",
+            "data": suggestions,
+            "total": len(suggestions)
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取联想词失败: {str(e)}")
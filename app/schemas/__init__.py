@@ -23,7 +23,8 @@ from app.schemas.detection import (
     DelegationFormTemplateUpdate,
     DelegationFormTemplateResponse,
     ResponseModel,
-    ListResponseModel
+    ListResponseModel,
+    CursorListResponseModel
 )
 
 __all__ = [
@@ -48,5 +49,6 @@ __all__ = [
     'DelegationFormTemplateUpdate',
     'DelegationFormTemplateResponse',
     'ResponseModel',
-    'ListResponseModel'
+    'ListResponseModel',
+    'CursorListResponseModel'
 ]
@@ -234,6 +234,17 @@ class TemplateDownloadInfo(BaseModel):
 
 
 
+class ItemBatchRequest(BaseModel):
+    """按检测项目批量查询的请求模型"""
+    item_ids: List[int] = Field(..., min_length=1, max_length=100, description="检测项目ID列表，最多100个")
+
+
+class ItemImageBatchRequest(ItemBatchRequest):
+    """按检测项目批量获取图片地址的请求模型"""
+    device_type: str = Field("pc", pattern="^(pc|phone|tablet)$", description="设备类型：pc/phone/tablet")
+    image_type: str = Field("png", pattern="^(png|svg)$", description="图片类型：png或svg")
+
+
 # 通用响应模型
 class ResponseModel(BaseModel, Generic[T]):
     """通用响应模型"""
@@ -248,3 +259,9 @@ class ListResponseModel(BaseModel, Generic[T]):
     message: str = Field("success", description="响应消息")
     data: Optional[List[T]] = Field(None, description="响应数据列表")
     total: int = Field(0, description="数据总数")
+
+
+class CursorListResponseModel(ListResponseModel[T], Generic[T]):
+    """支持游标分页的列表响应模型"""
+    total: int = Field(0, description="数据总数，游标分页未统计总数时为-1")
+    next_cursor: Optional[str] = Field(None, description="游标分页的下一页游标，没有下一页时为空")
@@ -14,6 +14,8 @@ from app.services.detection import (
     DetectionStandardService, DetectionItemService,
     DelegationFormTemplateService
 )
+from app.extensions import get_db_redis_direct
+from app.dal.detection_dal import DetectionStandardDAL, DetectionItemDAL, DetectionObjectDAL
 
 
 
@@ -209,7 +211,7 @@ class DetectionAdminService:
             
             # 准备导入数据
             import_data = []
-            for row in reader:
+            for index, row in enumerate(reader, start=1):
                 # 转换字段名称和数据类型
                 standard_data = {
                     'standard_code': row['规范编号'].strip(),
@@ -242,11 +244,34 @@ class DetectionAdminService:
                         standard_data['replace_id'] = None
                 
                 standard_data['remark'] = row.get('备注', '').strip() or None
+                
+                if not standard_data['standard_code'] or not standard_data['standard_name']:
+                    error_list.append({
+                        'index': index,
+                        'data': standard_data,
+                        'error': '规范编号和规范名称不能为空'
+                    })
+                    continue
                 import_data.append(standard_data)
             
-            # 批量创建
-            success_list, error_list = DetectionAdminService.batch_create_standards(import_data)
-            success_count = len(success_list)
+            # 按规范编号分块批量插入或更新，已存在的规范会被CSV中的数据覆盖
+            close_db_func = None
+            try:
+                db, redis, close_db_func = get_db_redis_direct()
+                standard_dal = DetectionStandardDAL(db, redis)
+                result = standard_dal.bulk_upsert(import_data, ['standard_code'])
+            finally:
+                if close_db_func:
+                    close_db_func()
+            
+            success_count = result['inserted'] + result['updated']
+            for chunk in result['chunks']:
+                if chunk['error']:
+                    error_list.append({
+                        'chunk': chunk['chunk'],
+                        'count': chunk['failed'],
+                        'error': f'导入失败: {chunk["error"]}'
+                    })
             
             return success_count, error_list
         
@@ -262,39 +287,69 @@ class DetectionAdminService:
         """
         success_list = []
         error_list = []
+        close_db_func = None
         
         try:
+            # 验证必填字段
+            valid_rows = []
             for index, data in enumerate(items_data):
-                try:
-                    # 验证必填字段
-                    if not data.get('group_id') or not data.get('item_name'):
-                        error_list.append({
-                            'index': index + 1,
-                            'data': data,
-                            'error': '项目组ID和检测项目名称不能为空'
-                        })
-                        continue
-                    
-                    # 使用服务类创建项目
-                    item, error = DetectionItemService.create(data)
-                    if error:
-                        error_list.append({
-                            'index': index + 1,
-                            'data': data,
-                            'error': f'创建失败: {error}'
-                        })
-                        continue
-                    
-                    success_list.append(item)
-                except Exception as e:
+                if not data.get('object_id') or not data.get('item_name'):
                     error_list.append({
                         'index': index + 1,
                         'data': data,
-                        'error': f'创建失败: {str(e)}'
+                        'error': '检测对象ID和检测项目名称不能为空'
+                    })
+                    continue
+                valid_rows.append((index, data))
+            
+            if not valid_rows:
+                return success_list, error_list
+            
+            db, redis, close_db_func = get_db_redis_direct()
+            
+            # 一次批量查询检查所有检测对象是否存在且启用
+            object_dal = DetectionObjectDAL(db, redis)
+            objects = {obj.object_id: obj for obj in object_dal.get_many([data['object_id'] for _, data in valid_rows])}
+            rows = []
+            for index, data in valid_rows:
+                detection_object = objects.get(data['object_id'])
+                if not detection_object:
+                    error = f"检测对象ID {data['object_id']} 不存在"
+                elif detection_object.status != 1:
+                    error = f"检测对象ID {data['object_id']} 已禁用，无法关联"
+                else:
+                    rows.append(data)
+                    continue
+                error_list.append({
+                    'index': index + 1,
+                    'data': data,
+                    'error': f'创建失败: {error}'
+                })
+            
+            # 按 (检测对象ID, 项目名称) 分块批量插入或更新
+            item_dal = DetectionItemDAL(db, redis)
+            result = item_dal.bulk_upsert(rows, ['item_name', 'object_id'])
+            for chunk in result['chunks']:
+                if chunk['error']:
+                    error_list.append({
+                        'chunk': chunk['chunk'],
+                        'count': chunk['failed'],
+                        'error': f'创建失败: {chunk["error"]}'
                     })
             
+            # 一次查询取回成功写入的项目
+            if result['inserted'] or result['updated']:
+                from sqlalchemy import tuple_
+                keys = [(data['item_name'], data['object_id']) for data in rows]
+                success_list = db.query(DetectionItem).filter(
+                    tuple_(DetectionItem.item_name, DetectionItem.object_id).in_(keys)
+                ).all()
+            
         except Exception as e:
             raise Exception(f'批量创建检测项目失败: {str(e)}')
+        finally:
+            if close_db_func:
+                close_db_func()
         
         return success_list, error_list
     
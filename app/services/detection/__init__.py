@@ -7,6 +7,9 @@ from app.services.detection.detection_object_service import DetectionObjectServi
 from app.services.detection.detection_item_service import DetectionItemService
 from app.services.detection.detection_param_service import DetectionParamService
 from app.services.detection.delegation_form_template_service import DelegationFormTemplateService
+from app.services.detection.catalog_snapshot_service import CatalogSnapshot, CatalogSnapshotService
+from app.services.detection.suggest_service import SuggestService
+from app.services.detection.item_bundle_service import ItemBundleService
 
 __all__ = [
     'CategoryService',
@@ -14,5 +17,9 @@ __all__ = [
     'DetectionObjectService',
     'DetectionItemService',
     'DetectionParamService',
-    'DelegationFormTemplateService'
+    'DelegationFormTemplateService',
+    'CatalogSnapshot',
+    'CatalogSnapshotService',
+    'SuggestService',
+    'ItemBundleService'
 ]
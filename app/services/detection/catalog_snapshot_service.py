@@ -0,0 +1,362 @@
+# 目录快照服务类
+# 为公开接口提供只读的分类→检测对象→检测项目→检测参数目录树
+# 快照用少量集合查询一次构建，只包含启用的数据并预先排序，数据变更后整体替换
+
+import threading
+import time
+from datetime import datetime, timezone
+from types import MappingProxyType
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+
+from app.extensions import get_db_redis_direct
+from app.models.associations import DetectionParamStandard
+from app.models.detection import (
+    Category,
+    DetectionObject,
+    DetectionItem,
+    DetectionParam,
+    DetectionStandard,
+    DelegationFormTemplate
+)
+from app.models.image.data_image import DataImage
+from app.services.detection.search_index import ItemSearchIndex, SuggestTrie
+from app.utils.redis_utils import RedisUtils
+
+
+class CatalogSnapshot:
+    """目录快照，构建完成后只读，所有公开接口共享同一个实例
+
+    列表都是预先排序好的元组，按父级ID索引，接口只需一次字典查找
+    """
+
+    __slots__ = (
+        'version', 'built_at', 'categories', 'tree', 'objects_by_category', 'items_by_object',
+        'items', 'item_by_id', 'params_by_item', 'templates_by_item', 'search_index', 'suggest_trie'
+    )
+
+    # 快照读取的表，任一表的代数变化后重建
+    TABLES = [
+        Category.__tablename__,
+        DetectionObject.__tablename__,
+        DetectionItem.__tablename__,
+        DetectionParam.__tablename__,
+        DetectionParamStandard.__tablename__,
+        DetectionStandard.__tablename__,
+        DelegationFormTemplate.__tablename__
+    ]
+
+    # 检测项目图片的代数，图片版本不属于快照，只用于生成带图片地址的接口的ETag
+    IMAGE_TABLE = DataImage.__tablename__
+
+    def __init__(self, version: Optional[Tuple[int, ...]], categories, tree, objects_by_category,
+                 items_by_object, items, params_by_item, templates_by_item, search_index, suggest_trie):
+        self.version = version
+        self.built_at = time.monotonic()
+        # 启用的分类：({'category_id', 'category_name'}, ...)
+        self.categories = categories
+        # 启用的分类及其检测对象：({'id', 'name', 'objects': [{'id', 'name', 'code'}]}, ...)
+        self.tree = tree
+        # 分类ID → 启用的检测对象：({'object_id', 'object_name'}, ...)
+        self.objects_by_category = objects_by_category
+        # 检测对象ID → 启用的检测项目：({'item_id', 'item_name'}, ...)
+        self.items_by_object = items_by_object
+        # 所有启用的检测项目：({'item_id', 'item_name', 'object_id', 'object_name'}, ...)
+        self.items = items
+        self.item_by_id = MappingProxyType({item['item_id']: item for item in items})
+        # 检测项目ID → 启用的检测参数摘要：({'param_id', 'param_name', 'template_id', 'standards'}, ...)
+        self.params_by_item = params_by_item
+        # 检测项目ID → 启用参数关联的委托单模板（去重）：({'id', 'name', 'code', 'file_path'}, ...)
+        self.templates_by_item = templates_by_item
+        # 检测项目的n-gram倒排索引
+        self.search_index = search_index
+        # 检测项目、检测对象、检测参数名称和规范代码、名称的前缀补全索引
+        self.suggest_trie = suggest_trie
+
+    def get_objects(self, category_id: int) -> Tuple[dict, ...]:
+        """
+        获取分类下启用的检测对象
+        :param category_id: 分类ID
+        :return: 按排序号排列的检测对象元组
+        """
+        return self.objects_by_category.get(category_id, ())
+
+    def get_items(self, object_id: int) -> Tuple[dict, ...]:
+        """
+        获取检测对象下启用的检测项目
+        :param object_id: 检测对象ID
+        :return: 按排序号排列的检测项目元组
+        """
+        return self.items_by_object.get(object_id, ())
+
+    def get_templates(self, item_id: int) -> Tuple[dict, ...]:
+        """
+        获取检测项目下启用参数关联的委托单模板
+        :param item_id: 检测项目ID
+        :return: 按参数顺序去重后的模板元组
+        """
+        return self.templates_by_item.get(item_id, ())
+
+    def search_items(self, keyword: str) -> List[dict]:
+        """
+        按关键词搜索启用的检测项目，匹配检测对象名称、检测项目名称、检测参数名称、规范名称和规范代码
+        :param keyword: 搜索关键词
+        :return: 按相关度排序的检测项目列表：[{'item_id', 'item_name'}]
+        """
+        result = []
+        for item_id in self.search_index.search(keyword):
+            item = self.item_by_id[item_id]
+            result.append({"item_id": item['item_id'], "item_name": item['item_name']})
+        return result
+
+    @classmethod
+    def build(cls, db, version: Optional[Tuple[int, ...]] = None,
+              previous: Optional['CatalogSnapshot'] = None) -> 'CatalogSnapshot':
+        """
+        用集合查询构建快照，每张表一条查询，只查询所需的列，不加载模型实例
+        :param db: 数据库会话
+        :param version: 构建前读取的表代数
+        :param previous: 上一个快照，内容未变化的检测项目复用其搜索索引项
+        :return: 目录快照
+        """
+        categories = db.query(Category.category_id, Category.category_name).filter(
+            Category.status == 1
+        ).order_by(Category.sort_order, Category.category_id).all()
+
+        objects = db.query(
+            DetectionObject.object_id, DetectionObject.object_name,
+            DetectionObject.object_code, DetectionObject.category_id
+        ).filter(DetectionObject.status == 1).order_by(
+            DetectionObject.sort_order, DetectionObject.object_id
+        ).all()
+
+        items = db.query(
+            DetectionItem.item_id, DetectionItem.item_name, DetectionItem.object_id
+        ).filter(DetectionItem.status == 1).order_by(
+            DetectionItem.sort_order, DetectionItem.item_id
+        ).all()
+
+        params = db.query(
+            DetectionParam.param_id, DetectionParam.param_name,
+            DetectionParam.item_id, DetectionParam.template_id
+        ).filter(DetectionParam.status == 1).order_by(
+            DetectionParam.sort_order, DetectionParam.param_id
+        ).all()
+
+        param_standards = db.query(
+            DetectionParamStandard.param_id, DetectionStandard.standard_code, DetectionStandard.standard_name
+        ).join(
+            DetectionStandard, DetectionStandard.standard_id == DetectionParamStandard.standard_id
+        ).join(
+            DetectionParam, DetectionParam.param_id == DetectionParamStandard.param_id
+        ).filter(DetectionParam.status == 1).all()
+
+        # 每个检测项目启用参数关联的不同模板，按参数顺序排列，只查询生成下载链接所需的列
+        item_templates = db.query(
+            DetectionParam.item_id, DelegationFormTemplate.template_id, DelegationFormTemplate.template_name,
+            DelegationFormTemplate.template_code, DelegationFormTemplate.file_type
+        ).join(
+            DelegationFormTemplate, DelegationFormTemplate.template_id == DetectionParam.template_id
+        ).filter(DetectionParam.status == 1).group_by(
+            DetectionParam.item_id, DelegationFormTemplate.template_id, DelegationFormTemplate.template_name,
+            DelegationFormTemplate.template_code, DelegationFormTemplate.file_type
+        ).order_by(
+            DetectionParam.item_id, func.min(DetectionParam.sort_order), func.min(DetectionParam.param_id)
+        ).all()
+
+        # 分类及检测对象
+        objects_by_category: Dict[int, List[dict]] = {}
+        tree_objects: Dict[int, List[dict]] = {}
+        object_names = {}
+        for obj in objects:
+            object_names[obj.object_id] = obj.object_name
+            objects_by_category.setdefault(obj.category_id, []).append({
+                "object_id": obj.object_id,
+                "object_name": obj.object_name
+            })
+            tree_objects.setdefault(obj.category_id, []).append({
+                "id": obj.object_id,
+                "name": obj.object_name,
+                "code": obj.object_code
+            })
+
+        category_list = tuple({
+            "category_id": cat.category_id,
+            "category_name": cat.category_name
+        } for cat in categories)
+        tree = tuple({
+            "id": cat.category_id,
+            "name": cat.category_name,
+            "objects": tree_objects.get(cat.category_id, [])
+        } for cat in categories)
+
+        # 检测参数及其关联的规范
+        standards_by_param: Dict[int, List[Tuple[str, str]]] = {}
+        for row in param_standards:
+            standards_by_param.setdefault(row.param_id, []).append((row.standard_code, row.standard_name))
+
+        params_by_item: Dict[int, List[dict]] = {}
+        for param in params:
+            params_by_item.setdefault(param.item_id, []).append({
+                "param_id": param.param_id,
+                "param_name": param.param_name,
+                "template_id": param.template_id,
+                "standards": tuple(standards_by_param.get(param.param_id, ()))
+            })
+
+        templates_by_item: Dict[int, List[dict]] = {}
+        for row in item_templates:
+            templates_by_item.setdefault(row.item_id, []).append({
+                "id": row.template_id,
+                "name": row.template_name,
+                "code": row.template_code,
+                "file_path": DelegationFormTemplate.build_file_path(
+                    row.template_name, row.template_code, row.file_type
+                )
+            })
+
+        # 所属检测对象已禁用的启用项目仍可被搜索到，用一条IN查询补充这些对象的名称
+        missing_object_ids = {item.object_id for item in items if item.object_id not in object_names}
+        if missing_object_ids:
+            object_names.update(db.query(DetectionObject.object_id, DetectionObject.object_name).filter(
+                DetectionObject.object_id.in_(missing_object_ids)
+            ).all())
+
+        # 检测项目及搜索文档
+        items_by_object: Dict[int, List[dict]] = {}
+        item_list = []
+        documents = []
+        for item in items:
+            object_name = object_names.get(item.object_id) or ''
+            items_by_object.setdefault(item.object_id, []).append({
+                "item_id": item.item_id,
+                "item_name": item.item_name
+            })
+            item_list.append({
+                "item_id": item.item_id,
+                "item_name": item.item_name,
+                "object_id": item.object_id,
+                "object_name": object_name
+            })
+            fields = [('item_name', item.item_name), ('object_name', object_name)]
+            for param in params_by_item.get(item.item_id, ()):
+                fields.append(('param_name', param['param_name']))
+                for standard_code, standard_name in param['standards']:
+                    fields.append(('standard_code', standard_code))
+                    fields.append(('standard_name', standard_name))
+            documents.append((item.item_id, fields))
+        search_index = ItemSearchIndex.build(
+            documents, previous=previous.search_index if previous is not None else None
+        )
+
+        # 输入联想词条
+        suggest_entries = [(item.item_name, 'item') for item in items]
+        suggest_entries.extend((obj.object_name, 'object') for obj in objects)
+        suggest_entries.extend((param.param_name, 'param') for param in params)
+        for row in param_standards:
+            suggest_entries.append((row.standard_code, 'standard_code'))
+            suggest_entries.append((row.standard_name, 'standard_name'))
+        suggest_trie = SuggestTrie.build(suggest_entries)
+
+        return cls(
+            version=version,
+            categories=category_list,
+            tree=tree,
+            objects_by_category=MappingProxyType({k: tuple(v) for k, v in objects_by_category.items()}),
+            items_by_object=MappingProxyType({k: tuple(v) for k, v in items_by_object.items()}),
+            items=tuple(item_list),
+            params_by_item=MappingProxyType({k: tuple(v) for k, v in params_by_item.items()}),
+            templates_by_item=MappingProxyType({k: tuple(v) for k, v in templates_by_item.items()}),
+            search_index=search_index,
+            suggest_trie=suggest_trie
+        )
+
+
+class CatalogSnapshotService:
+    """目录快照服务类，维护进程内共享的目录快照"""
+
+    # Redis不可用时，快照的最长使用时间（秒）
+    FALLBACK_TTL = 60
+
+    # 当前快照，整体替换，读取时无需加锁
+    _snapshot: Optional[CatalogSnapshot] = None
+    # 保证同一时间只有一个线程重建快照
+    _build_lock = threading.Lock()
+
+    @staticmethod
+    def _is_current(snapshot: Optional[CatalogSnapshot], version: Optional[Tuple[int, ...]]) -> bool:
+        """
+        判断快照是否仍然有效
+        :param snapshot: 目录快照
+        :param version: 当前的表代数，Redis不可用时为None
+        :return: 有效返回True
+        """
+        if snapshot is None:
+            return False
+        if version is None:
+            return time.monotonic() - snapshot.built_at < CatalogSnapshotService.FALLBACK_TTL
+        return snapshot.version == version
+
+    @staticmethod
+    def get_validators(with_images: bool = False) -> Tuple[Optional[Tuple[int, ...]], Optional[int], Optional[datetime]]:
+        """
+        用一次MGET读取快照相关各表的当前代数和最近一次变更时间，不访问数据库
+        变更时间在递增代数时记录，删除记录、修改关联表和模板也会更新，可用作Last-Modified
+        :param with_images: 是否同时读取检测项目图片的代数，响应包含图片地址时使用，变更时间也包含图片的变更
+        :return: (表代数元组, 图片代数（未读取时为None）, 最近变更时间（UTC）)，Redis不可用时均为None
+        """
+        from app.extensions import redis_client
+        tables = CatalogSnapshot.TABLES + [CatalogSnapshot.IMAGE_TABLE] if with_images else CatalogSnapshot.TABLES
+        result = RedisUtils.get_generations_with_time(redis_client, tables)
+        if result is None:
+            return None, None, None
+        generations, changed_at = result
+        version = tuple(generations[:len(CatalogSnapshot.TABLES)])
+        image_generation = generations[-1] if with_images else None
+        return version, image_generation, datetime.fromtimestamp(changed_at, tz=timezone.utc)
+
+    @staticmethod
+    def get_snapshot(version: Optional[Tuple[int, ...]] = None):
+        """
+        获取当前目录快照，相关表有变更时重建
+        其他线程正在重建时直接使用旧快照，不等待，此时返回的快照版本早于version；
+        调用方生成ETag、缓存键等与版本相关的数据时必须使用快照自身的version属性，而不是传入的version
+        :param version: 调用方已读取的表代数，为None时重新读取
+        :return: 成功返回 (目录快照, None)，失败返回 (None, 错误信息)
+        """
+        close_db_func = None
+        try:
+            db, redis, close_db_func = get_db_redis_direct()
+
+            # 一次MGET读取各表代数，与快照构建时的代数比较
+            if version is None:
+                generations = RedisUtils.get_generations(redis, CatalogSnapshot.TABLES)
+                version = tuple(generations) if generations is not None else None
+
+            snapshot = CatalogSnapshotService._snapshot
+            if CatalogSnapshotService._is_current(snapshot, version):
+                return (snapshot, None)
+
+            # 已有快照且其他线程正在重建时，继续使用旧快照
+            if not CatalogSnapshotService._build_lock.acquire(blocking=snapshot is None):
+                return (snapshot, None)
+            try:
+                snapshot = CatalogSnapshotService._snapshot
+                if not CatalogSnapshotService._is_current(snapshot, version):
+                    snapshot = CatalogSnapshot.build(db, version, previous=snapshot)
+                    CatalogSnapshotService._snapshot = snapshot
+            finally:
+                CatalogSnapshotService._build_lock.release()
+            return (snapshot, None)
+        except Exception as e:
+            return (None, f"获取目录快照失败: {str(e)}")
+        finally:
+            # 如果是自己创建的会话，关闭它
+            if close_db_func:
+                close_db_func()
+
+    @staticmethod
+    def invalidate():
+        """丢弃当前快照，下次访问时重建"""
+        CatalogSnapshotService._snapshot = None
@@ -156,8 +156,8 @@ class DelegationFormTemplateService:
             # 确保upload_user字段被正确设置
             if 'upload_user' in template_data:
                 template.upload_user = template_data['upload_user']
-                db.commit()
-                db.refresh(template)
+                # 通过DAL保存，同步刷新缓存
+                template = template_dal.save(template)
             
             # 移除file_type中的点，因为generate_file_path会添加
             file_extension = template.file_type[1:] if template.file_type.startswith('.') else template.file_type
@@ -366,6 +366,44 @@ class DelegationFormTemplateService:
             if close_db_func:
                 close_db_func()
     
+    @staticmethod
+    def get_page(page: int = 1, limit: int = 100, search_keyword=None, status=None, cursor=None,
+                 with_total: bool = True):
+        """
+        在数据库中分页获取委托单模板列表，按模板ID升序排列，只为本页模板生成下载链接
+        :param page: 页码，从1开始，传入cursor时忽略
+        :param limit: 每页数量
+        :param search_keyword: 搜索关键词，匹配模板名称或模板编号
+        :param status: 状态筛选，1=启用，0=禁用，None=不筛选
+        :param cursor: 上一页返回的游标，传入时按游标分页
+        :param with_total: 是否统计总记录数
+        :return: 成功返回 (模板列表, 下一页游标, 总记录数, None)，失败返回 (None, None, 0, 错误信息)
+        """
+        # 用于保存需要关闭的数据库会话
+        close_db_func = None
+        try:
+            db, redis, close_db_func = get_db_redis_direct()
+            template_dal = DelegationFormTemplateDAL(db, redis)
+            templates, next_cursor, total = template_dal.get_page(
+                page=page, limit=limit,
+                condition={"status": status} if status is not None else None,
+                keyword=search_keyword or None, keyword_fields=["template_name", "template_code"],
+                cursor=cursor, with_total=with_total
+            )
+            
+            for template in templates:
+                template.download_url = DelegationFormTemplateService._generate_download_url(template)
+            
+            return (templates, next_cursor, total, None)
+        except ValueError as e:
+            return (None, None, 0, str(e))
+        except Exception as e:
+            return (None, None, 0, f"获取委托单模板列表失败: {str(e)}")
+        finally:
+            # 如果是自己创建的会话，关闭它
+            if close_db_func:
+                close_db_func()
+    
     @staticmethod
     def get_usage_info(template_id):
         """
@@ -60,6 +60,9 @@ class DetectionItemService:
             db, redis, close_db_func = get_db_redis_direct()
             item_dal = DetectionItemDAL(db, redis)
             items = item_dal.get_all()
+            # 批量加载所属检测对象（优先读缓存），之后访问item.detection_object不再逐条查询
+            # 需要保留返回的列表，会话的identity map是弱引用，未被引用的实例会被回收
+            detection_objects = DetectionObjectDAL(db, redis).get_many([item.object_id for item in items])
             # 使用字典列表返回，只包含object_id和object_name，避免关系字段循环引用
             items_list = [{
                 'item_id': item.item_id,
@@ -97,6 +100,9 @@ class DetectionItemService:
             db, redis, close_db_func = get_db_redis_direct()
             item_dal = DetectionItemDAL(db, redis)
             items = item_dal.get_by_condition({"object_id": object_id})
+            # 批量加载所属检测对象（优先读缓存），之后访问item.detection_object不再逐条查询
+            # 需要保留返回的列表，会话的identity map是弱引用，未被引用的实例会被回收
+            detection_objects = DetectionObjectDAL(db, redis).get_many([item.object_id for item in items])
             # 使用字典列表返回，只包含object_id和object_name，避免关系字段循环引用
             items_list = [{
                 'item_id': item.item_id,
@@ -134,6 +140,9 @@ class DetectionItemService:
             db, redis, close_db_func = get_db_redis_direct()
             item_dal = DetectionItemDAL(db, redis)
             items = item_dal.get_by_condition({"status": status})
+            # 批量加载所属检测对象（优先读缓存），之后访问item.detection_object不再逐条查询
+            # 需要保留返回的列表，会话的identity map是弱引用，未被引用的实例会被回收
+            detection_objects = DetectionObjectDAL(db, redis).get_many([item.object_id for item in items])
             # 使用字典列表返回，只包含object_id和object_name，避免关系字段循环引用
             items_list = [{
                 'item_id': item.item_id,
@@ -62,6 +62,9 @@ class DetectionObjectService:
             db, redis, close_db_func = get_db_redis_direct()
             object_dal = DetectionObjectDAL(db, redis)
             detection_objects = object_dal.get_all()
+            # 批量加载所属分类（优先读缓存），之后访问obj.category直接从会话中获取，不再逐条查询
+            # 需要保留返回的列表，会话的identity map是弱引用，未被引用的实例会被回收
+            categories = CategoryDAL(db, redis).get_many([obj.category_id for obj in detection_objects])
             # 使用字典列表返回，包含分类详细信息和直接的分类名称字段
             objects_list = [{
                 'object_id': obj.object_id,
@@ -99,6 +102,9 @@ class DetectionObjectService:
             db, redis, close_db_func = get_db_redis_direct()
             object_dal = DetectionObjectDAL(db, redis)
             detection_objects = object_dal.get_by_category_id(category_id)
+            # 批量加载所属分类（优先读缓存），之后访问obj.category直接从会话中获取，不再逐条查询
+            # 需要保留返回的列表，会话的identity map是弱引用，未被引用的实例会被回收
+            categories = CategoryDAL(db, redis).get_many([obj.category_id for obj in detection_objects])
             # 使用字典列表返回，包含分类详细信息和直接的分类名称字段
             objects_list = [{
                 'object_id': obj.object_id,
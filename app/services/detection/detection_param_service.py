@@ -7,6 +7,7 @@ from app.models.detection import DetectionParam, DetectionItem
 from app.extensions import get_db_and_redis, get_db_redis_direct
 from app.dal.detection_dal import DetectionParamDAL, DetectionItemDAL, DetectionStandardDAL
 from app.services.detection.status_manager import StatusManager
+from app.services.image.render_queue_service import RenderQueueService
 
 # 创建日志记录器
 logger = logging.getLogger(__name__)
@@ -15,6 +16,13 @@ logger = logging.getLogger(__name__)
 class DetectionParamService:
     """检测参数服务类，处理检测参数相关的业务逻辑"""
     
+    # 检测参数图片表格用到的字段（另有关联的检测规范），其他字段变化不需要重新生成图片
+    TABLE_FIELDS = (
+        'item_id', 'status', 'template_id', 'param_name', 'price', 'is_regular_param', 'sort_order',
+        'sampling_batch', 'sampling_frequency', 'sampling_require', 'inspection_require',
+        'required_info', 'report_time'
+    )
+    
     @staticmethod
     def get_by_id(param_id, db=None, redis=None):
         """
@@ -85,6 +93,57 @@ class DetectionParamService:
             if close_db_func:
                 close_db_func()
     
+    @staticmethod
+    def get_by_cursor(cursor: Optional[str] = None, limit: int = 100, condition: Optional[Dict[str, Any]] = None,
+                      search_params: Optional[Dict[str, Any]] = None, with_total: bool = False, db=None, redis=None):
+        """
+        按 (sort_order, param_id) 游标分页获取检测参数列表
+        :param cursor: 上一页返回的游标，None表示第一页
+        :param limit: 每页数量，默认100
+        :param condition: 精确匹配的查询条件字典
+        :param search_params: 搜索参数字典，与search方法一致
+        :param with_total: 是否统计总记录数
+        :param db: 数据库会话，可选
+        :param redis: Redis客户端，可选
+        :return: 成功返回 (检测参数列表, 下一页游标, 总记录数, None)，失败返回 (None, None, 0, 错误信息)
+        """
+        # 用于保存需要关闭的数据库会话
+        close_db_func = None
+        try:
+            logger.info(f"游标分页获取检测参数列表，游标: {cursor}，每页数量: {limit}")
+            if not db or not redis:
+                db, redis, close_db_func = get_db_redis_direct()
+            
+            # 搜索配置与search方法一致
+            fuzzy_fields = ["param_name", "material_name"]
+            related_fields = {
+                "item": {
+                    "field": "item_name",
+                    "search_key": "item_name"
+                }
+            }
+            
+            param_dal = DetectionParamDAL(db, redis)
+            params, next_cursor, total = param_dal.get_page_by_cursor(
+                cursor=cursor, limit=limit, condition=condition,
+                search_params=search_params, fuzzy_fields=fuzzy_fields, related_fields=related_fields,
+                with_total=with_total
+            )
+            
+            logger.info(f"成功获取检测参数列表，本页 {len(params)} 条记录")
+            return (params, next_cursor, total, None)
+        except ValueError as e:
+            logger.warning(f"游标分页参数错误: {str(e)}")
+            return (None, None, 0, str(e))
+        except Exception as e:
+            error_msg = f"获取检测参数列表失败: {str(e)}"
+            logger.error(error_msg, exc_info=True)
+            return (None, None, 0, error_msg)
+        finally:
+            # 如果是自己创建的会话，关闭它
+            if close_db_func:
+                close_db_func()
+    
     @staticmethod
     def get_by_item_id(item_id, page: int = 1, limit: int = 100, db=None, redis=None):
         """
@@ -204,6 +263,32 @@ class DetectionParamService:
             if close_db_func:
                 close_db_func()
     
+    @staticmethod
+    def _clear_image_cache(redis, item_id):
+        """
+        清除检测项目所有设备类型的图片缓存
+        :param redis: Redis客户端
+        :param item_id: 检测项目ID
+        """
+        from app.utils.redis_utils import RedisUtils
+        
+        data_unique_id = f"detection:{item_id}"
+        # 使用与image_service.py中相同的缓存键格式
+        cache_keys = [f"data_img:{data_unique_id}:{device_type}" for device_type in ['pc', 'phone', 'tablet']]
+        # 图片版本信息用于生成ETag，与图片一起清除
+        cache_keys += [f"data_img_meta:{data_unique_id}:{device_type}" for device_type in ['pc', 'phone', 'tablet']]
+        RedisUtils.delete_many_cache(redis, cache_keys)
+        logger.info(f"清除Redis缓存: {cache_keys}")
+    
+    @staticmethod
+    def _table_values(param) -> Dict[str, Any]:
+        """
+        获取检测参数中图片表格用到的字段值
+        :param param: 检测参数对象
+        :return: 字段名 → 字段值
+        """
+        return {field: getattr(param, field) for field in DetectionParamService.TABLE_FIELDS}
+    
     @staticmethod
     def create(param_data):
         """
@@ -270,39 +355,15 @@ class DetectionParamService:
             # 重新查询参数对象，包含关联的规范信息
             param = param_dal.get_by_id(param.param_id, with_relations=True)
             
-            # 重新生成SVG图片，确保新添加的参数能在图片中显示
-            # 获取参数所属的项目信息
-            item_id = param.item_id
-            item_name = param.item.item_name if param.item else f"项目{item_id}"
-            
-            # 重新生成检测参数图片
-            try:
-                from app.services.image.image_service import ImageService
-                from app.dal.data_image_dal import DataImageDAL
-                
-                # 重新生成检测参数图片
-                ImageService.generate_detection_image(item_id, item_name)
-                logger.info(f"成功重新生成检测参数图片: 项目{item_id}")
-                
-                # 清除Redis缓存，确保下次获取图片时从数据库获取新数据
-                db, redis, close_db_func = get_db_redis_direct()
+            # 重新生成SVG图片，确保新添加的参数能在图片中显示，未启用的参数不出现在图片中
+            if param.status == 1:
+                # 获取参数所属的项目信息
+                item_id = param.item_id
+                item_name = param.item.item_name if param.item else f"项目{item_id}"
                 
-                # 清除所有设备类型的缓存
-                device_types = ['pc', 'phone', 'tablet']
-                data_unique_id = f"detection:{item_id}"
-                
-                for device_type in device_types:
-                    # 直接清除缓存，使用与image_service.py中相同的缓存键格式
-                    cache_key = f"data_img:{data_unique_id}:{device_type}"
-                    from app.utils.redis_utils import RedisUtils
-                    RedisUtils.delete_cache(redis, cache_key)
-                    logger.info(f"清除Redis缓存: {cache_key}")
-                
-                if close_db_func:
-                    close_db_func()
-            except Exception as e:
-                logger.error(f"重新生成检测参数图片失败: {str(e)}")
-                # 图片生成失败不影响参数创建，继续执行
+                # 事务提交后把图片重新生成任务放入渲染队列，由worker进程渲染，不阻塞本次请求
+                # 图片生成失败不影响参数创建
+                RenderQueueService.schedule_render(redis, item_id, item_name)
             
             logger.info(f"成功创建检测参数: {param.param_id}")
             return (param, None)
@@ -391,6 +452,9 @@ class DetectionParamService:
             # 保存旧状态，用于检查状态变更
             old_status = current_param.status
             new_status = param_data.get('status', old_status)
+            # 保存图片表格用到的旧字段值，用于判断是否需要重新生成图片
+            old_table_values = DetectionParamService._table_values(current_param)
+            old_standard_ids = param_dal.get_standard_ids(param_id) if standard_ids is not None else None
             
             # 先更新检测参数
             param = param_dal.update(param_id, param_data)
@@ -413,39 +477,26 @@ class DetectionParamService:
             # 重新查询参数对象，包含关联的规范信息
             param = param_dal.get_by_id(param_id, with_relations=True)
             
-            # 只要更新了检测参数，就重新生成SVG图片
-            # 获取参数所属的项目信息
-            item_id = param.item_id
-            item_name = param.item.item_name if param.item else f"项目{item_id}"
-            
-            # 重新生成检测参数图片
-            try:
-                from app.services.image.image_service import ImageService
-                from app.dal.data_image_dal import DataImageDAL
+            # 只有图片表格用到的字段变化时才重新生成SVG图片，修改样品图片、样品处理费等字段不影响图片
+            # 更新前后都未启用的参数不出现在图片中
+            new_table_values = DetectionParamService._table_values(param)
+            table_changed = new_table_values != old_table_values or (
+                standard_ids is not None and sorted(standard_ids) != old_standard_ids
+            )
+            if table_changed and (old_table_values['status'] == 1 or new_table_values['status'] == 1):
+                # 获取参数所属的项目信息
+                item_id = param.item_id
+                item_name = param.item.item_name if param.item else f"项目{item_id}"
                 
-                # 重新生成检测参数图片
-                ImageService.generate_detection_image(item_id, item_name)
-                logger.info(f"成功重新生成检测参数图片: 项目{item_id}")
-                
-                # 清除Redis缓存，确保下次获取图片时从数据库获取新数据
-                db, redis, close_db_func = get_db_redis_direct()
-                
-                # 清除所有设备类型的缓存
-                device_types = ['pc', 'phone', 'tablet']
-                data_unique_id = f"detection:{item_id}"
-                
-                for device_type in device_types:
-                    # 直接清除缓存，使用与image_service.py中相同的缓存键格式
-                    cache_key = f"data_img:{data_unique_id}:{device_type}"
-                    from app.utils.redis_utils import RedisUtils
-                    RedisUtils.delete_cache(redis, cache_key)
-                    logger.info(f"清除Redis缓存: {cache_key}")
-                
-                if close_db_func:
-                    close_db_func()
-            except Exception as e:
-                logger.error(f"重新生成检测参数图片失败: {str(e)}")
-                # 图片生成失败不影响参数更新，继续执行
+                # 事务提交后把图片重新生成任务放入渲染队列，由worker进程渲染，不阻塞本次请求
+                # 图片生成失败不影响参数更新
+                RenderQueueService.schedule_render(redis, item_id, item_name)
+                # 参数移到其他项目时，原项目的图片也要去掉该参数
+                old_item_id = old_table_values['item_id']
+                if old_item_id != item_id and old_table_values['status'] == 1:
+                    RenderQueueService.schedule_render(redis, old_item_id)
+            else:
+                logger.info(f"检测参数 {param_id} 的修改不影响图片，不重新生成")
             
             logger.info(f"成功更新检测参数: {param_id}")
             return (param, None)
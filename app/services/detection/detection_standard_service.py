@@ -77,6 +77,37 @@ class DetectionStandardService:
             if close_db_func:
                 close_db_func()
     
+    @staticmethod
+    def get_page(page: int = 1, limit: int = 100, status=None, cursor=None, with_total: bool = True):
+        """
+        在数据库中分页获取检测规范列表，按规范ID升序排列
+        :param page: 页码，从1开始，传入cursor时忽略
+        :param limit: 每页数量
+        :param status: 状态筛选，None表示不筛选
+        :param cursor: 上一页返回的游标，传入时按游标分页
+        :param with_total: 是否统计总记录数
+        :return: 成功返回 (规范列表, 下一页游标, 总记录数, None)，失败返回 (None, None, 0, 错误信息)
+        """
+        # 用于保存需要关闭的数据库会话
+        close_db_func = None
+        try:
+            db, redis, close_db_func = get_db_redis_direct()
+            standard_dal = DetectionStandardDAL(db, redis)
+            standards, next_cursor, total = standard_dal.get_page(
+                page=page, limit=limit,
+                condition={"status": status} if status is not None else None,
+                cursor=cursor, with_total=with_total
+            )
+            return (standards, next_cursor, total, None)
+        except ValueError as e:
+            return (None, None, 0, str(e))
+        except Exception as e:
+            return (None, None, 0, f"获取检测规范列表失败: {str(e)}")
+        finally:
+            # 如果是自己创建的会话，关闭它
+            if close_db_func:
+                close_db_func()
+    
     @staticmethod
     def get_by_status(status):
         """
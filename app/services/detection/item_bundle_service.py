@@ -0,0 +1,86 @@
+# 检测项目详情服务类
+# 把公开检测项目页面需要的项目信息、启用的检测参数、委托单模板和图片地址合并为一个响应
+# 项目信息和模板取自目录快照，检测参数查询数据库，这部分按目录版本缓存在Redis中
+# 图片版本不属于目录快照，图片地址在读取缓存后按需附加
+
+import hashlib
+from typing import Optional
+
+from app.extensions import get_db_redis_direct
+from app.services.detection.catalog_snapshot_service import CatalogSnapshot, CatalogSnapshotService
+from app.services.detection.detection_param_service import DetectionParamService
+from app.services.image.image_service import ImageService
+from app.services.utils.link_generator import LinkGeneratorService
+from app.utils.redis_utils import RedisUtils
+
+
+class ItemBundleService:
+    """检测项目详情服务类，处理公开检测项目页面的合并数据"""
+
+    # 缓存键前缀，完整格式：item_bundle:{检测项目ID}:{目录版本和链接时间段的摘要}
+    CACHE_PREFIX = 'item_bundle'
+
+    @staticmethod
+    def get_bundle(item_id: int, snapshot: Optional[CatalogSnapshot] = None):
+        """
+        获取检测项目详情，目录版本和下载链接时间段不变时直接返回缓存
+        :param item_id: 检测项目ID
+        :param snapshot: 调用方已获取的目录快照，调用方按其版本生成ETag；为None时获取当前快照
+        :return: 成功返回 (检测项目详情, None)，项目不存在或未启用时返回 (None, None)，失败返回 (None, 错误信息)
+        """
+        close_db_func = None
+        try:
+            db, redis, close_db_func = get_db_redis_direct()
+
+            if snapshot is None:
+                snapshot, error = CatalogSnapshotService.get_snapshot()
+                if error:
+                    return (None, error)
+            item = snapshot.item_by_id.get(item_id)
+            if item is None:
+                return (None, None)
+
+            def build():
+                params, error_msg = DetectionParamService.get_enabled_by_item_id(item_id, db, redis)
+                if error_msg:
+                    raise Exception(error_msg)
+                return {
+                    "item": {
+                        "item_id": item['item_id'],
+                        "item_name": item['item_name'],
+                        "object_id": item['object_id'],
+                        "object_name": item['object_name']
+                    },
+                    # 与检测参数图片使用相同的清洗规则
+                    "params": ImageService.clean_detection_params(params),
+                    # 同一时间段内的下载链接相同，可以随详情一起缓存
+                    "templates": [{
+                        "id": template["id"],
+                        "name": template["name"],
+                        "code": template["code"],
+                        "download_url": LinkGeneratorService.generate_window_signed_url(template["file_path"])
+                    } for template in snapshot.get_templates(item_id)]
+                }
+
+            def with_images(bundle: dict) -> dict:
+                image_urls = ImageService.get_detection_image_urls([item_id])
+                return dict(bundle, images=image_urls.get(item_id, {}))
+
+            # Redis不可用时快照没有版本，不缓存
+            if snapshot.version is None:
+                return (with_images(build()), None)
+
+            # 使用快照自身的版本，保证缓存的项目信息与版本一致
+            _, link_expire = LinkGeneratorService.get_signed_url_window()
+            digest = hashlib.md5(f"{snapshot.version}|{link_expire}".encode('utf-8')).hexdigest()[:16]
+            cache_key = f"{ItemBundleService.CACHE_PREFIX}:{item_id}:{digest}"
+            bundle = RedisUtils.get_or_compute(
+                redis, cache_key, build, ttl=LinkGeneratorService.get_default_expire_seconds()
+            )
+            return (with_images(bundle), None)
+        except Exception as e:
+            return (None, f"获取检测项目详情失败: {str(e)}")
+        finally:
+            # 如果是自己创建的会话，关闭它
+            if close_db_func:
+                close_db_func()
@@ -0,0 +1,273 @@
+# 检测项目搜索索引
+# 进程内的字符n-gram倒排索引，适用于没有分词的中文名称和规范代码
+# 以及用于输入联想的前缀补全索引
+
+import heapq
+import unicodedata
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+
+@lru_cache(maxsize=8192)
+def normalize_text(text: Optional[str]) -> str:
+    """
+    规范化文本用于搜索：全角转半角、转小写，并去掉空白和标点
+    规范代码 "GB/T 175-2007" 规范化为 "gbt1752007"，用户输入 "gbt175" 也能匹配
+    同一规范会关联到很多检测参数，结果按文本缓存，重建索引时不必重复计算
+    :param text: 原始文本
+    :return: 规范化后的文本
+    """
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKC', text).lower()
+    return ''.join(ch for ch in text if unicodedata.category(ch)[0] not in ('P', 'Z', 'C'))
+
+
+def text_grams(text: str) -> FrozenSet[str]:
+    """
+    生成规范化文本的索引项：单字和相邻两字
+    查询长度为1时用单字查找，否则用查询的所有两字组合求交集
+    :param text: 规范化后的文本
+    :return: 索引项集合
+    """
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return frozenset(grams)
+
+
+class ItemSearchIndex:
+    """检测项目倒排索引，构建后只读
+
+    每个检测项目是一个文档，包含检测项目名称、检测对象名称、检测参数名称、规范代码和规范名称等字段。
+    查询先用n-gram倒排表求交集得到候选项目，再用子串匹配校验，最后按命中字段的权重排序
+    """
+
+    # 字段权重，命中多个字段时取最高权重
+    FIELD_WEIGHTS = {
+        'item_name': 100,
+        'object_name': 60,
+        'param_name': 40,
+        'standard_code': 30,
+        'standard_name': 20
+    }
+    # 字段以查询开头、与查询完全相同时的加分
+    PREFIX_BONUS = 10
+    EXACT_BONUS = 20
+
+    __slots__ = ('_doc_ids', '_doc_fields', '_doc_grams', '_postings')
+
+    def __init__(self, doc_ids, doc_fields, doc_grams, postings):
+        # 文档序号 → 检测项目ID，序号即项目在目录中的顺序
+        self._doc_ids = doc_ids
+        # 文档序号 → ((字段权重, 规范化文本), ...)
+        self._doc_fields = doc_fields
+        # 文档序号 → 文档的索引项集合，重建时可复用
+        self._doc_grams = doc_grams
+        # 索引项 → 包含该索引项的文档序号集合
+        self._postings = postings
+
+    @classmethod
+    def build(cls, documents: Sequence[Tuple[int, Iterable[Tuple[str, str]]]],
+              previous: Optional['ItemSearchIndex'] = None) -> 'ItemSearchIndex':
+        """
+        构建索引，字段内容未变化的文档复用上一个索引中已生成的索引项
+        :param documents: 按目录顺序排列的 (检测项目ID, [(字段名, 原始文本), ...]) 列表
+        :param previous: 上一个索引
+        :return: 搜索索引
+        """
+        reusable: Dict[Tuple[Tuple[int, str], ...], FrozenSet[str]] = {}
+        if previous is not None:
+            reusable = dict(zip(previous._doc_fields, previous._doc_grams))
+
+        doc_ids: List[int] = []
+        doc_fields: List[Tuple[Tuple[int, str], ...]] = []
+        doc_grams: List[FrozenSet[str]] = []
+        postings: Dict[str, set] = {}
+        for position, (item_id, fields) in enumerate(documents):
+            normalized = {}
+            for field, text in fields:
+                value = normalize_text(text)
+                if value:
+                    weight = cls.FIELD_WEIGHTS[field]
+                    normalized[value] = max(weight, normalized.get(value, 0))
+            field_tuple = tuple(sorted(((weight, value) for value, weight in normalized.items()), reverse=True))
+            grams = reusable.get(field_tuple)
+            if grams is None:
+                grams = frozenset().union(*(text_grams(value) for _, value in field_tuple))
+            doc_ids.append(item_id)
+            doc_fields.append(field_tuple)
+            doc_grams.append(grams)
+            for gram in grams:
+                postings.setdefault(gram, set()).add(position)
+
+        return cls(
+            tuple(doc_ids), tuple(doc_fields), tuple(doc_grams),
+            {gram: frozenset(positions) for gram, positions in postings.items()}
+        )
+
+    def _candidates(self, query: str) -> FrozenSet[int]:
+        """
+        用倒排表求交集得到候选文档
+        :param query: 规范化后的查询
+        :return: 候选文档序号集合
+        """
+        grams = {query} if len(query) == 1 else {query[i:i + 2] for i in range(len(query) - 1)}
+        # 从最短的倒排表开始求交集
+        postings = sorted((self._postings.get(gram, frozenset()) for gram in grams), key=len)
+        candidates = postings[0]
+        for posting in postings[1:]:
+            if not candidates:
+                break
+            candidates = candidates & posting
+        return candidates
+
+    def search(self, keyword: str) -> List[int]:
+        """
+        搜索检测项目
+        :param keyword: 搜索关键词
+        :return: 按相关度排序的检测项目ID列表，相关度相同时保持目录顺序
+        """
+        query = normalize_text(keyword)
+        if not query:
+            return []
+
+        scored = []
+        for position in self._candidates(query):
+            score = 0
+            for weight, value in self._doc_fields[position]:
+                if query not in value:
+                    continue
+                if value == query:
+                    weight += self.EXACT_BONUS
+                elif value.startswith(query):
+                    weight += self.PREFIX_BONUS
+                score = max(score, weight)
+            if score:
+                scored.append((-score, position))
+        scored.sort()
+        return [self._doc_ids[position] for _, position in scored]
+
+
+class SuggestTrie:
+    """前缀补全索引，构建后只读
+
+    以数组形式保存的字典树：词条按规范化后的键排序存放在并列的元组中，
+    任一前缀的所有补全恰好是排序数组中的一段连续区间，用两次二分查找定位，不需要逐字符的节点对象。
+    每个词条只保存键、显示文本（与键相同时共用同一个字符串）和一个字节的类型序号，整个目录可以常驻每个worker的内存
+    """
+
+    # 词条类型及其基础权重，热度相同时优先返回权重高的类型
+    KINDS = ('item', 'object', 'param', 'standard_code', 'standard_name')
+    KIND_WEIGHTS = (5, 4, 2, 3, 1)
+    # 区间不超过该长度时直接扫描，否则使用缓存的前若干个静态排序结果
+    SCAN_LIMIT = 256
+    # 缓存的静态排序结果数量，也是单次补全的最大数量
+    MAX_LIMIT = 20
+
+    __slots__ = ('_keys', '_texts', '_kinds', '_static_top')
+
+    def __init__(self, keys, texts, kinds):
+        # 规范化后的键，升序
+        self._keys = keys
+        # 显示文本
+        self._texts = texts
+        # 类型序号（KINDS中的下标）
+        self._kinds = kinds
+        # 长区间（短前缀）按静态权重排序的前MAX_LIMIT个下标，首次查询时计算
+        self._static_top: Dict[Tuple[int, int], List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @classmethod
+    def build(cls, entries: Iterable[Tuple[str, str]]) -> 'SuggestTrie':
+        """
+        构建补全索引，规范化后相同的词条只保留基础权重最高的一个
+        :param entries: (显示文本, 类型) 列表
+        :return: 补全索引
+        """
+        best: Dict[str, Tuple[int, str]] = {}
+        for text, kind in entries:
+            key = normalize_text(text)
+            if not key:
+                continue
+            kind_index = cls.KINDS.index(kind)
+            current = best.get(key)
+            if current is None or cls.KIND_WEIGHTS[kind_index] > cls.KIND_WEIGHTS[current[0]]:
+                text = text.strip()
+                best[key] = (kind_index, key if text == key else text)
+        keys = tuple(sorted(best))
+        return cls(
+            keys,
+            tuple(best[key][1] for key in keys),
+            bytes(best[key][0] for key in keys)
+        )
+
+    def _range(self, prefix: str) -> Tuple[int, int]:
+        """
+        定位以prefix开头的词条区间
+        :param prefix: 规范化后的前缀
+        :return: [起始下标, 结束下标)
+        """
+        low = bisect_left(self._keys, prefix)
+        # 前缀后接最大码位，得到区间的上界
+        high = bisect_left(self._keys, prefix + '\U0010ffff', low)
+        return low, high
+
+    def _static_rank(self, position: int) -> Tuple[int, int, int]:
+        """词条的静态排序键：类型权重高、键短、排序靠前的优先"""
+        return (self.KIND_WEIGHTS[self._kinds[position]], -len(self._keys[position]), -position)
+
+    def contains(self, text: str) -> bool:
+        """
+        判断文本是否为索引中的完整词条
+        :param text: 原始文本
+        :return: 是完整词条返回True
+        """
+        key = normalize_text(text)
+        position = bisect_left(self._keys, key)
+        return bool(key) and position < len(self._keys) and self._keys[position] == key
+
+    def complete(self, prefix: str, limit: int = 10, popularity: Optional[Dict[str, float]] = None,
+                 popular_keys: Sequence[str] = ()) -> List[dict]:
+        """
+        获取前缀补全，按热度、类型权重、长度排序
+        :param prefix: 用户输入的前缀
+        :param limit: 最多返回的数量，不超过MAX_LIMIT
+        :param popularity: 规范化键 → 热度
+        :param popular_keys: popularity中的键，升序排列，用于定位区间内的热门词条
+        :return: [{'text': 显示文本, 'type': 类型}]
+        """
+        key = normalize_text(prefix)
+        limit = min(limit, self.MAX_LIMIT)
+        if not key or limit <= 0:
+            return []
+        low, high = self._range(key)
+        if low >= high:
+            return []
+        popularity = popularity or {}
+
+        if high - low <= self.SCAN_LIMIT:
+            candidates = range(low, high)
+        else:
+            # 长区间只比较静态排序靠前的词条和区间内的热门词条
+            static_top = self._static_top.get((low, high))
+            if static_top is None:
+                static_top = heapq.nlargest(self.MAX_LIMIT, range(low, high), key=self._static_rank)
+                self._static_top[(low, high)] = static_top
+            candidates = set(static_top)
+            start = bisect_left(popular_keys, key)
+            end = bisect_left(popular_keys, key + '\U0010ffff', start)
+            for popular_key in popular_keys[start:end]:
+                position = bisect_left(self._keys, popular_key, low, high)
+                if position < high and self._keys[position] == popular_key:
+                    candidates.add(position)
+
+        keys = self._keys
+
+        def rank(position):
+            return (popularity.get(keys[position], 0),) + self._static_rank(position)
+
+        positions = heapq.nlargest(limit, candidates, key=rank)
+        return [{"text": self._texts[p], "type": self.KINDS[self._kinds[p]]} for p in positions]
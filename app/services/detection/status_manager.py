@@ -13,36 +13,25 @@ class StatusManager:
         :param db: 数据库会话
         :param redis: Redis客户端
         """
-        from app.dal.detection_dal import CategoryDAL, DetectionObjectDAL, DetectionItemDAL, DetectionParamDAL
+        from app.dal.detection_dal import CategoryDAL, DetectionObjectDAL
         
         # 获取DAL实例
         category_dal = CategoryDAL(db, redis)
         object_dal = DetectionObjectDAL(db, redis)
-        item_dal = DetectionItemDAL(db, redis)
-        param_dal = DetectionParamDAL(db, redis)
         
         # 1. 递归禁用所有子分类
         children = category_dal.get_by_parent_id(category_id)
         for child in children:
             StatusManager.recursively_disable_category(child.category_id, db, redis)
         
-        # 2. 禁用所有关联的检测对象
+        # 2. 批量禁用所有关联的检测对象
         objects = object_dal.get_by_category_id(category_id)
-        for obj in objects:
-            # 禁用检测对象
-            object_dal.update(obj.object_id, {"status": 0})
-            
-            # 3. 禁用关联的检测项目
-            items = item_dal.get_by_condition({"object_id": obj.object_id})
-            for item in items:
-                # 禁用检测项目
-                item_dal.update(item.item_id, {"status": 0})
-                
-                # 4. 禁用关联的检测参数
-                params = param_dal.get_by_condition({"item_id": item.item_id})
-                for param in params:
-                    # 禁用检测参数
-                    param_dal.update(param.param_id, {"status": 0})
+        object_ids = [obj.object_id for obj in objects]
+        object_dal.update_many(object_ids, {"status": 0})
+        
+        # 3-4. 禁用检测对象下的检测项目和检测参数
+        for object_id in object_ids:
+            StatusManager.recursively_disable_detection_object(object_id, db, redis)
         
         # 5. 最后禁用当前分类
         category_dal.update(category_id, {"status": 0})
@@ -84,24 +73,22 @@ class StatusManager:
         :param db: 数据库会话
         :param redis: Redis客户端
         """
-        from app.dal.detection_dal import DetectionObjectDAL, DetectionItemDAL, DetectionParamDAL
+        from app.dal.detection_dal import DetectionItemDAL, DetectionParamDAL
         
         # 获取DAL实例
-        object_dal = DetectionObjectDAL(db, redis)
         item_dal = DetectionItemDAL(db, redis)
         param_dal = DetectionParamDAL(db, redis)
         
-        # 2. 禁用所有关联的检测项目
+        # 2. 批量禁用所有关联的检测项目
         items = item_dal.get_by_condition({"object_id": object_id})
-        for item in items:
-            # 禁用检测项目
-            item_dal.update(item.item_id, {"status": 0})
-            
-            # 3. 禁用所有关联的检测参数
-            params = param_dal.get_by_condition({"item_id": item.item_id})
-            for param in params:
-                # 禁用检测参数
-                param_dal.update(param.param_id, {"status": 0})
+        item_ids = [item.item_id for item in items]
+        item_dal.update_many(item_ids, {"status": 0})
+        
+        # 3. 批量禁用所有关联的检测参数
+        param_ids = []
+        for item_id in item_ids:
+            param_ids.extend(param.param_id for param in param_dal.get_by_condition({"item_id": item_id}))
+        param_dal.update_many(param_ids, {"status": 0})
     
     @staticmethod
     def recursively_enable_detection_object(object_id, db, redis):
@@ -137,17 +124,14 @@ class StatusManager:
         :param db: 数据库会话
         :param redis: Redis客户端
         """
-        from app.dal.detection_dal import DetectionItemDAL, DetectionParamDAL
+        from app.dal.detection_dal import DetectionParamDAL
         
         # 获取DAL实例
-        item_dal = DetectionItemDAL(db, redis)
         param_dal = DetectionParamDAL(db, redis)
         
-        # 2. 禁用所有关联的检测参数
+        # 2. 批量禁用所有关联的检测参数
         params = param_dal.get_by_condition({"item_id": item_id})
-        for param in params:
-            # 禁用检测参数
-            param_dal.update(param.param_id, {"status": 0})
+        param_dal.update_many([param.param_id for param in params], {"status": 0})
     
     @staticmethod
     def recursively_enable_detection_item(item_id, db, redis):
@@ -0,0 +1,99 @@
+# 输入联想服务类
+# 基于目录快照中的前缀补全索引返回联想词，按Redis中记录的搜索热度排序
+
+import random
+import threading
+import time
+from typing import Dict, Tuple
+
+from app.extensions import get_db_redis_direct
+from app.services.detection.catalog_snapshot_service import CatalogSnapshotService
+from app.services.detection.search_index import normalize_text
+from app.utils.redis_utils import RedisUtils
+
+
+class SuggestService:
+    """输入联想服务类，处理联想词查询和搜索热度统计"""
+
+    # 搜索热度有序集合，元素为规范化后的词条
+    POPULARITY_KEY = 'suggest:popularity'
+    # 每个worker缓存的热门词条数量，Redis中也只保留这么多
+    POPULARITY_LIMIT = 5000
+    # 热度缓存的刷新间隔（秒）
+    POPULARITY_REFRESH_INTERVAL = 30
+    # 每次记录热度时清理有序集合的概率
+    TRIM_PROBABILITY = 0.01
+
+    # 进程内的热度缓存及其升序排列的键，整体替换
+    _popularity: Dict[str, float] = {}
+    _popular_keys: Tuple[str, ...] = ()
+    _popularity_loaded_at = 0.0
+    _refresh_lock = threading.Lock()
+
+    @staticmethod
+    def _get_popularity(redis) -> Dict[str, float]:
+        """
+        获取进程内缓存的搜索热度，超过刷新间隔时从Redis重新读取
+        :param redis: Redis客户端
+        :return: 规范化词条 → 热度
+        """
+        now = time.monotonic()
+        if now - SuggestService._popularity_loaded_at < SuggestService.POPULARITY_REFRESH_INTERVAL:
+            return SuggestService._popularity
+        # 其他线程正在刷新时直接使用旧数据
+        if not SuggestService._refresh_lock.acquire(blocking=False):
+            return SuggestService._popularity
+        try:
+            scores = RedisUtils.get_top_scores(redis, SuggestService.POPULARITY_KEY, SuggestService.POPULARITY_LIMIT)
+            if scores is not None:
+                SuggestService._popular_keys = tuple(sorted(scores))
+                SuggestService._popularity = scores
+            SuggestService._popularity_loaded_at = now
+        finally:
+            SuggestService._refresh_lock.release()
+        return SuggestService._popularity
+
+    @staticmethod
+    def suggest(prefix: str, limit: int = 10):
+        """
+        获取输入联想词
+        :param prefix: 用户输入的前缀
+        :param limit: 最多返回的数量
+        :return: 成功返回 (联想词列表, None)，失败返回 (None, 错误信息)
+        """
+        close_db_func = None
+        try:
+            snapshot, error = CatalogSnapshotService.get_snapshot()
+            if error:
+                return (None, error)
+            db, redis, close_db_func = get_db_redis_direct()
+            popularity = SuggestService._get_popularity(redis)
+            suggestions = snapshot.suggest_trie.complete(
+                prefix, limit, popularity, SuggestService._popular_keys
+            )
+            return (suggestions, None)
+        except Exception as e:
+            return (None, f"获取联想词失败: {str(e)}")
+        finally:
+            # 如果是自己创建的会话，关闭它
+            if close_db_func:
+                close_db_func()
+
+    @staticmethod
+    def record_query(keyword: str) -> None:
+        """
+        记录一次搜索，增加对应词条的热度
+        只应对联想索引中的完整词条调用，避免任意输入占满有序集合
+        :param keyword: 搜索关键词
+        """
+        close_db_func = None
+        try:
+            db, redis, close_db_func = get_db_redis_direct()
+            RedisUtils.increment_score(redis, SuggestService.POPULARITY_KEY, normalize_text(keyword))
+            if random.random() < SuggestService.TRIM_PROBABILITY:
+                RedisUtils.trim_top_scores(redis, SuggestService.POPULARITY_KEY, SuggestService.POPULARITY_LIMIT)
+        except Exception as e:
+            print(f"记录搜索热度失败: {str(e)}")
+        finally:
+            if close_db_func:
+                close_db_func()
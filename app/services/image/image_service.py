@@ -1,16 +1,21 @@
 # 图片服务类
 # 包含SVG生成、转位图、缓存管理等功能
 
+import hashlib
+import json
 import os
 import random
 import logging
 from io import BytesIO
-from PIL import Image, ImageDraw, ImageFont
+from typing import Dict, List, Optional, Tuple
+from PIL import Image, ImageDraw
 from app.extensions import get_db_redis_direct
 from app.dal.data_image_dal import DataImageDAL
 from app.utils.redis_utils import RedisUtils
+from app.core.compression import choose_encoding, precompress_variants, supported_encodings
+from app.core.render_pool import collect_pngs, submit_pngs
+from app.utils.font_registry import font_registry
 from app.utils.svg_generator import svg_generator
-from app.utils.data_to_png_direct_converter import data_to_png_direct_converter
 
 # 创建日志记录器
 logger = logging.getLogger(__name__)
@@ -21,6 +26,9 @@ class ImageService:
     # 缓存过期时间（秒）
     CACHE_EXPIRE = 15 * 24 * 3600  # 15天
     
+    # 渲染器版本，修改表格、水印等渲染代码或样式后递增，使已生成的图片按新样式重新生成
+    RENDER_VERSION = 2
+    
     # 设备类型对应的宽度和DPI配置
     DEVICE_CONFIG = {
         'pc': {'width': 1200, 'dpi': 300},
@@ -30,6 +38,182 @@ class ImageService:
     
 
     
+    @staticmethod
+    def get_image_meta(data_unique_id: str, device_type: str) -> Optional[dict]:
+        """
+        获取图片的版本信息，用于条件请求，优先从Redis缓存获取，不读取图片内容
+        :param data_unique_id: 数据唯一标识
+        :param device_type: 设备类型（pc/phone/tablet）
+        :return: {'version': 版本号, 'updated_at': 更新时间}，图片不存在或获取失败返回None
+        """
+        close_db_func = None
+        try:
+            db, redis, close_db_func = get_db_redis_direct()
+            data_image_dal = DataImageDAL(db, redis)
+            
+            cache_key = f"data_img_meta:{data_unique_id}:{device_type}"
+            # 批量读取时会把不存在的图片缓存为空字典
+            return RedisUtils.get_or_compute(
+                redis, cache_key,
+                lambda: data_image_dal.get_meta_by_data_and_device(data_unique_id, device_type),
+                ttl=ImageService.CACHE_EXPIRE
+            ) or None
+        except Exception as e:
+            logger.error(f"获取图片版本信息失败: {e}")
+            return None
+        finally:
+            if close_db_func:
+                close_db_func()
+    
+    @staticmethod
+    def _get_cached_image(data_image_dal: DataImageDAL, data_unique_id: str, device_type: str) -> Optional[dict]:
+        """
+        获取缓存的图片内容及其版本号，未命中时查询数据库并回填
+        :param data_image_dal: 数据图片数据访问层
+        :param data_unique_id: 数据唯一标识
+        :param device_type: 设备类型（pc/phone/tablet）
+        :return: {'svg_content', 'png_data', 'version'}，图片不存在返回None
+        """
+        redis = data_image_dal.redis
+        # 生成缓存键
+        cache_key = f"data_img:{data_unique_id}:{device_type}"
+        
+        def load_image():
+            image = data_image_dal.get_by_data_and_device(data_unique_id, device_type)
+            if not image:
+                return None
+            # 只缓存返回图片需要的字段，png_data和SVG预压缩数据以bytes原样缓存
+            # 版本号与内容一起缓存，带版本号的地址据此校验内容与地址一致
+            return {
+                'svg_content': image.svg_content,
+                'svg_gzip': image.svg_gzip,
+                'svg_br': image.svg_br,
+                'png_data': image.png_data,
+                'version': image.version
+            }
+        
+        # 优先从Redis获取，未命中时只有一个worker查询数据库并回填，其他请求等待结果
+        cached_data = RedisUtils.get_or_compute(redis, cache_key, load_image, ttl=ImageService.CACHE_EXPIRE)
+        if cached_data and (isinstance(cached_data.get('png_data'), str) or 'version' not in cached_data):
+            # 旧版本JSON缓存中的png_data是字符串，旧缓存中没有版本号，重新从数据库获取
+            RedisUtils.delete_cache(redis, cache_key)
+            cached_data = RedisUtils.get_or_compute(redis, cache_key, load_image, ttl=ImageService.CACHE_EXPIRE)
+        return cached_data
+    
+    @staticmethod
+    def get_image_metas(data_unique_ids: List[str], device_type: str) -> Dict[str, dict]:
+        """
+        批量获取图片的版本信息，一次MGET读取缓存，未命中的用一条IN查询获取并回填
+        :param data_unique_ids: 数据唯一标识列表
+        :param device_type: 设备类型（pc/phone/tablet）
+        :return: 数据唯一标识 → {'version': 版本号, 'updated_at': 更新时间}，图片不存在的不包含
+        """
+        metas = ImageService._get_image_metas(data_unique_ids, [device_type])
+        return {data_unique_id: meta for (data_unique_id, _), meta in metas.items()}
+    
+    @staticmethod
+    def get_detection_image_urls(item_ids: List[int]) -> Dict[int, Dict[str, str]]:
+        """
+        批量获取检测项目各设备类型带版本号的PNG图片地址，一次MGET读取所有设备类型的版本信息
+        图片版本不属于目录快照，图片重新生成不会触发快照重建
+        :param item_ids: 检测项目ID列表
+        :return: 检测项目ID → {设备类型: 图片地址}，未生成的设备类型不包含
+        """
+        data_unique_ids = {f"detection:{item_id}": item_id for item_id in item_ids}
+        metas = ImageService._get_image_metas(list(data_unique_ids), list(ImageService.DEVICE_CONFIG))
+        result: Dict[int, Dict[str, str]] = {item_id: {} for item_id in item_ids}
+        for (data_unique_id, device_type), meta in metas.items():
+            result[data_unique_ids[data_unique_id]][device_type] = ImageService.get_image_url(
+                data_unique_id, device_type, meta['version']
+            )
+        return result
+    
+    @staticmethod
+    def _get_image_metas(data_unique_ids: List[str], device_types: List[str]) -> Dict[Tuple[str, str], dict]:
+        """
+        批量获取多个设备类型的图片版本信息，一次MGET读取缓存，未命中的用一条IN查询获取并回填
+        不存在的图片缓存为空字典，还未生成图片的检测项目不会每次都查询数据库，图片写入时清除
+        :param data_unique_ids: 数据唯一标识列表
+        :param device_types: 设备类型列表
+        :return: (数据唯一标识, 设备类型) → {'version': 版本号, 'updated_at': 更新时间}，图片不存在的不包含
+        """
+        close_db_func = None
+        try:
+            db, redis, close_db_func = get_db_redis_direct()
+            
+            pairs = [(data_unique_id, device_type) for data_unique_id in data_unique_ids for device_type in device_types]
+            cache_keys = [f"data_img_meta:{data_unique_id}:{device_type}" for data_unique_id, device_type in pairs]
+            cached = dict(zip(pairs, RedisUtils.get_many_cache(redis, cache_keys)))
+            metas = {pair: meta for pair, meta in cached.items() if meta}
+            missing = [pair for pair, meta in cached.items() if meta is None]
+            if missing:
+                loaded = DataImageDAL(db, redis).get_meta_by_data_ids_and_devices(
+                    list(dict.fromkeys(data_unique_id for data_unique_id, _ in missing)),
+                    list(dict.fromkeys(device_type for _, device_type in missing))
+                )
+                RedisUtils.set_many_cache(redis, {
+                    f"data_img_meta:{data_unique_id}:{device_type}": loaded.get((data_unique_id, device_type), {})
+                    for data_unique_id, device_type in missing
+                }, expire=ImageService.CACHE_EXPIRE)
+                metas.update((pair, loaded[pair]) for pair in missing if pair in loaded)
+            return metas
+        except Exception as e:
+            logger.error(f"批量获取图片版本信息失败: {e}")
+            return {}
+        finally:
+            if close_db_func:
+                close_db_func()
+    
+    @staticmethod
+    def get_image_url(data_unique_id: str, device_type: str, version: int, image_type: str = "png") -> str:
+        """
+        生成带版本号的图片地址，同一地址的内容不会变化，可以长期缓存
+        :param data_unique_id: 数据唯一标识
+        :param device_type: 设备类型（pc/phone/tablet）
+        :param version: 图片版本号
+        :param image_type: 图片类型（png或svg）
+        :return: 图片地址
+        """
+        return f"/api/image/{data_unique_id}/{device_type}/v{version}.{image_type}"
+    
+    @staticmethod
+    def get_versioned_image(data_unique_id: str, device_type: str, version: int, image_type: str = "png",
+                            accept_encoding: Optional[str] = None) -> Tuple[Optional[bytes], Optional[str]]:
+        """
+        获取指定版本的图片数据，SVG优先返回客户端接受的预压缩版本
+        :param data_unique_id: 数据唯一标识
+        :param device_type: 设备类型（pc/phone/tablet）
+        :param version: 图片版本号
+        :param image_type: 图片类型（png或svg）
+        :param accept_encoding: 请求的Accept-Encoding头
+        :return: (图片二进制数据, 压缩编码)，未压缩时编码为None；图片不存在或当前版本不是指定版本时返回 (None, None)
+        """
+        close_db_func = None
+        try:
+            db, redis, close_db_func = get_db_redis_direct()
+            data_image_dal = DataImageDAL(db, redis)
+            
+            cached_data = ImageService._get_cached_image(data_image_dal, data_unique_id, device_type)
+            if not cached_data or cached_data['version'] != version:
+                return (None, None)
+            if image_type == "svg":
+                # 渲染前保存的旧记录没有预压缩数据，返回原始SVG，由压缩中间件处理
+                variants = {
+                    encoding: cached_data.get(f'svg_{encoding}')
+                    for encoding in supported_encodings()
+                }
+                encoding = choose_encoding(accept_encoding, [name for name, data in variants.items() if data])
+                if encoding:
+                    return (variants[encoding], encoding)
+                return (cached_data['svg_content'].encode('utf-8'), None)
+            return (cached_data['png_data'], None)
+        except Exception as e:
+            logger.error(f"获取图片失败: {e}")
+            return (None, None)
+        finally:
+            if close_db_func:
+                close_db_func()
+    
     @staticmethod
     def get_image(data_unique_id: str, device_type: str, image_type: str = "png") -> bytes:
         """
@@ -44,27 +228,13 @@ class ImageService:
             db, redis, close_db_func = get_db_redis_direct()
             data_image_dal = DataImageDAL(db, redis)
             
-            # 生成缓存键
-            cache_key = f"data_img:{data_unique_id}:{device_type}"
-            
-            # 先从Redis获取
-            cached_data = RedisUtils.get_cache(redis, cache_key)
+            cached_data = ImageService._get_cached_image(data_image_dal, data_unique_id, device_type)
             if cached_data:
                 if image_type == "svg":
                     return cached_data['svg_content'].encode('utf-8')
                 else:
                     return cached_data['png_data']
             
-            # 缓存未命中，从数据库获取
-            image = data_image_dal.get_by_data_and_device(data_unique_id, device_type)
-            if image:
-                # 将数据存入缓存
-                RedisUtils.set_cache(redis, cache_key, image.__dict__, expire=ImageService.CACHE_EXPIRE)
-                if image_type == "svg":
-                    return image.svg_content.encode('utf-8')
-                else:
-                    return image.png_data
-            
             # 图片不存在，返回一个简单的图片
             if image_type == "svg":
                 # 返回简单的SVG图片
@@ -81,10 +251,7 @@ class ImageService:
                 img = Image.new('RGB', (width, height), color='white')
                 draw = ImageDraw.Draw(img)
                 
-                try:
-                    font = ImageFont.truetype("arial.ttf", 20)
-                except:
-                    font = ImageFont.load_default()
+                font = font_registry.get_font('body', 20)
                 
                 text = "图片不存在"
                 text_bbox = draw.textbbox((0, 0), text, font=font)
@@ -115,10 +282,7 @@ class ImageService:
                 img = Image.new('RGB', (width, height), color='white')
                 draw = ImageDraw.Draw(img)
                 
-                try:
-                    font = ImageFont.truetype("arial.ttf", 20)
-                except:
-                    font = ImageFont.load_default()
+                font = font_registry.get_font('body', 20)
                 
                 text = f"图片生成错误: {str(e)[:50]}"
                 text_bbox = draw.textbbox((0, 0), text, font=font)
@@ -136,9 +300,9 @@ class ImageService:
                 close_db_func()
     
     @staticmethod
-    def _clean_detection_params(params: list) -> list:
+    def clean_detection_params(params: list) -> list:
         """
-        清洗检测参数数据，只保留指定字段
+        清洗检测参数数据，只保留指定字段，检测参数图片和公开检测项目详情使用相同的格式
         
         :param params: 原始检测参数列表
         :return: 清洗后的检测参数列表，按is_regular_param降序和sort_order升序排序
@@ -205,9 +369,26 @@ class ImageService:
         # 排序：先按is_regular_param降序（常规参数在前），再按sort_order升序（按排序号排列）
         cleaned_params.sort(key=lambda x: (-x.get('is_regular_param', 0), x.get('sort_order', 0)))
         
-        print(cleaned_params)
+        logger.debug(f"清洗后的检测参数: {cleaned_params}")
         return cleaned_params
     
+    @staticmethod
+    def render_fingerprint(cleaned_params: list) -> str:
+        """
+        计算检测参数表格的渲染内容指纹，指纹相同的表格渲染出的图片相同
+        :param cleaned_params: clean_detection_params 返回的检测参数列表（已排序）
+        :return: SHA-256十六进制字符串
+        """
+        payload = json.dumps(
+            {
+                'renderer': ImageService.RENDER_VERSION,
+                'devices': ImageService.DEVICE_CONFIG,
+                'rows': cleaned_params
+            },
+            ensure_ascii=False, sort_keys=True, separators=(',', ':'), default=str
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
     @staticmethod
     def generate_detection_image(item_id: int, item_name: str) -> dict:
         """
@@ -230,52 +411,88 @@ class ImageService:
         data_unique_id = f"detection:{item_id}"
         
         # 数据清洗：只保留指定字段
-        cleaned_params = ImageService._clean_detection_params(params)
+        cleaned_params = ImageService.clean_detection_params(params)
+        content_hash = ImageService.render_fingerprint(cleaned_params)
+        device_types = list(ImageService.DEVICE_CONFIG.keys())
         
-        # 使用svg_generator处理数据并生成SVG
-        # 1. 转换检测数据
-        transformed_data = svg_generator.transform_detection_data(cleaned_params)
-        # 2. 清洗重复相邻单元格
-        cleaned_data = svg_generator.clean_duplicate_adjacent_cells(transformed_data)
-        # 3. 生成原始SVG
-        svg_content = svg_generator.generate_svg(cleaned_data)
-        # 4. 添加文本水印
-        svg_content_with_watermark = svg_generator.add_text_watermark_to_svg(svg_content)
-        # 5. 添加防爬水印和噪点
-        svg_content = svg_generator.add_anti_crawl_watermark(svg_content_with_watermark)
-        
-        # 保存图片到数据库
         close_db_func = None
         try:
             db, redis, close_db_func = get_db_redis_direct()
             data_image_dal = DataImageDAL(db, redis)
             
-            # 为所有设备类型生成并保存图片
-            for device_type in ImageService.DEVICE_CONFIG.keys():
-                # 使用数据直接生成PNG，不经过SVG转换
-                # 注意：使用cleaned_params而不是cleaned_data，避免数据被转换两次
-                png_data = data_to_png_direct_converter.convert_data_to_png(cleaned_params, device_type)
-                
-                # 保存到数据库
-                image_data = {
-                    'data_unique_id': data_unique_id,
-                    'device_type': device_type,
-                    'svg_content': svg_content,
-                    'png_data': png_data
+            # 所有设备类型的图片都由相同的表格内容渲染时，图片不会变化，不重新生成也不递增版本号
+            existing_hashes = data_image_dal.get_content_hashes(data_unique_id)
+            if all(existing_hashes.get(device_type) == content_hash for device_type in device_types):
+                logger.info(f"检测参数表格内容未变化，跳过图片生成: 项目{item_id}")
+                return {
+                    "data_unique_id": data_unique_id,
+                    "item_id": item_id,
+                    "item_name": item_name,
+                    "skipped": True
                 }
-                
-                # 先尝试更新，不存在则创建
-                existing_image = data_image_dal.get_by_data_and_device(data_unique_id, device_type)
-                if existing_image:
-                    # 更新现有记录，版本号+1
-                    image_data['version'] = existing_image.version + 1
-                    data_image_dal.update(existing_image.image_id, image_data)
-                else:
-                    # 创建新记录
-                    data_image_dal.create(image_data)
-        except Exception as e:
-            logger.error(f"保存图片到数据库失败: {e}")
-            raise Exception(f"保存图片到数据库失败: {e}")
+            
+            # 其他检测项目已渲染过相同表格时直接复用其图片，只渲染缺少的设备类型
+            shared_images = data_image_dal.get_by_content_hash(content_hash, exclude_data_unique_id=data_unique_id)
+            
+            # 先把各设备类型的PNG提交到渲染进程池并行渲染，在当前进程生成SVG的同时进行
+            # 注意：使用cleaned_params而不是cleaned_data，避免数据被转换两次
+            png_futures = submit_pngs(
+                cleaned_params, [device_type for device_type in device_types if device_type not in shared_images]
+            )
+            
+            if shared_images:
+                # 各设备类型共用同一份SVG
+                shared_image = next(iter(shared_images.values()))
+                svg_content = shared_image.svg_content
+                svg_variants = {'gzip': shared_image.svg_gzip, 'br': shared_image.svg_br}
+            else:
+                # 使用svg_generator处理数据并生成SVG
+                # 1. 转换检测数据
+                transformed_data = svg_generator.transform_detection_data(cleaned_params)
+                # 2. 清洗重复相邻单元格
+                cleaned_data = svg_generator.clean_duplicate_adjacent_cells(transformed_data)
+                # 3. 生成原始SVG
+                svg_content = svg_generator.generate_svg(cleaned_data)
+                # 4. 添加文本水印
+                svg_content_with_watermark = svg_generator.add_text_watermark_to_svg(svg_content)
+                # 5. 添加防爬水印和噪点
+                svg_content = svg_generator.add_anti_crawl_watermark(svg_content_with_watermark)
+                # 6. 预压缩SVG，各设备类型共用同一份SVG，只压缩一次
+                svg_variants = precompress_variants(svg_content.encode('utf-8'))
+            # 7. 等待PNG渲染完成，耗时约为最慢的一个设备类型
+            png_images = {device_type: image.png_data for device_type, image in shared_images.items()}
+            png_images.update(collect_pngs(png_futures))
+            
+            # 保存图片到数据库
+            try:
+                # 为所有设备类型保存图片
+                for device_type in device_types:
+                    image_data = {
+                        'data_unique_id': data_unique_id,
+                        'device_type': device_type,
+                        'svg_content': svg_content,
+                        'svg_gzip': svg_variants['gzip'],
+                        'svg_br': svg_variants['br'],
+                        'png_data': png_images[device_type],
+                        'content_hash': content_hash
+                    }
+                    
+                    # 先尝试更新，不存在则创建
+                    existing_image = data_image_dal.get_by_data_and_device(data_unique_id, device_type)
+                    if existing_image:
+                        # 更新现有记录，版本号+1
+                        image_data['version'] = existing_image.version + 1
+                        data_image_dal.update(existing_image.image_id, image_data)
+                    else:
+                        # 创建新记录
+                        data_image_dal.create(image_data)
+                    
+                    # 清除图片缓存和版本信息，使条件请求的ETag随新版本变化
+                    data_image_dal.delete_cache(f"data_img:{data_unique_id}:{device_type}")
+                    data_image_dal.delete_cache(f"data_img_meta:{data_unique_id}:{device_type}")
+            except Exception as e:
+                logger.error(f"保存图片到数据库失败: {e}")
+                raise Exception(f"保存图片到数据库失败: {e}")
         finally:
             if close_db_func:
                 close_db_func()
@@ -283,7 +500,8 @@ class ImageService:
         return {
             "data_unique_id": data_unique_id,
             "item_id": item_id,
-            "item_name": item_name
+            "item_name": item_name,
+            "skipped": False
         }
     
 
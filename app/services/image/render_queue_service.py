@@ -0,0 +1,393 @@
+# 图片渲染队列服务类
+# 检测参数变更后把检测项目的图片重新生成任务放入Redis队列，由独立的worker进程渲染，参数写入接口不再等待渲染
+# 队列是以检测项目ID为成员的有序集合，分数为任务的执行时间：同一项目的多次变更合并为一个任务，
+# 每次变更把执行时间推迟一个防抖间隔（不超过首次入队后的最大延迟），连续编辑只渲染一次
+
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+from typing import Callable, Optional
+
+from app.extensions import get_db_redis_direct
+
+# 创建日志记录器
+logger = logging.getLogger(__name__)
+
+
+# 入队后等待的秒数，期间同一项目的新变更会推迟执行时间
+RENDER_DEBOUNCE_SECONDS = float(os.environ.get('RENDER_DEBOUNCE_SECONDS') or 2)
+# 首次入队后最多推迟的秒数，持续编辑时也能按时渲染
+RENDER_MAX_DELAY_SECONDS = float(os.environ.get('RENDER_MAX_DELAY_SECONDS') or 30)
+# 失败后的最大尝试次数，重试间隔从RENDER_RETRY_BASE_SECONDS开始按2的幂增长，不超过RENDER_RETRY_MAX_SECONDS
+RENDER_MAX_ATTEMPTS = int(os.environ.get('RENDER_MAX_ATTEMPTS') or 5)
+RENDER_RETRY_BASE_SECONDS = float(os.environ.get('RENDER_RETRY_BASE_SECONDS') or 5)
+RENDER_RETRY_MAX_SECONDS = float(os.environ.get('RENDER_RETRY_MAX_SECONDS') or 300)
+# worker领取任务后的租约秒数，超时未完成（如进程退出）的任务重新入队
+RENDER_LEASE_SECONDS = float(os.environ.get('RENDER_LEASE_SECONDS') or 300)
+# 已结束任务的状态保留秒数
+RENDER_JOB_TTL = int(os.environ.get('RENDER_JOB_TTL') or 7 * 24 * 3600)
+# 队列为空时worker的轮询间隔（秒）
+RENDER_POLL_INTERVAL = float(os.environ.get('RENDER_POLL_INTERVAL') or 1)
+# 每个worker进程同时处理的任务数量，批量重新生成时不同检测项目的PNG在渲染进程池中并行渲染
+RENDER_WORKER_THREADS = int(os.environ.get('RENDER_WORKER_THREADS') or 2)
+
+
+# 入队：合并同一项目的任务，执行时间取 min(当前时间+防抖间隔, 首次入队时间+最大延迟)
+# KEYS: 待执行队列, 任务状态 ARGV: 项目ID, 项目名称, 当前时间, 防抖间隔, 最大延迟
+_ENQUEUE_SCRIPT = """
+local status = redis.call('hget', KEYS[2], 'status')
+local first = tonumber(redis.call('hget', KEYS[2], 'first_enqueued_at'))
+if status ~= 'pending' or not first then
+    first = tonumber(ARGV[3])
+end
+local due = math.min(tonumber(ARGV[3]) + tonumber(ARGV[4]), first + tonumber(ARGV[5]))
+redis.call('hset', KEYS[2], 'status', 'pending', 'item_name', ARGV[2], 'first_enqueued_at', tostring(first),
+    'enqueued_at', ARGV[3], 'attempts', '0')
+redis.call('persist', KEYS[2])
+redis.call('zadd', KEYS[1], due, ARGV[1])
+return redis.call('hincrby', KEYS[2], 'requested', 1)
+"""
+
+# 领取：取到期的任务中第一个不在执行中的项目，同一项目不会被两个worker同时渲染
+# KEYS: 待执行队列, 执行中队列 ARGV: 当前时间, 租约秒数, 任务状态键前缀, worker标识
+_CLAIM_SCRIPT = """
+local ids = redis.call('zrangebyscore', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, 20)
+for _, id in ipairs(ids) do
+    if not redis.call('zscore', KEYS[2], id) then
+        redis.call('zrem', KEYS[1], id)
+        redis.call('zadd', KEYS[2], tonumber(ARGV[1]) + tonumber(ARGV[2]), id)
+        local job = ARGV[3] .. id
+        redis.call('hset', job, 'status', 'running', 'started_at', ARGV[1], 'worker', ARGV[4])
+        local attempts = redis.call('hincrby', job, 'attempts', 1)
+        return {id, redis.call('hget', job, 'requested') or '0', redis.call('hget', job, 'item_name') or '',
+            tostring(attempts)}
+    end
+end
+return nil
+"""
+
+# 完成：渲染期间没有新的变更时标记为完成，否则任务已重新入队，保持pending；返回任务结束后的状态
+# 任务状态已过期时不再重新创建（重新创建的状态没有过期时间），直接返回done
+# KEYS: 执行中队列, 任务状态 ARGV: 项目ID, 领取时的变更序号, 当前时间, 状态保留秒数
+_COMPLETE_SCRIPT = """
+redis.call('zrem', KEYS[1], ARGV[1])
+if redis.call('exists', KEYS[2]) == 0 then
+    return 'done'
+end
+redis.call('hset', KEYS[2], 'finished_at', ARGV[3], 'last_error', '')
+if redis.call('hget', KEYS[2], 'requested') ~= ARGV[2] then
+    return 'pending'
+end
+redis.call('hset', KEYS[2], 'status', 'done')
+redis.call('expire', KEYS[2], ARGV[4])
+return 'done'
+"""
+
+# 失败：渲染期间有新的变更时已重新入队，不计入失败；否则按退避间隔重试，超过最大次数标记为失败
+# KEYS: 执行中队列, 待执行队列, 任务状态
+# ARGV: 项目ID, 领取时的变更序号, 当前时间, 错误信息, 是否可重试, 最大尝试次数, 重试基础间隔, 重试最大间隔, 状态保留秒数
+_FAIL_SCRIPT = """
+redis.call('zrem', KEYS[1], ARGV[1])
+redis.call('hset', KEYS[3], 'finished_at', ARGV[3], 'last_error', ARGV[4])
+if redis.call('hget', KEYS[3], 'requested') ~= ARGV[2] then
+    return 'pending'
+end
+local attempts = tonumber(redis.call('hget', KEYS[3], 'attempts') or '1')
+if ARGV[5] == '1' and attempts < tonumber(ARGV[6]) then
+    local delay = math.min(tonumber(ARGV[7]) * 2 ^ (attempts - 1), tonumber(ARGV[8]))
+    redis.call('hset', KEYS[3], 'status', 'retrying')
+    redis.call('zadd', KEYS[2], tonumber(ARGV[3]) + delay, ARGV[1])
+    return 'retrying'
+end
+redis.call('hset', KEYS[3], 'status', 'failed')
+redis.call('expire', KEYS[3], ARGV[9])
+return 'failed'
+"""
+
+# 回收：租约过期的任务（worker进程退出或卡住）立即重新入队，超过最大尝试次数的标记为失败
+# KEYS: 执行中队列, 待执行队列 ARGV: 当前时间, 任务状态键前缀, 最大尝试次数, 状态保留秒数
+_REAP_SCRIPT = """
+local ids = redis.call('zrangebyscore', KEYS[1], '-inf', ARGV[1])
+for _, id in ipairs(ids) do
+    redis.call('zrem', KEYS[1], id)
+    local job = ARGV[2] .. id
+    redis.call('hset', job, 'last_error', '渲染超时或worker进程退出')
+    if tonumber(redis.call('hget', job, 'attempts') or '0') < tonumber(ARGV[3]) then
+        redis.call('hset', job, 'status', 'retrying')
+        redis.call('zadd', KEYS[2], ARGV[1], id)
+    else
+        redis.call('hset', job, 'status', 'failed', 'finished_at', ARGV[1])
+        redis.call('expire', job, ARGV[4])
+    end
+end
+return #ids
+"""
+
+
+class RenderQueueService:
+    """图片渲染队列服务类，处理渲染任务的入队、领取、重试和状态查询"""
+
+    # 待执行队列：有序集合，成员为检测项目ID，分数为执行时间
+    PENDING_KEY = 'render_queue:pending'
+    # 执行中队列：有序集合，成员为检测项目ID，分数为租约到期时间
+    RUNNING_KEY = 'render_queue:running'
+    # 任务状态键前缀，完整格式：render_job:{检测项目ID}
+    JOB_PREFIX = 'render_job:'
+
+    @staticmethod
+    def _job_key(item_id) -> str:
+        """获取任务状态键"""
+        return f"{RenderQueueService.JOB_PREFIX}{item_id}"
+
+    @staticmethod
+    def enqueue(redis, item_id: int, item_name: str = '', delay: Optional[float] = None) -> bool:
+        """
+        把检测项目的图片重新生成任务放入队列，已在队列中的任务合并并推迟执行
+        :param redis: Redis客户端
+        :param item_id: 检测项目ID
+        :param item_name: 检测项目名称
+        :param delay: 防抖间隔（秒），默认RENDER_DEBOUNCE_SECONDS，传0表示尽快执行
+        :return: 成功返回True，Redis不可用或失败返回False
+        """
+        if not redis:
+            return False
+        try:
+            redis.eval(
+                _ENQUEUE_SCRIPT, 2, RenderQueueService.PENDING_KEY, RenderQueueService._job_key(item_id),
+                item_id, item_name or '', time.time(),
+                RENDER_DEBOUNCE_SECONDS if delay is None else delay, RENDER_MAX_DELAY_SECONDS
+            )
+            return True
+        except Exception as e:
+            logger.error(f"图片渲染任务入队失败: 项目{item_id}, {str(e)}")
+            return False
+
+    @staticmethod
+    def schedule_render(redis, item_id: int, item_name: str = '') -> None:
+        """
+        在当前事务提交后安排检测项目的图片重新生成，worker只会读取到已提交的参数
+        Redis不可用时退回到提交后同步生成
+        :param redis: Redis客户端
+        :param item_id: 检测项目ID
+        :param item_name: 检测项目名称
+        """
+        from app.extensions import run_after_commit
+
+        def schedule():
+            if RenderQueueService.enqueue(redis, item_id, item_name):
+                logger.info(f"图片渲染任务已入队: 项目{item_id}")
+                return
+            RenderQueueService.render(item_id, item_name)
+
+        run_after_commit(schedule)
+
+    @staticmethod
+    def render(item_id: int, item_name: str = '') -> None:
+        """
+        同步生成检测项目的图片
+        :param item_id: 检测项目ID
+        :param item_name: 检测项目名称
+        """
+        from app.services.image.image_service import ImageService
+
+        result = ImageService.generate_detection_image(item_id, item_name or f"项目{item_id}")
+        if not result.get('skipped'):
+            logger.info(f"成功重新生成检测参数图片: 项目{item_id}")
+
+    @staticmethod
+    def get_job(redis, item_id: int) -> Optional[dict]:
+        """
+        获取检测项目的渲染任务状态
+        :param redis: Redis客户端
+        :param item_id: 检测项目ID
+        :return: 任务状态字典，没有任务记录时返回None
+        """
+        if not redis:
+            return None
+        pipe = redis.pipeline(transaction=False)
+        pipe.hgetall(RenderQueueService._job_key(item_id))
+        pipe.zscore(RenderQueueService.PENDING_KEY, item_id)
+        job, next_run_at = pipe.execute()
+        if not job:
+            return None
+
+        def as_float(value):
+            return float(value) if value else None
+
+        return {
+            "item_id": item_id,
+            "item_name": job.get('item_name') or None,
+            "status": job.get('status'),
+            "attempts": int(job.get('attempts') or 0),
+            "requested": int(job.get('requested') or 0),
+            "enqueued_at": as_float(job.get('enqueued_at')),
+            "next_run_at": next_run_at,
+            "started_at": as_float(job.get('started_at')),
+            "finished_at": as_float(job.get('finished_at')),
+            "last_error": job.get('last_error') or None
+        }
+
+    @staticmethod
+    def get_job_status(item_id: int):
+        """
+        查询检测项目的渲染任务状态
+        :param item_id: 检测项目ID
+        :return: 成功返回 (任务状态字典, None)，失败返回 (None, 错误信息)
+        """
+        _, redis, close_db_func = get_db_redis_direct()
+        try:
+            if not redis:
+                return (None, "Redis不可用，无法查询渲染任务")
+            job = RenderQueueService.get_job(redis, item_id)
+            if job is None:
+                return (None, f"检测项目 {item_id} 没有渲染任务记录")
+            return (job, None)
+        except Exception as e:
+            return (None, f"查询渲染任务失败: {str(e)}")
+        finally:
+            if close_db_func:
+                close_db_func()
+
+    @staticmethod
+    def request_render(item_id: int, item_name: str = ''):
+        """
+        立即把检测项目的图片重新生成任务放入队列，不等待防抖间隔
+        :param item_id: 检测项目ID
+        :param item_name: 检测项目名称
+        :return: 成功返回 (任务状态字典, None)，失败返回 (None, 错误信息)
+        """
+        _, redis, close_db_func = get_db_redis_direct()
+        try:
+            if not RenderQueueService.enqueue(redis, item_id, item_name, delay=0):
+                return (None, "渲染任务入队失败，请检查Redis是否可用")
+            return (RenderQueueService.get_job(redis, item_id), None)
+        except Exception as e:
+            return (None, f"渲染任务入队失败: {str(e)}")
+        finally:
+            if close_db_func:
+                close_db_func()
+
+    @staticmethod
+    def get_stats(redis) -> dict:
+        """
+        获取队列统计
+        :param redis: Redis客户端
+        :return: {'pending': 待执行数量, 'due': 已到执行时间的数量, 'running': 执行中数量}
+        """
+        pipe = redis.pipeline(transaction=False)
+        pipe.zcard(RenderQueueService.PENDING_KEY)
+        pipe.zcount(RenderQueueService.PENDING_KEY, '-inf', time.time())
+        pipe.zcard(RenderQueueService.RUNNING_KEY)
+        pending, due, running = pipe.execute()
+        return {"pending": pending, "due": due, "running": running}
+
+    @staticmethod
+    def reap_expired(redis) -> int:
+        """
+        回收租约过期的任务
+        :param redis: Redis客户端
+        :return: 回收的任务数量
+        """
+        return redis.eval(
+            _REAP_SCRIPT, 2, RenderQueueService.RUNNING_KEY, RenderQueueService.PENDING_KEY,
+            time.time(), RenderQueueService.JOB_PREFIX, RENDER_MAX_ATTEMPTS, RENDER_JOB_TTL
+        )
+
+    @staticmethod
+    def run_once(redis, worker_id: str = '') -> Optional[str]:
+        """
+        领取并执行一个到期的任务
+        :param redis: Redis客户端
+        :param worker_id: worker标识，记录在任务状态中
+        :return: 没有到期任务返回None，否则返回任务结束后的状态（done/pending/retrying/failed）
+        """
+        claimed = redis.eval(
+            _CLAIM_SCRIPT, 2, RenderQueueService.PENDING_KEY, RenderQueueService.RUNNING_KEY,
+            time.time(), RENDER_LEASE_SECONDS, RenderQueueService.JOB_PREFIX, worker_id
+        )
+        if not claimed:
+            return None
+        item_id, requested, item_name, attempts = claimed
+        job_key = RenderQueueService._job_key(item_id)
+        logger.info(f"开始渲染检测项目图片: 项目{item_id}，第{attempts}次尝试")
+
+        try:
+            RenderQueueService.render(int(item_id), item_name)
+        except Exception as e:
+            error_msg = str(e)
+            # 项目下没有启用的检测参数时重试也不会成功
+            retriable = "没有启用的检测参数" not in error_msg
+            result = redis.eval(
+                _FAIL_SCRIPT, 3, RenderQueueService.RUNNING_KEY, RenderQueueService.PENDING_KEY, job_key,
+                item_id, requested, time.time(), error_msg, '1' if retriable else '0',
+                RENDER_MAX_ATTEMPTS, RENDER_RETRY_BASE_SECONDS, RENDER_RETRY_MAX_SECONDS, RENDER_JOB_TTL
+            )
+            logger.error(f"渲染检测项目图片失败: 项目{item_id}, {error_msg}，任务状态: {result}")
+            return result
+
+        return redis.eval(
+            _COMPLETE_SCRIPT, 2, RenderQueueService.RUNNING_KEY, job_key,
+            item_id, requested, time.time(), RENDER_JOB_TTL
+        )
+
+    @staticmethod
+    def run_worker(stop: Optional[Callable[[], bool]] = None, burst: bool = False,
+                   threads: Optional[int] = None) -> int:
+        """
+        worker主循环：回收过期任务、领取并执行到期任务，队列为空时按轮询间隔等待
+        多个线程同时处理不同的检测项目，PNG渲染在渲染进程池中并行执行
+        收到SIGTERM/SIGINT时执行完当前任务后退出
+        :param stop: 返回True时退出循环的函数
+        :param burst: 为True时队列中没有到期任务就退出
+        :param threads: 同时处理的任务数量，默认RENDER_WORKER_THREADS
+        :return: 执行的任务数量
+        """
+        _, redis, close_db_func = get_db_redis_direct()
+        if close_db_func:
+            close_db_func()
+        if not redis:
+            raise RuntimeError("Redis不可用，无法启动图片渲染worker")
+
+        stopping = []
+
+        def handle_signal(signum, frame):
+            logger.info(f"图片渲染worker收到信号 {signum}，执行完当前任务后退出")
+            stopping.append(signum)
+
+        signal.signal(signal.SIGTERM, handle_signal)
+        signal.signal(signal.SIGINT, handle_signal)
+
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        threads = max(1, RENDER_WORKER_THREADS if threads is None else threads)
+        processed = [0] * threads
+
+        def loop(index):
+            while not stopping and not (stop and stop()):
+                try:
+                    RenderQueueService.reap_expired(redis)
+                    result = RenderQueueService.run_once(redis, worker_id)
+                except Exception as e:
+                    # Redis暂时不可用时等待后重试
+                    logger.error(f"图片渲染worker执行失败: {str(e)}")
+                    time.sleep(RENDER_POLL_INTERVAL)
+                    continue
+                if result is None:
+                    if burst:
+                        break
+                    time.sleep(RENDER_POLL_INTERVAL)
+                    continue
+                processed[index] += 1
+
+        logger.info(f"图片渲染worker已启动: {worker_id}，线程数: {threads}")
+        workers = [threading.Thread(target=loop, args=(index,), daemon=True) for index in range(1, threads)]
+        for worker in workers:
+            worker.start()
+        # 信号只能在主线程处理，主线程也执行任务
+        loop(0)
+        for worker in workers:
+            worker.join()
+        logger.info(f"图片渲染worker已退出: {worker_id}，共执行 {sum(processed)} 个任务")
+        return sum(processed)
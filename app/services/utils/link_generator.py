@@ -7,7 +7,8 @@ import hmac
 import base64
 from urllib.parse import quote, urlencode, urlparse, parse_qs
 from datetime import datetime, timedelta
-from typing import Dict, Optional
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
 
 
 class LinkGeneratorService:
@@ -47,8 +48,53 @@ class LinkGeneratorService:
         expire_time = datetime.utcnow() + timedelta(seconds=expire_seconds)
         expire_timestamp = int(expire_time.timestamp())
         
+        # 从环境变量获取域名或IP配置
+        base_url = os.environ.get('BASE_URL', f'http://localhost:{os.environ.get("PORT", "1314")}')
+        
+        return LinkGeneratorService._build_signed_url(
+            file_path, expire_timestamp, client_ip, LinkGeneratorService.get_signing_key(), base_url
+        )
+    
+    @staticmethod
+    def get_signed_url_window() -> Tuple[int, int]:
+        """
+        获取当前的链接时间段，时间段长度为默认有效期的一半
+        同一时间段内生成的链接过期时间相同，至少还有半个有效期
+        :return: (时间段序号, 该时间段内生成的链接的过期时间戳)
+        """
+        window = max(LinkGeneratorService.get_default_expire_seconds() // 2, 1)
+        # 与validate_signed_url使用相同的时钟
+        index = int(datetime.utcnow().timestamp()) // window
+        return index, (index + 2) * window
+    
+    @staticmethod
+    def generate_window_signed_url(file_path: str) -> str:
+        """
+        生成按时间段复用的下载链接，同一时间段内同一文件的链接完全相同，
+        只在时间段内第一次生成时计算签名，响应在时间段结束前都可以缓存
+        :param file_path: 文件路径，相对于项目根目录
+        :return: 带签名的下载链接
+        """
+        _, expire_timestamp = LinkGeneratorService.get_signed_url_window()
+        base_url = os.environ.get('BASE_URL', f'http://localhost:{os.environ.get("PORT", "1314")}')
+        return LinkGeneratorService._build_window_signed_url(
+            file_path, expire_timestamp, None, LinkGeneratorService.get_signing_key(), base_url
+        )
+    
+    @staticmethod
+    def _build_signed_url(file_path: str, expire_timestamp: int, client_ip: Optional[str],
+                          signing_key: str, base_url: str) -> str:
+        """
+        计算签名并构建下载链接
+        :param file_path: 文件路径
+        :param expire_timestamp: 过期时间戳
+        :param client_ip: 限制访问的客户端IP
+        :param signing_key: 签名密钥
+        :param base_url: 链接域名
+        :return: 带签名的下载链接
+        """
         # 构建签名字符串
-        signing_key = LinkGeneratorService.get_signing_key().encode('utf-8')
+        signing_key = signing_key.encode('utf-8')
         
         # 签名内容：file_path + expire_timestamp + client_ip（如果有）
         signature_content = f"{file_path}{expire_timestamp}{client_ip or ''}".encode('utf-8')
@@ -59,9 +105,6 @@ class LinkGeneratorService:
         # Base64编码并URL安全处理
         encoded_signature = base64.urlsafe_b64encode(hmac_signature).decode('utf-8').rstrip('=')
         
-        # 从环境变量获取域名或IP配置
-        base_url = os.environ.get('BASE_URL', f'http://localhost:{os.environ.get("PORT", "1314")}')
-        
         # 构建查询参数，不需要手动quote，urlencode会自动处理
         query_params = {
             'file_path': file_path,
@@ -76,6 +119,9 @@ class LinkGeneratorService:
         # 构建完整下载链接
         return f"{base_url}/api/public/files/download/signed?{urlencode(query_params)}"
     
+    # 按时间段复用的链接缓存，键包含过期时间戳，时间段切换后旧链接不再命中并逐渐被淘汰
+    _build_window_signed_url = staticmethod(lru_cache(maxsize=4096)(_build_signed_url.__func__))
+    
     @staticmethod
     def validate_signed_url(params: Dict[str, str], client_ip: Optional[str] = None) -> bool:
         """
@@ -6,7 +6,7 @@ import os
 import sys
 from typing import List, Dict, Optional
 from io import BytesIO
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw
 
 # 添加项目根目录到Python路径，确保直接运行时能正确导入模块
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -15,6 +15,7 @@ project_root = os.path.dirname(os.path.dirname(current_dir))
 sys.path.append(project_root)
 
 from app.utils.detection_data_processor import DetectionDataProcessor
+from app.utils.font_registry import font_registry
 
 # 创建日志记录器
 logger = logging.getLogger(__name__)
@@ -76,6 +77,16 @@ class DataToPNGDirectConverter:
         self.line_spacing = 1.2
         self.text_margin = 5  # 文字与边框距离
         self.margin = 2  # 表格外边框边距
+        
+        # 水印配置
+        self.watermark_text = "我是水印"
+        self.watermark_font_size = 16
+        self.watermark_fill = (96, 96, 96, 80)  # 深灰色，透明度约31%，颜色更深更清晰
+        self.watermark_angle = -30  # 向左倾斜30度
+        self.watermark_spacing = 150  # 水印间距
+        
+        # 水印图层缓存，(图片宽度, 水印配置) → 一个间距高度的整宽水印条
+        self._watermark_strips = {}
     
     def convert_data_to_png(self, params: List[dict], device_type: str = 'pc') -> bytes:
         """
@@ -114,54 +125,10 @@ class DataToPNGDirectConverter:
         image = Image.new('RGB', (width, total_height), color='white')
         draw = ImageDraw.Draw(image)
         
-        # 7. 获取字体 - 优先使用支持中文的字体
-        font = None
-        header_font = None
-        bold_header_font = None
-        
-        # 尝试使用Windows系统中文字体，指定完整路径
-        windows_font_dir = 'C:/Windows/Fonts'
-        chinese_fonts = {
-            'hei': 'simhei.ttf',
-            'song': 'simsun.ttc',
-            'kai': 'simkai.ttf',
-            'fangsong': 'simfang.ttf'
-        }
-        
-        try:
-            # 尝试加载黑体
-            hei_font_path = os.path.join(windows_font_dir, chinese_fonts['hei'])
-            if os.path.exists(hei_font_path):
-                font = ImageFont.truetype(hei_font_path, font_size)
-                header_font = ImageFont.truetype(hei_font_path, header_font_size)
-                bold_header_font = ImageFont.truetype(hei_font_path, header_font_size)  # 黑体本身就是粗体
-        except Exception as e:
-            logger.warning(f'加载黑体失败: {e}')
-        
-        # 如果黑体加载失败，尝试宋体
-        if font is None:
-            try:
-                song_font_path = os.path.join(windows_font_dir, chinese_fonts['song'])
-                if os.path.exists(song_font_path):
-                    font = ImageFont.truetype(song_font_path, font_size)
-                    header_font = ImageFont.truetype(song_font_path, header_font_size)
-                    bold_header_font = ImageFont.truetype(song_font_path, header_font_size)
-            except Exception as e:
-                logger.warning(f'加载宋体失败: {e}')
-        
-        # 如果中文字体都加载失败，尝试Arial
-        if font is None:
-            try:
-                # 尝试使用Arial字体
-                font = ImageFont.truetype('arial.ttf', font_size)
-                header_font = ImageFont.truetype('arial.ttf', header_font_size)
-                bold_header_font = ImageFont.truetype('arialbd.ttf', header_font_size)
-            except Exception as e:
-                logger.warning(f'加载Arial失败: {e}')
-                # 使用默认字体作为最后备选
-                font = ImageFont.load_default()
-                header_font = ImageFont.load_default()
-                bold_header_font = ImageFont.load_default()
+        # 7. 获取字体 - 字体注册表按优先级选择支持中文的字体，每个进程只加载一次
+        font = font_registry.get_font('body', font_size)
+        header_font = font_registry.get_font('bold', header_font_size)
+        bold_header_font = header_font  # 黑体本身就是粗体
         
         # 8. 绘制表格外边框
         available_width = width - 2 * self.margin
@@ -413,6 +380,7 @@ class DataToPNGDirectConverter:
     def _add_watermark(self, draw, width, height, font):
         """
         添加水印到图片
+        水印按间距周期排列，每个周期的整宽水印条只生成一次并缓存，之后每个周期粘贴一次水印条，不再逐个绘制和旋转水印
         
         :param draw: ImageDraw对象
         :param width: 图片宽度
@@ -421,111 +389,78 @@ class DataToPNGDirectConverter:
         """
         logger.info(f"开始添加水印，图片尺寸: {width}x{height}")
         
-        watermark_text = "我是水印"
-        
-        # 使用合适的字体大小
-        font_size = 16  # 使用12号字体，确保清晰可见
-        logger.info(f"使用字体大小: {font_size}")
-        
-        # 尝试加载中文字体，适配不同操作系统
-        watermark_font = None
-        
-        # 定义不同操作系统下的字体搜索路径
-        font_paths = []
-        
-        # 根据操作系统添加字体路径
-        if os.name == 'nt':  # Windows
-            windows_font_dir = 'C:/Windows/Fonts'
-            font_paths.extend([
-                os.path.join(windows_font_dir, 'simhei.ttf'),   # 黑体
-                os.path.join(windows_font_dir, 'simsun.ttc'),   # 宋体
-                os.path.join(windows_font_dir, 'arial.ttf'),     # Arial
-                os.path.join(windows_font_dir, 'calibri.ttf')    # Calibri
-            ])
-        else:  # Linux/macOS
-            # Linux常见字体路径
-            linux_font_dirs = ['/usr/share/fonts', '/usr/local/share/fonts', '~/.local/share/fonts']
-            # 常见中文字体文件名
-            chinese_fonts = ['simhei.ttf', 'simsun.ttc', 'wenquanyi.ttc', 'msyh.ttc', 'NotoSansSC-Regular.ttf']
-            
-            for font_dir in linux_font_dirs:
-                for font_name in chinese_fonts:
-                    font_paths.append(os.path.join(font_dir, font_name))
-            
-            # 添加一些通用字体
-            font_paths.extend([
-                '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
-                '/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf'
-            ])
-        
-        # 尝试加载字体
-        loaded = False
-        for font_path in font_paths:
-            try:
-                # 处理~路径
-                expanded_path = os.path.expanduser(font_path)
-                if os.path.exists(expanded_path):
-                    watermark_font = ImageFont.truetype(expanded_path, font_size)
-                    logger.info(f"成功加载字体: {expanded_path}")
-                    loaded = True
-                    break
-            except Exception as e:
-                logger.warning(f"加载字体失败: {font_path}, {e}")
-        
-        # 如果所有字体都加载失败，使用默认字体
-        if not loaded:
-            watermark_font = ImageFont.load_default()
-            logger.info("使用默认字体")
-        
-        # 加深水印颜色，同时保持适当透明度
-        watermark_fill = (96, 96, 96, 80)  # 深灰色，透明度约31%，颜色更深更清晰
+        strip = self._get_watermark_strip(width)
+        image = draw._image
+        for y in range(0, height, self.watermark_spacing):
+            image.paste(strip, (0, y), strip)
         
-        # 计算水印文本大小
-        text_bbox = draw.textbbox((0, 0), watermark_text, font=watermark_font)
-        text_width = text_bbox[2] - text_bbox[0]
-        text_height = text_bbox[3] - text_bbox[1]
+        logger.info("水印添加完成")
+    
+    def _get_watermark_strip(self, width):
+        """
+        获取整宽水印条，同一宽度和水印配置只生成一次
+        水印条高度为一个间距，包含中心在顶边的一行水印的下半部分和中心在底边的一行水印的上半部分
         
-        # 使用更简单可靠的方式实现斜向水印
-        # 创建一个与水印文本大小匹配的临时图像
+        :param width: 图片宽度
+        :return: RGBA水印条图片
+        """
+        key = (width, self.watermark_text, self.watermark_font_size, self.watermark_fill,
+               self.watermark_angle, self.watermark_spacing)
+        strip = self._watermark_strips.get(key)
+        if strip is not None:
+            return strip
+        
+        spacing = self.watermark_spacing
+        tile = self._render_watermark_tile()
+        tile_size = tile.width
+        
+        # 与水印条相交的水印行，水印比间距大时需要包含更远的行
+        reach = tile_size // spacing + 1
+        # 四周留出一个水印大小的边距，水印坐标都为非负数，合成后裁剪
+        canvas = Image.new('RGBA', (width + 2 * tile_size, spacing + 2 * tile_size), (255, 255, 255, 0))
+        for row in range(-reach, reach + 1):
+            for x in range(0, width + spacing, spacing):
+                pos_x = x - tile_size // 2 + tile_size
+                pos_y = row * spacing - tile_size // 2 + tile_size
+                if 0 <= pos_x < canvas.width and 0 <= pos_y < canvas.height:
+                    canvas.alpha_composite(tile, (pos_x, pos_y))
+        strip = canvas.crop((tile_size, tile_size, tile_size + width, tile_size + spacing))
+        
+        self._watermark_strips[key] = strip
+        return strip
+    
+    def _render_watermark_tile(self):
+        """
+        绘制单个旋转后的水印
+        
+        :return: RGBA水印图片，宽高相同
+        """
         import math
-        angle = -30  # 向左倾斜30度
         
-        # 计算旋转后所需的画布大小
-        # 确保旋转后的水印能完整显示
-        rotated_width = int(math.sqrt(text_width**2 + text_height**2))
-        rotated_height = rotated_width
+        # 从字体注册表获取中文字体，没有可用字体时为默认字体
+        watermark_font = font_registry.get_font('watermark', self.watermark_font_size)
         
-        # 计算水印间距
-        spacing = 150
+        # 计算水印文本大小
+        text_bbox = watermark_font.getbbox(self.watermark_text)
+        text_width = text_bbox[2] - text_bbox[0]
+        text_height = text_bbox[3] - text_bbox[1]
         
-        # 直接在原始图像上绘制多个斜向水印
-        # 不使用复杂的图层，确保稳定显示
-        for y in range(0, height + spacing, spacing):
-            for x in range(0, width + spacing, spacing):
-                # 创建单个水印的临时图像
-                single_watermark = Image.new('RGBA', (rotated_width, rotated_height), (255, 255, 255, 0))
-                single_draw = ImageDraw.Draw(single_watermark)
-                
-                # 在临时图像中心绘制水印文本
-                single_draw.text(
-                    (rotated_width // 2, rotated_height // 2),
-                    watermark_text,
-                    font=watermark_font,
-                    fill=watermark_fill,
-                    anchor='mm'  # 中心对齐
-                )
-                
-                # 旋转单个水印
-                rotated = single_watermark.rotate(angle, expand=False, fillcolor=(255, 255, 255, 0))
-                
-                # 计算水印位置，确保均匀分布
-                pos_x = x - rotated_width // 2
-                pos_y = y - rotated_height // 2
-                
-                # 直接粘贴到原始图像上
-                draw._image.paste(rotated, (pos_x, pos_y), rotated)
+        # 计算旋转后所需的画布大小，确保旋转后的水印能完整显示
+        tile_size = int(math.sqrt(text_width**2 + text_height**2))
+        
+        # 在临时图像中心绘制水印文本
+        tile = Image.new('RGBA', (tile_size, tile_size), (255, 255, 255, 0))
+        tile_draw = ImageDraw.Draw(tile)
+        tile_draw.text(
+            (tile_size // 2, tile_size // 2),
+            self.watermark_text,
+            font=watermark_font,
+            fill=self.watermark_fill,
+            anchor='mm'  # 中心对齐
+        )
         
-        logger.info("水印添加完成")
+        # 旋转水印
+        return tile.rotate(self.watermark_angle, expand=False, fillcolor=(255, 255, 255, 0))
     
     def save_png_to_file(self, png_data: bytes, filename: str = 'test_table_direct.png') -> None:
         """
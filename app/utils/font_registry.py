@@ -0,0 +1,189 @@
+# 字体注册表
+# 进程内只扫描一次字体目录、按 (字体文件, 字号) 缓存FreeTypeFont对象，渲染时不再探测路径和解析字体文件
+# 搜索路径可通过环境变量 FONT_SEARCH_PATH 配置（多个目录用系统路径分隔符分隔），默认包含Windows、Linux和macOS的常见字体目录
+
+import logging
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from PIL import ImageFont
+
+# 创建日志记录器
+logger = logging.getLogger(__name__)
+
+# 项目根目录，项目自带的字体放在 static/fonts 下
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 默认字体搜索路径，按顺序查找，同名文件取先找到的
+DEFAULT_FONT_DIRS = [
+    os.path.join(project_root, 'static', 'fonts'),
+    'C:/Windows/Fonts',
+    '/usr/share/fonts',
+    '/usr/local/share/fonts',
+    '~/.local/share/fonts',
+    '~/.fonts',
+    '/System/Library/Fonts',
+    '/Library/Fonts'
+]
+
+# 字体扩展名
+FONT_EXTENSIONS = ('.ttf', '.ttc', '.otf')
+
+# 各用途的候选字体文件名，按优先级排列；中文字体在前，西文字体只作为没有中文字体时的后备
+CJK_REGULAR_FONTS = [
+    'simhei.ttf', 'msyh.ttc', 'simsun.ttc',
+    'NotoSansCJK-Regular.ttc', 'NotoSansCJKsc-Regular.otf', 'NotoSansSC-Regular.otf', 'NotoSansSC-Regular.ttf',
+    'SourceHanSansSC-Regular.otf', 'SourceHanSansCN-Regular.otf',
+    'wqy-microhei.ttc', 'wqy-zenhei.ttc', 'wenquanyi.ttc', 'DroidSansFallbackFull.ttf'
+]
+CJK_BOLD_FONTS = [
+    'simhei.ttf', 'msyhbd.ttc', 'NotoSansCJK-Bold.ttc', 'NotoSansCJKsc-Bold.otf', 'NotoSansSC-Bold.otf',
+    'NotoSansSC-Bold.ttf', 'SourceHanSansSC-Bold.otf', 'wqy-zenhei.ttc'
+]
+LATIN_FALLBACK_FONTS = ['arial.ttf', 'DejaVuSans.ttf', 'LiberationSans-Regular.ttf', 'calibri.ttf']
+LATIN_BOLD_FONTS = ['arialbd.ttf', 'DejaVuSans-Bold.ttf', 'LiberationSans-Bold.ttf']
+
+# 支持中文的字体文件名（小写）
+CJK_FONT_NAMES = frozenset(name.lower() for name in CJK_REGULAR_FONTS + CJK_BOLD_FONTS)
+
+FONT_ROLES = {
+    # 表格正文
+    'body': CJK_REGULAR_FONTS + LATIN_FALLBACK_FONTS,
+    # 表头，黑体本身就是粗体
+    'bold': CJK_BOLD_FONTS + CJK_REGULAR_FONTS + LATIN_BOLD_FONTS + LATIN_FALLBACK_FONTS,
+    # 水印
+    'watermark': CJK_REGULAR_FONTS + LATIN_FALLBACK_FONTS,
+}
+
+
+def get_font_search_path() -> List[str]:
+    """
+    获取字体搜索路径
+    :return: 目录列表
+    """
+    configured = os.environ.get('FONT_SEARCH_PATH')
+    dirs = configured.split(os.pathsep) if configured else DEFAULT_FONT_DIRS
+    return [os.path.expanduser(path) for path in dirs if path]
+
+
+class FontRegistry:
+    """字体注册表，首次使用时扫描字体目录，之后按用途解析字体文件并缓存字体对象"""
+
+    def __init__(self, search_path: Optional[List[str]] = None):
+        """
+        初始化字体注册表
+        :param search_path: 字体搜索路径，默认按 get_font_search_path 获取
+        """
+        self._search_path = search_path
+        self._lock = threading.Lock()
+        # 小写文件名 → 完整路径，None表示尚未扫描
+        self._files: Optional[Dict[str, str]] = None
+        # 用途 → 字体文件路径，None表示没有可用字体，使用PIL默认字体
+        self._roles: Dict[str, Optional[str]] = {}
+        # (字体文件路径, 字号) → 字体对象
+        self._fonts: Dict[Tuple[Optional[str], int], ImageFont.ImageFont] = {}
+
+    @property
+    def search_path(self) -> List[str]:
+        return self._search_path if self._search_path is not None else get_font_search_path()
+
+    def _scan(self) -> Dict[str, str]:
+        """扫描搜索路径下的所有字体文件，只在首次使用时执行一次"""
+        if self._files is None:
+            with self._lock:
+                if self._files is None:
+                    files = {}
+                    for font_dir in self.search_path:
+                        if not os.path.isdir(font_dir):
+                            continue
+                        for root, _, names in os.walk(font_dir):
+                            for name in names:
+                                if name.lower().endswith(FONT_EXTENSIONS):
+                                    files.setdefault(name.lower(), os.path.join(root, name))
+                    logger.info(f"字体目录扫描完成，共 {len(files)} 个字体文件")
+                    self._files = files
+        return self._files
+
+    def resolve(self, role: str) -> Optional[str]:
+        """
+        解析用途对应的字体文件
+        :param role: 字体用途：body/bold/watermark
+        :return: 字体文件路径，没有可用字体时返回None
+        """
+        if role in self._roles:
+            return self._roles[role]
+        files = self._scan()
+        path = None
+        for name in FONT_ROLES.get(role, FONT_ROLES['body']):
+            candidate = files.get(name.lower())
+            if candidate is None:
+                continue
+            try:
+                ImageFont.truetype(candidate, 12)
+            except Exception as e:
+                logger.warning(f"加载字体失败: {candidate}, {e}")
+                continue
+            path = candidate
+            break
+        if path is None:
+            logger.warning(f"没有找到{role}字体，使用默认字体")
+        else:
+            logger.info(f"{role}字体: {path}")
+        self._roles[role] = path
+        return path
+
+    def get_font(self, role: str, size: int) -> ImageFont.ImageFont:
+        """
+        获取字体对象，同一字体文件和字号只加载一次
+        :param role: 字体用途：body/bold/watermark
+        :param size: 字号
+        :return: 字体对象，没有可用字体时返回PIL默认字体
+        """
+        path = self.resolve(role)
+        key = (path, size)
+        font = self._fonts.get(key)
+        if font is None:
+            font = ImageFont.truetype(path, size) if path else ImageFont.load_default()
+            self._fonts[key] = font
+        return font
+
+    def preload(self, sizes: Dict[str, List[int]]) -> None:
+        """
+        预先加载字体，渲染进程启动时调用
+        :param sizes: 字体用途 → 字号列表
+        """
+        for role, role_sizes in sizes.items():
+            for size in role_sizes:
+                self.get_font(role, size)
+
+    def diagnostics(self) -> dict:
+        """
+        获取字体解析结果，用于排查图片中文字显示为方框等问题
+        :return: 搜索路径、扫描到的字体数量、各用途解析到的字体和已加载的字体
+        """
+        files = self._scan()
+        roles = {}
+        for role in FONT_ROLES:
+            path = self.resolve(role)
+            roles[role] = {
+                "path": path,
+                "file": os.path.basename(path) if path else None,
+                # 解析到的不是中文字体时，中文会显示为方框
+                "cjk": bool(path) and os.path.basename(path).lower() in CJK_FONT_NAMES
+            }
+        return {
+            "search_path": [
+                {"path": font_dir, "exists": os.path.isdir(font_dir)} for font_dir in self.search_path
+            ],
+            "font_files": len(files),
+            "roles": roles,
+            "loaded": sorted(
+                [{"file": os.path.basename(path) if path else None, "size": size} for path, size in self._fonts],
+                key=lambda item: (item["file"] or '', item["size"])
+            )
+        }
+
+
+# 导出进程内共享的字体注册表
+font_registry = FontRegistry()
@@ -2,10 +2,478 @@
 # 提供常用的Redis操作封装
 
 import json
-from typing import Any, Optional, Dict
+import math
+import os
+import random
+import struct
+import time
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import datetime, date, time as dt_time
+from decimal import Decimal
+from typing import Any, Callable, Optional, Dict, Iterable, List, Tuple
 import uuid
 from redis import Redis
 
+try:
+    import msgpack
+except ImportError:  # 未安装msgpack时使用带类型标记的JSON编码
+    msgpack = None
+
+
+# 缓存失效通知使用的Redis频道
+CACHE_INVALIDATION_CHANNEL = os.environ.get('CACHE_INVALIDATION_CHANNEL') or 'cache:invalidation'
+
+# 当前进程的唯一标识及其所属进程ID，用于忽略自己发布的失效通知
+_process_id: Optional[str] = None
+_process_id_pid: Optional[int] = None
+
+# 超过该字节数的缓存值使用zlib压缩
+CACHE_COMPRESS_THRESHOLD = int(os.environ.get('CACHE_COMPRESS_THRESHOLD') or 1024)
+
+
+def get_process_id() -> str:
+    """
+    获取当前进程的唯一标识，用于忽略自己发布的失效通知
+    在首次使用时按进程ID生成，预加载应用后fork出的worker各自生成新的标识，不会共用父进程的标识
+    :return: 进程唯一标识
+    """
+    global _process_id, _process_id_pid
+    pid = os.getpid()
+    if _process_id_pid != pid:
+        _process_id = f"{pid}:{uuid.uuid4().hex[:8]}"
+        _process_id_pid = pid
+    return _process_id
+
+
+class CacheCodec:
+    """缓存值编解码器
+    
+    编码结果格式：版本字节 + 编码器ID字节 + 标志字节 + 数据体。
+    版本字节不是任何JSON文本的合法首字符，因此可以与旧版本的JSON缓存值区分，
+    读取旧数据时回退为json.loads，升级过程中无需清空缓存。
+    """
+    
+    # 格式版本，修改头部或数据体格式时递增
+    VERSION = 1
+    # 标志位：数据体经过zlib压缩
+    FLAG_ZLIB = 0x01
+    # 标志位：头部之后带有计算元数据（计算耗时、逻辑过期时间戳），供提前刷新使用
+    FLAG_META = 0x02
+    # 计算元数据格式：两个大端double
+    META_STRUCT = struct.Struct('>dd')
+    
+    # 编码器ID，子类覆盖
+    codec_id = 0
+    
+    def __init__(self, compress_threshold: int = CACHE_COMPRESS_THRESHOLD):
+        self.compress_threshold = compress_threshold
+    
+    def dumps_body(self, value: Any) -> bytes:
+        """将值编码为数据体，子类实现"""
+        raise NotImplementedError
+    
+    def loads_body(self, body: bytes) -> Any:
+        """将数据体解码为值，子类实现"""
+        raise NotImplementedError
+    
+    def encode(self, value: Any, meta: Optional[Tuple[float, float]] = None) -> bytes:
+        """
+        编码缓存值，数据体超过阈值且压缩后更小时使用zlib压缩
+        :param value: 缓存值
+        :param meta: 可选的计算元数据 (计算耗时秒数, 逻辑过期时间戳)
+        :return: 带头部的二进制数据
+        """
+        body = self.dumps_body(value)
+        flags = 0
+        if self.compress_threshold and len(body) > self.compress_threshold:
+            compressed = zlib.compress(body, 1)
+            if len(compressed) < len(body):
+                body = compressed
+                flags |= self.FLAG_ZLIB
+        if meta is not None:
+            flags |= self.FLAG_META
+            body = self.META_STRUCT.pack(*meta) + body
+        return bytes((self.VERSION, self.codec_id, flags)) + body
+    
+    @staticmethod
+    def decode_entry(data: Any) -> Tuple[Any, Optional[Tuple[float, float]]]:
+        """
+        解码缓存值及其计算元数据，按头部中的编码器ID选择解码器，无头部的数据按旧版JSON解析
+        :param data: Redis中读取的原始数据
+        :return: (缓存值, 计算元数据)，没有元数据时为None
+        :raises ValueError: 版本或编码器不支持时抛出
+        """
+        if isinstance(data, str):
+            return json.loads(data), None
+        if not data or data[0] != CacheCodec.VERSION:
+            # 旧版本写入的JSON文本
+            return json.loads(data), None
+        codec = _CODECS.get(data[1])
+        if codec is None:
+            raise ValueError(f"不支持的缓存编码器: {data[1]}")
+        flags = data[2]
+        body = data[3:]
+        meta = None
+        if flags & CacheCodec.FLAG_META:
+            meta_size = CacheCodec.META_STRUCT.size
+            meta = CacheCodec.META_STRUCT.unpack(body[:meta_size])
+            body = body[meta_size:]
+        if flags & CacheCodec.FLAG_ZLIB:
+            body = zlib.decompress(body)
+        return codec.loads_body(body), meta
+    
+    @staticmethod
+    def decode(data: Any) -> Any:
+        """
+        解码缓存值，忽略计算元数据
+        :param data: Redis中读取的原始数据
+        :return: 缓存值
+        :raises ValueError: 版本或编码器不支持时抛出
+        """
+        return CacheCodec.decode_entry(data)[0]
+
+
+class MsgpackCacheCodec(CacheCodec):
+    """基于msgpack的二进制编码器，通过扩展类型无损保存日期时间、Decimal和bytes"""
+    
+    codec_id = 1
+    
+    # msgpack扩展类型编号
+    EXT_DATETIME = 1
+    EXT_DATE = 2
+    EXT_TIME = 3
+    EXT_DECIMAL = 4
+    
+    @staticmethod
+    def _default(value: Any) -> Any:
+        # datetime是date的子类，必须先判断
+        if isinstance(value, datetime):
+            return msgpack.ExtType(MsgpackCacheCodec.EXT_DATETIME, value.isoformat().encode())
+        if isinstance(value, date):
+            return msgpack.ExtType(MsgpackCacheCodec.EXT_DATE, value.isoformat().encode())
+        if isinstance(value, dt_time):
+            return msgpack.ExtType(MsgpackCacheCodec.EXT_TIME, value.isoformat().encode())
+        if isinstance(value, Decimal):
+            return msgpack.ExtType(MsgpackCacheCodec.EXT_DECIMAL, str(value).encode())
+        if isinstance(value, (set, frozenset)):
+            return list(value)
+        raise TypeError(f"无法编码的缓存值类型: {type(value).__name__}")
+    
+    @staticmethod
+    def _ext_hook(code: int, data: bytes) -> Any:
+        text = data.decode()
+        if code == MsgpackCacheCodec.EXT_DATETIME:
+            return datetime.fromisoformat(text)
+        if code == MsgpackCacheCodec.EXT_DATE:
+            return date.fromisoformat(text)
+        if code == MsgpackCacheCodec.EXT_TIME:
+            return dt_time.fromisoformat(text)
+        if code == MsgpackCacheCodec.EXT_DECIMAL:
+            return Decimal(text)
+        return msgpack.ExtType(code, data)
+    
+    def dumps_body(self, value: Any) -> bytes:
+        return msgpack.packb(value, default=self._default, use_bin_type=True)
+    
+    def loads_body(self, body: bytes) -> Any:
+        return msgpack.unpackb(body, ext_hook=self._ext_hook, raw=False, strict_map_key=False)
+
+
+class TaggedJSONCacheCodec(CacheCodec):
+    """带类型标记的JSON编码器，未安装msgpack时使用
+    
+    日期时间、Decimal和bytes编码为 {"__t": 类型, "v": 值}，解码时还原。
+    """
+    
+    codec_id = 2
+    
+    _TAG = '__t'
+    
+    @staticmethod
+    def _default(value: Any) -> Any:
+        if isinstance(value, datetime):
+            return {TaggedJSONCacheCodec._TAG: 'dt', 'v': value.isoformat()}
+        if isinstance(value, date):
+            return {TaggedJSONCacheCodec._TAG: 'd', 'v': value.isoformat()}
+        if isinstance(value, dt_time):
+            return {TaggedJSONCacheCodec._TAG: 't', 'v': value.isoformat()}
+        if isinstance(value, Decimal):
+            return {TaggedJSONCacheCodec._TAG: 'dec', 'v': str(value)}
+        if isinstance(value, (bytes, bytearray)):
+            return {TaggedJSONCacheCodec._TAG: 'b', 'v': bytes(value).hex()}
+        if isinstance(value, (set, frozenset)):
+            return list(value)
+        raise TypeError(f"无法编码的缓存值类型: {type(value).__name__}")
+    
+    @staticmethod
+    def _object_hook(obj: Dict[str, Any]) -> Any:
+        tag = obj.get(TaggedJSONCacheCodec._TAG)
+        if tag is None or len(obj) != 2:
+            return obj
+        value = obj['v']
+        if tag == 'dt':
+            return datetime.fromisoformat(value)
+        if tag == 'd':
+            return date.fromisoformat(value)
+        if tag == 't':
+            return dt_time.fromisoformat(value)
+        if tag == 'dec':
+            return Decimal(value)
+        if tag == 'b':
+            return bytes.fromhex(value)
+        return obj
+    
+    def dumps_body(self, value: Any) -> bytes:
+        return json.dumps(value, ensure_ascii=False, default=self._default, separators=(',', ':')).encode('utf-8')
+    
+    def loads_body(self, body: bytes) -> Any:
+        return json.loads(body, object_hook=self._object_hook)
+
+
+# 已注册的编码器，解码时按头部中的编码器ID查找
+_CODECS: Dict[int, CacheCodec] = {TaggedJSONCacheCodec.codec_id: TaggedJSONCacheCodec()}
+if msgpack is not None:
+    _CODECS[MsgpackCacheCodec.codec_id] = MsgpackCacheCodec()
+
+# 写入缓存时使用的编码器
+cache_codec: CacheCodec = _CODECS.get(MsgpackCacheCodec.codec_id) or _CODECS[TaggedJSONCacheCodec.codec_id]
+
+# get_or_compute使用的锁键前缀
+COMPUTE_LOCK_PREFIX = 'lock:compute:'
+
+# 表代数计数器的键前缀，表数据每次变更时递增
+GENERATION_KEY_PREFIX = 'gen:'
+
+# 表代数最近一次递增时间（Unix秒）的键前缀，用作HTTP响应的Last-Modified
+GENERATION_TIME_KEY_PREFIX = 'gen_at:'
+
+# 递增表代数并记录递增时间；时间至少比上次记录的时间大1秒，
+# 同一秒内的多次变更也会得到不同的Last-Modified（HTTP日期精确到秒）
+_BUMP_GENERATION_SCRIPT = """
+redis.call('incr', KEYS[1])
+local now = tonumber(ARGV[1])
+local last = tonumber(redis.call('get', KEYS[2]) or '0')
+if now <= last then
+    now = last + 1
+end
+redis.call('set', KEYS[2], now)
+return now
+"""
+
+# 连接池ID -> 不解码响应的Redis客户端，用于读写二进制缓存值
+_binary_clients: Dict[int, Redis] = {}
+_binary_clients_lock = threading.Lock()
+
+
+def get_binary_client(redis_client: Redis) -> Redis:
+    """
+    获取与给定客户端连接同一Redis、但不自动解码响应的客户端
+    全局客户端开启了decode_responses，无法读取二进制缓存值
+    :param redis_client: Redis客户端
+    :return: 返回bytes的Redis客户端
+    """
+    pool = redis_client.connection_pool
+    if not pool.connection_kwargs.get('decode_responses'):
+        return redis_client
+    client = _binary_clients.get(id(pool))
+    if client is None:
+        with _binary_clients_lock:
+            client = _binary_clients.get(id(pool))
+            if client is None:
+                kwargs = dict(pool.connection_kwargs)
+                kwargs['decode_responses'] = False
+                binary_pool = pool.__class__(
+                    connection_class=pool.connection_class,
+                    max_connections=pool.max_connections,
+                    **kwargs
+                )
+                client = Redis(connection_pool=binary_pool)
+                _binary_clients[id(pool)] = client
+    return client
+
+
+class LocalLRUCache:
+    """进程内LRU缓存（一级缓存），按缓存前缀分别限制容量和过期时间
+    
+    位于Redis（二级缓存）之前，用于存放数据量小、变化少的热点数据。
+    多个worker之间通过Redis频道广播失效通知保持一致。
+    """
+    
+    # 默认每个前缀的最大条目数
+    DEFAULT_MAX_SIZE = 1024
+    # 默认过期时间（秒）
+    DEFAULT_TTL = 60
+    
+    def __init__(self):
+        # 前缀 -> OrderedDict(key -> (过期时间戳, 值))
+        self._stores: Dict[str, OrderedDict] = {}
+        # 前缀 -> (最大条目数, 过期时间)
+        self._limits: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _get_prefix(key: str) -> str:
+        """
+        获取缓存键的前缀（第一个冒号之前的部分）
+        :param key: 缓存键
+        :return: 前缀字符串
+        """
+        return key.split(':', 1)[0]
+    
+    def configure(self, prefix: str, max_size: int, ttl: int) -> None:
+        """
+        设置指定前缀的容量和过期时间
+        :param prefix: 缓存前缀
+        :param max_size: 最大条目数，0表示不缓存
+        :param ttl: 过期时间（秒）
+        """
+        with self._lock:
+            self._limits[prefix] = (max_size, ttl)
+    
+    def get(self, key: str) -> Optional[Any]:
+        """
+        获取缓存值
+        :param key: 缓存键
+        :return: 缓存值，不存在或已过期返回None
+        """
+        prefix = self._get_prefix(key)
+        with self._lock:
+            store = self._stores.get(prefix)
+            if not store:
+                return None
+            entry = store.get(key)
+            if entry is None:
+                return None
+            expire_at, value = entry
+            if expire_at < time.monotonic():
+                del store[key]
+                return None
+            # 标记为最近使用
+            store.move_to_end(key)
+            return value
+    
+    def set(self, key: str, value: Any) -> None:
+        """
+        设置缓存值，超出容量时淘汰最久未使用的条目
+        :param key: 缓存键
+        :param value: 缓存值
+        """
+        prefix = self._get_prefix(key)
+        with self._lock:
+            max_size, ttl = self._limits.get(prefix, (self.DEFAULT_MAX_SIZE, self.DEFAULT_TTL))
+            if max_size <= 0:
+                return
+            store = self._stores.setdefault(prefix, OrderedDict())
+            store[key] = (time.monotonic() + ttl, value)
+            store.move_to_end(key)
+            while len(store) > max_size:
+                store.popitem(last=False)
+    
+    def delete(self, key: str) -> None:
+        """
+        删除缓存值
+        :param key: 缓存键
+        """
+        prefix = self._get_prefix(key)
+        with self._lock:
+            store = self._stores.get(prefix)
+            if store:
+                store.pop(key, None)
+    
+    def clear(self) -> None:
+        """清空所有缓存"""
+        with self._lock:
+            self._stores.clear()
+    
+    def stats(self) -> Dict[str, int]:
+        """
+        获取各前缀当前的条目数
+        :return: {前缀: 条目数}
+        """
+        with self._lock:
+            return {prefix: len(store) for prefix, store in self._stores.items()}
+
+
+# 进程级一级缓存实例
+local_cache = LocalLRUCache()
+
+# 失效通知订阅线程
+_invalidation_thread = None
+
+
+class LockRenewer:
+    """分布式锁续期器
+    
+    进程内所有持锁者共用一个后台线程续期，线程在第一次登记时启动。
+    每把锁在持有超过三分之一锁时间后才会续期，大部分计算在此之前已经结束，
+    不会产生额外的线程或Redis命令。
+    """
+    
+    def __init__(self):
+        # 登记编号 -> [下次续期时间, Redis客户端, 锁键, 锁ID, 锁过期时间]
+        self._entries: Dict[int, list] = {}
+        self._next_token = 0
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+    
+    def register(self, redis_client: Redis, key: str, lock_id: str, expire: int) -> int:
+        """
+        登记需要续期的锁
+        :param redis_client: Redis客户端
+        :param key: 锁键
+        :param lock_id: 锁ID
+        :param expire: 锁过期时间（秒）
+        :return: 登记编号，释放锁前用于取消登记
+        """
+        with self._condition:
+            self._next_token += 1
+            token = self._next_token
+            self._entries[token] = [time.monotonic() + expire / 3, redis_client, key, lock_id, expire]
+            # fork之后子进程中没有续期线程，需要重新启动
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='lock-renewer', daemon=True)
+                self._thread.start()
+            self._condition.notify()
+            return token
+    
+    def unregister(self, token: int) -> None:
+        """
+        取消登记
+        :param token: 登记编号
+        """
+        with self._condition:
+            self._entries.pop(token, None)
+    
+    def pending(self) -> int:
+        """
+        当前登记的锁数量
+        :return: 锁数量
+        """
+        with self._condition:
+            return len(self._entries)
+    
+    def _run(self) -> None:
+        """续期线程：等待到最早的续期时间，在锁外续期到期的锁，锁已丢失的取消登记"""
+        while True:
+            with self._condition:
+                now = time.monotonic()
+                due = [(token, entry) for token, entry in self._entries.items() if entry[0] <= now]
+                if not due:
+                    next_due = min((entry[0] for entry in self._entries.values()), default=None)
+                    self._condition.wait(None if next_due is None else next_due - now)
+                    continue
+                for _, entry in due:
+                    entry[0] = now + entry[4] / 3
+            for token, (_, redis_client, key, lock_id, expire) in due:
+                if not RedisUtils.renew_lock(redis_client, key, lock_id, expire):
+                    self.unregister(token)
+
+
+# 进程级锁续期器实例
+lock_renewer = LockRenewer()
+
 
 class RedisUtils:
     """Redis工具类，封装常用的Redis操作"""
@@ -16,17 +484,15 @@ class RedisUtils:
         设置缓存
         :param redis_client: Redis客户端
         :param key: 缓存键
-        :param value: 缓存值，可以是任意类型，会被转换为JSON字符串
+        :param value: 缓存值，支持基本类型、容器、日期时间、Decimal和bytes，使用cache_codec编码
         :param expire: 过期时间（秒），默认3600秒
         :return: 设置成功返回True，失败返回False
         """
         try:
             if not redis_client:
                 return False
-            # 将值转换为JSON字符串
-            json_value = json.dumps(value, ensure_ascii=False, default=str)
             # 设置缓存
-            redis_client.set(key, json_value, ex=expire)
+            get_binary_client(redis_client).set(key, cache_codec.encode(value), ex=expire)
             return True
         except Exception as e:
             print(f"Set cache error: {str(e)}")
@@ -44,15 +510,67 @@ class RedisUtils:
             if not redis_client:
                 return None
             # 获取缓存值
-            value = redis_client.get(key)
+            value = get_binary_client(redis_client).get(key)
             if value is None:
                 return None
-            # 解析JSON字符串
-            return json.loads(value)
+            return CacheCodec.decode(value)
         except Exception as e:
             print(f"Get cache error: {str(e)}")
             return None
     
+    @staticmethod
+    def get_many_cache(redis_client: Redis, keys: List[str]) -> List[Optional[Any]]:
+        """
+        使用一次MGET批量获取缓存
+        :param redis_client: Redis客户端
+        :param keys: 缓存键列表
+        :return: 与keys顺序一致的缓存值列表，不存在或解析失败的位置为None
+        """
+        if not keys:
+            return []
+        try:
+            if not redis_client:
+                return [None] * len(keys)
+            values = get_binary_client(redis_client).mget(keys)
+        except Exception as e:
+            print(f"Get many cache error: {str(e)}")
+            return [None] * len(keys)
+        
+        result = []
+        for value in values:
+            if value is None:
+                result.append(None)
+                continue
+            try:
+                result.append(CacheCodec.decode(value))
+            except Exception as e:
+                print(f"Get many cache error: {str(e)}")
+                result.append(None)
+        return result
+    
+    @staticmethod
+    def set_many_cache(redis_client: Redis, mapping: Dict[str, Any], expire: int = 3600) -> bool:
+        """
+        使用一个pipeline批量设置缓存
+        :param redis_client: Redis客户端
+        :param mapping: 缓存键到缓存值的字典
+        :param expire: 过期时间（秒），默认3600秒
+        :return: 设置成功返回True，失败返回False
+        """
+        try:
+            if not redis_client:
+                return False
+            if not mapping:
+                return True
+            pipe = get_binary_client(redis_client).pipeline(transaction=False)
+            for key, value in mapping.items():
+                pipe.set(key, cache_codec.encode(value), ex=expire)
+            pipe.execute()
+            return True
+        except Exception as e:
+            print(f"Set many cache error: {str(e)}")
+            return False
+    
     @staticmethod
     def delete_cache(redis_client: Redis, key: str) -> bool:
         """
@@ -70,6 +588,29 @@ class RedisUtils:
             print(f"Delete cache error: {str(e)}")
             return False
     
+    @staticmethod
+    def delete_many_cache(redis_client: Redis, keys: List[str], batch_size: int = 1000) -> bool:
+        """
+        使用一个pipeline批量删除缓存，每条DEL命令最多包含batch_size个键
+        :param redis_client: Redis客户端
+        :param keys: 缓存键列表
+        :param batch_size: 每条DEL命令的键数量
+        :return: 删除成功返回True，失败返回False
+        """
+        try:
+            if not redis_client:
+                return False
+            if not keys:
+                return True
+            pipe = redis_client.pipeline(transaction=False)
+            for start in range(0, len(keys), batch_size):
+                pipe.delete(*keys[start:start + batch_size])
+            pipe.execute()
+            return True
+        except Exception as e:
+            print(f"Delete many cache error: {str(e)}")
+            return False
+    
     @staticmethod
     def increment(redis_client: Redis, key: str, amount: int = 1) -> Optional[int]:
         """
@@ -118,17 +659,42 @@ class RedisUtils:
                 return None
             # 生成唯一锁ID
             lock_id = str(uuid.uuid4())
-            # 使用setnx获取锁
-            success = redis_client.setnx(key, lock_id)
+            # 使用SET NX PX原子地获取锁并设置过期时间，避免进程在两步之间崩溃留下永不过期的锁
+            success = redis_client.set(key, lock_id, nx=True, px=int(expire * 1000))
             if success:
-                # 设置锁过期时间
-                redis_client.expire(key, expire)
                 return lock_id
             return None
         except Exception as e:
             print(f"Get lock error: {str(e)}")
             return None
     
+    @staticmethod
+    def renew_lock(redis_client: Redis, key: str, lock_id: str, expire: int = 30) -> bool:
+        """
+        续期分布式锁，只有锁仍由lock_id持有时才会续期
+        :param redis_client: Redis客户端
+        :param key: 锁键
+        :param lock_id: 锁ID
+        :param expire: 新的过期时间（秒）
+        :return: 续期成功返回True，锁已丢失或失败返回False
+        """
+        try:
+            if not redis_client:
+                return False
+            # 使用Lua脚本确保原子性
+            lua_script = """
+            if redis.call('get', KEYS[1]) == ARGV[1] then
+                return redis.call('pexpire', KEYS[1], ARGV[2])
+            else
+                return 0
+            end
+            """
+            result = redis_client.eval(lua_script, 1, key, lock_id, int(expire * 1000))
+            return result == 1
+        except Exception as e:
+            print(f"Renew lock error: {str(e)}")
+            return False
+    
     @staticmethod
     def release_lock(redis_client: Redis, key: str, lock_id: str) -> bool:
         """
@@ -155,6 +721,114 @@ class RedisUtils:
             print(f"Release lock error: {str(e)}")
             return False
     
+    @staticmethod
+    def _should_refresh_early(meta: Optional[Tuple[float, float]], beta: float) -> bool:
+        """
+        按概率判断是否提前刷新缓存（XFetch算法）
+        越接近过期时间、计算耗时越长，提前刷新的概率越大
+        :param meta: 计算元数据 (计算耗时秒数, 逻辑过期时间戳)
+        :param beta: 提前刷新系数，0表示不提前刷新
+        :return: 需要提前刷新返回True
+        """
+        if meta is None or beta <= 0:
+            return False
+        delta, expire_at = meta
+        # 1 - random() 的取值范围为 (0, 1]，避免log(0)
+        return time.time() - delta * beta * math.log(1.0 - random.random()) >= expire_at
+    
+    @staticmethod
+    def _compute_and_store(redis_client: Redis, key: str, loader: Callable[[], Any], ttl: int,
+                           lock_key: str, lock_id: str, lock_timeout: int) -> Any:
+        """
+        持有锁时执行loader并写入缓存，loader执行较慢时由lock_renewer定期续期锁
+        :return: loader的返回值
+        """
+        token = lock_renewer.register(redis_client, lock_key, lock_id, lock_timeout)
+        try:
+            start = time.monotonic()
+            value = loader()
+            delta = time.monotonic() - start
+            if value is not None:
+                try:
+                    get_binary_client(redis_client).set(
+                        key, cache_codec.encode(value, meta=(delta, time.time() + ttl)), ex=ttl
+                    )
+                except Exception as e:
+                    print(f"Get or compute set error: {str(e)}")
+            return value
+        finally:
+            lock_renewer.unregister(token)
+            RedisUtils.release_lock(redis_client, lock_key, lock_id)
+    
+    @staticmethod
+    def get_or_compute(redis_client: Redis, key: str, loader: Callable[[], Any], ttl: int = 3600,
+                       lock_timeout: int = 30, wait_timeout: float = 5, beta: float = 1.0) -> Any:
+        """
+        获取缓存，未命中时由集群中的一个worker执行loader重新计算，其他请求等待结果（防止缓存击穿）
+        
+        - 未命中：使用SET NX PX获取计算锁，获得锁的请求执行loader并回填缓存，
+          执行较慢时定期续期锁；未获得锁的请求轮询缓存直到结果写入或等待超时，超时后自行计算
+        - 命中：按计算耗时和剩余时间概率性地提前刷新，刷新由获得锁的请求执行，其他请求继续返回当前值
+        - loader返回None时不写入缓存；Redis不可用时直接调用loader
+        
+        :param redis_client: Redis客户端
+        :param key: 缓存键
+        :param loader: 无参函数，返回要缓存的值
+        :param ttl: 缓存过期时间（秒），默认3600秒
+        :param lock_timeout: 计算锁过期时间（秒），默认30秒
+        :param wait_timeout: 等待其他worker计算结果的最长时间（秒），默认5秒
+        :param beta: 提前刷新系数，越大越早刷新，0表示不提前刷新
+        :return: 缓存值或loader的返回值
+        """
+        if not redis_client:
+            return loader()
+        
+        lock_key = f"{COMPUTE_LOCK_PREFIX}{key}"
+        try:
+            binary_client = get_binary_client(redis_client)
+            raw = binary_client.get(key)
+        except Exception as e:
+            print(f"Get or compute error: {str(e)}")
+            return loader()
+        
+        if raw is not None:
+            try:
+                value, meta = CacheCodec.decode_entry(raw)
+            except Exception as e:
+                print(f"Get or compute decode error: {str(e)}")
+                raw = None
+            else:
+                if not RedisUtils._should_refresh_early(meta, beta):
+                    return value
+                # 提前刷新：只有获得锁的请求重新计算，其他请求继续使用当前值
+                lock_id = RedisUtils.get_lock(redis_client, lock_key, lock_timeout)
+                if not lock_id:
+                    return value
+                return RedisUtils._compute_and_store(redis_client, key, loader, ttl, lock_key, lock_id, lock_timeout)
+        
+        # 缓存未命中，竞争计算锁
+        deadline = time.monotonic() + wait_timeout
+        interval = 0.02
+        while True:
+            lock_id = RedisUtils.get_lock(redis_client, lock_key, lock_timeout)
+            if lock_id:
+                return RedisUtils._compute_and_store(redis_client, key, loader, ttl, lock_key, lock_id, lock_timeout)
+            if time.monotonic() >= deadline:
+                break
+            # 其他worker正在计算，等待结果写入
+            time.sleep(interval)
+            interval = min(interval * 2, 0.2)
+            try:
+                raw = binary_client.get(key)
+                if raw is not None:
+                    return CacheCodec.decode(raw)
+            except Exception as e:
+                print(f"Get or compute wait error: {str(e)}")
+                break
+        
+        # 等待超时，自行计算但不写入缓存，避免覆盖持锁者的结果
+        return loader()
+    
     @staticmethod
     def set_hash_field(redis_client: Redis, hash_key: str, field: str, value: Any) -> bool:
         """
@@ -314,7 +988,60 @@ class RedisUtils:
         except Exception as e:
             print(f"Get set members error: {str(e)}")
             return []
-    
+
+    @staticmethod
+    def increment_score(redis_client: Redis, key: str, member: Any, amount: float = 1) -> Optional[float]:
+        """
+        增加有序集合中元素的分数，元素不存在时自动添加
+        :param redis_client: Redis客户端
+        :param key: 有序集合键
+        :param member: 元素
+        :param amount: 增加的分数
+        :return: 增加后的分数，失败返回None
+        """
+        try:
+            if not redis_client:
+                return None
+            return redis_client.zincrby(key, amount, str(member))
+        except Exception as e:
+            print(f"Increment score error: {str(e)}")
+            return None
+
+    @staticmethod
+    def get_top_scores(redis_client: Redis, key: str, limit: int) -> Optional[Dict[str, float]]:
+        """
+        获取有序集合中分数最高的元素
+        :param redis_client: Redis客户端
+        :param key: 有序集合键
+        :param limit: 最多返回的元素数量
+        :return: {元素: 分数}，失败返回None
+        """
+        try:
+            if not redis_client:
+                return None
+            return dict(redis_client.zrevrange(key, 0, limit - 1, withscores=True))
+        except Exception as e:
+            print(f"Get top scores error: {str(e)}")
+            return None
+
+    @staticmethod
+    def trim_top_scores(redis_client: Redis, key: str, keep: int) -> bool:
+        """
+        只保留有序集合中分数最高的keep个元素
+        :param redis_client: Redis客户端
+        :param key: 有序集合键
+        :param keep: 保留的元素数量
+        :return: 成功返回True，失败返回False
+        """
+        try:
+            if not redis_client:
+                return False
+            redis_client.zremrangebyrank(key, 0, -keep - 1)
+            return True
+        except Exception as e:
+            print(f"Trim top scores error: {str(e)}")
+            return False
+
     @staticmethod
     def set_key_expire(redis_client: Redis, key: str, expire: int) -> bool:
         """
@@ -348,3 +1075,178 @@ class RedisUtils:
         except Exception as e:
             print(f"Get key ttl error: {str(e)}")
             return -2
+    
+    @staticmethod
+    def get_generations(redis_client: Redis, tables: List[str]) -> Optional[List[int]]:
+        """
+        使用一次MGET获取多个表的当前代数
+        :param redis_client: Redis客户端
+        :param tables: 表名列表
+        :return: 与tables顺序一致的代数列表，从未变更过的表为0，失败返回None
+        """
+        try:
+            if not redis_client:
+                return None
+            values = redis_client.mget([f"{GENERATION_KEY_PREFIX}{table}" for table in tables])
+            return [int(value) if value is not None else 0 for value in values]
+        except Exception as e:
+            print(f"Get generations error: {str(e)}")
+            return None
+    
+    @staticmethod
+    def get_generations_with_time(redis_client: Redis, tables: List[str]) -> Optional[Tuple[List[int], int]]:
+        """
+        使用一次MGET获取多个表的当前代数，以及其中最近一次递增代数的时间
+        没有记录时间的表（从未变更或在记录时间之前变更过）以当前时间补记，之后读取得到相同的值
+        :param redis_client: Redis客户端
+        :param tables: 表名列表
+        :return: (与tables顺序一致的代数列表, 最近变更的Unix时间戳)，失败返回None
+        """
+        try:
+            if not redis_client:
+                return None
+            values = redis_client.mget(
+                [f"{GENERATION_KEY_PREFIX}{table}" for table in tables]
+                + [f"{GENERATION_TIME_KEY_PREFIX}{table}" for table in tables]
+            )
+            generations = [int(value) if value is not None else 0 for value in values[:len(tables)]]
+            times = [int(value) for value in values[len(tables):] if value is not None]
+            missing = [table for table, value in zip(tables, values[len(tables):]) if value is None]
+            if missing:
+                now = int(time.time())
+                pipe = redis_client.pipeline(transaction=False)
+                for table in missing:
+                    key = f"{GENERATION_TIME_KEY_PREFIX}{table}"
+                    pipe.set(key, now, nx=True)
+                    pipe.get(key)
+                # 其他worker可能同时补记，以实际保存的值为准
+                times.extend(int(value) for value in pipe.execute()[1::2] if value is not None)
+            return generations, max(times)
+        except Exception as e:
+            print(f"Get generations error: {str(e)}")
+            return None
+    
+    @staticmethod
+    def bump_generations(redis_client: Redis, *tables: str) -> bool:
+        """
+        递增表的代数，使所有包含旧代数的列表缓存键失效（无需扫描删除），同时记录递增时间
+        :param redis_client: Redis客户端
+        :param tables: 表名
+        :return: 递增成功返回True，失败返回False
+        """
+        try:
+            if not redis_client:
+                return False
+            if not tables:
+                return True
+            now = int(time.time())
+            pipe = redis_client.pipeline(transaction=False)
+            for table in tables:
+                pipe.eval(
+                    _BUMP_GENERATION_SCRIPT, 2,
+                    f"{GENERATION_KEY_PREFIX}{table}", f"{GENERATION_TIME_KEY_PREFIX}{table}", now
+                )
+            pipe.execute()
+            return True
+        except Exception as e:
+            print(f"Bump generations error: {str(e)}")
+            return False
+    
+    @staticmethod
+    def publish_invalidation(redis_client: Redis, keys: Iterable[str]) -> bool:
+        """
+        广播缓存失效通知，其他worker收到后清除一级缓存中的对应键
+        :param redis_client: Redis客户端
+        :param keys: 失效的缓存键
+        :return: 发布成功返回True，失败返回False
+        """
+        try:
+            if not redis_client:
+                return False
+            keys = list(keys)
+            if not keys:
+                return True
+            message = json.dumps({"origin": get_process_id(), "keys": keys}, ensure_ascii=False)
+            redis_client.publish(CACHE_INVALIDATION_CHANNEL, message)
+            return True
+        except Exception as e:
+            print(f"Publish invalidation error: {str(e)}")
+            return False
+    
+    @staticmethod
+    def is_invalidation_listening() -> bool:
+        """
+        当前进程是否已订阅缓存失效频道
+        只有订阅后一级缓存才能与其他worker保持一致，未订阅时不应使用一级缓存
+        :return: 已订阅返回True，否则返回False
+        """
+        thread = _invalidation_thread
+        return thread is not None and thread.is_alive()
+    
+    @staticmethod
+    def _handle_invalidation_message(message: Dict[str, Any]) -> None:
+        """
+        处理缓存失效通知，清除一级缓存中的对应键
+        :param message: Redis订阅消息
+        """
+        try:
+            payload = json.loads(message['data'])
+            if payload.get('origin') == get_process_id():
+                return
+            for key in payload.get('keys', []):
+                local_cache.delete(key)
+        except Exception as e:
+            print(f"Handle invalidation error: {str(e)}")
+    
+    @staticmethod
+    def _handle_invalidation_error(error: Exception, pubsub: Any, thread: Any) -> None:
+        """
+        订阅线程出错（如连接断开）时停止订阅并清空一级缓存
+        断开期间可能错过失效通知，之后不再使用一级缓存，直到重新订阅
+        :param error: 异常
+        :param pubsub: 订阅对象
+        :param thread: 订阅线程
+        """
+        global _invalidation_thread
+        print(f"Cache invalidation listener error: {str(error)}")
+        thread.stop()
+        if _invalidation_thread is thread:
+            _invalidation_thread = None
+        local_cache.clear()
+    
+    @staticmethod
+    def start_invalidation_listener(redis_client: Redis) -> bool:
+        """
+        在后台线程中订阅缓存失效频道，每个worker进程启动时调用一次
+        :param redis_client: Redis客户端
+        :return: 启动成功返回True，失败返回False
+        """
+        global _invalidation_thread
+        try:
+            if not redis_client:
+                return False
+            if RedisUtils.is_invalidation_listening():
+                return True
+            pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{CACHE_INVALIDATION_CHANNEL: RedisUtils._handle_invalidation_message})
+            local_cache.clear()
+            _invalidation_thread = pubsub.run_in_thread(
+                sleep_time=1, daemon=True, exception_handler=RedisUtils._handle_invalidation_error
+            )
+            return True
+        except Exception as e:
+            print(f"Start invalidation listener error: {str(e)}")
+            return False
+    
+    @staticmethod
+    def stop_invalidation_listener() -> None:
+        """停止缓存失效订阅线程，并清空一级缓存"""
+        global _invalidation_thread
+        try:
+            if _invalidation_thread is not None:
+                _invalidation_thread.stop()
+        except Exception as e:
+            print(f"Stop invalidation listener error: {str(e)}")
+        finally:
+            _invalidation_thread = None
+            local_cache.clear()
@@ -469,33 +469,29 @@ class SVGGenerator:
                 width = self.width
                 height = 1000
         
-        # 2. 生成水印文本标签
-        watermark_tags = []
-        
-        # 从负的间距开始，确保整个区域都被水印覆盖
-        start_x = -self.watermark_horizontal_spacing
-        start_y = -self.watermark_vertical_spacing
-        
-        # 计算需要生成多少行和列水印
-        # 增加额外的一行一列，确保边缘区域也被覆盖
-        cols = int(width / self.watermark_horizontal_spacing) + 2
-        rows = int(height / self.watermark_vertical_spacing) + 2
-        
-        for i in range(rows):
-            for j in range(cols):
-                # 计算当前水印的坐标
-                x = start_x + j * self.watermark_horizontal_spacing
-                y = start_y + i * self.watermark_vertical_spacing
-                
-                # 构建水印标签
-                watermark_tag = f'    <text x="{x}" y="{y}" font-family="{self.watermark_font}" font-size="{self.watermark_size}" '
-                watermark_tag += f'fill="{self.watermark_color}" opacity="{self.watermark_opacity}" '
-                watermark_tag += f'transform="rotate({self.watermark_rotation}, {x}, {y})" text-anchor="middle">'
-                watermark_tag += f'{self.watermark_text}</text>'
-                
-                watermark_tags.append(watermark_tag)
+        # 2. 生成水印图案：一个水印单元定义为<pattern>，由一个覆盖整个画布的<rect>平铺
+        # 水印放在单元中心（垂直居中，旋转后不超出单元被裁剪），图案原点左上偏移半个单元，水印中心仍落在间距的整数倍上
+        horizontal_spacing = self.watermark_horizontal_spacing
+        vertical_spacing = self.watermark_vertical_spacing
+        center_x = horizontal_spacing / 2
+        center_y = vertical_spacing / 2
+        pattern_x = -center_x
+        pattern_y = -center_y
+        
+        watermark_tags = [
+            '    <defs>',
+            f'        <pattern id="text-watermark" patternUnits="userSpaceOnUse" x="{pattern_x:g}" y="{pattern_y:g}" '
+            f'width="{horizontal_spacing}" height="{vertical_spacing}">',
+            f'            <text x="{center_x:g}" y="{center_y:g}" font-family="{self.watermark_font}" font-size="{self.watermark_size}" '
+            f'fill="{self.watermark_color}" opacity="{self.watermark_opacity}" '
+            f'transform="rotate({self.watermark_rotation}, {center_x:g}, {center_y:g})" text-anchor="middle" dominant-baseline="central">'
+            f'{self.watermark_text}</text>',
+            '        </pattern>',
+            '    </defs>',
+            f'    <rect x="0" y="0" width="{width}" height="{height}" fill="url(#text-watermark)" pointer-events="none" />'
+        ]
         
-        # 3. 将水印标签插入到SVG的</svg>标签之前
+        # 3. 将水印图案插入到SVG的</svg>标签之前
         watermark_svg = svg_str.replace('</svg>', '\n'.join(watermark_tags) + '\n</svg>')
         
         return watermark_svg
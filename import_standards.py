@@ -15,8 +15,8 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # 导入项目配置和扩展
 from config import config
-from app.extensions import init_db
-from app.models.detection.detection_standard import DetectionStandard
+from app.extensions import init_db, init_redis
+from app.dal.detection_dal import DetectionStandardDAL
 
 
 def import_standards(csv_file_path, config_name='default'):
@@ -37,14 +37,21 @@ def import_standards(csv_file_path, config_name='default'):
         engine, SessionLocal = init_db(app_config)
         session = SessionLocal()
         
+        # 初始化Redis，用于清除被更新规范的缓存；连接失败时只导入数据库
+        try:
+            redis_client = init_redis(app_config)
+        except Exception:
+            redis_client = None
+            print("Redis不可用，导入后请手动清除检测规范缓存")
+        
         print(f"开始导入检测规范数据，文件路径: {csv_file_path}")
         
         # 读取CSV文件
         df = pd.read_csv(csv_file_path)
         print(f"CSV文件读取成功，共 {len(df)} 条数据")
         
-        # 遍历数据行
-        success_count = 0
+        # 遍历数据行，转换为数据字典
+        rows = []
         error_count = 0
         
         for index, row in df.iterrows():
@@ -63,40 +70,16 @@ def import_standards(csv_file_path, config_name='default'):
                 if pd.notna(row['替代规范ID']) and row['替代规范ID']:
                     replace_id = int(row['替代规范ID'])
                 
-                # 创建检测规范对象
-                standard = DetectionStandard(
-                    standard_code=row['规范编号'],
-                    standard_name=row['规范名称'],
-                    standard_type=row['规范类型'],
-                    effective_time=effective_time,
-                    invalid_time=invalid_time,
-                    status=row['状态'],
-                    replace_id=replace_id,
-                    remark=row['备注'] if pd.notna(row['备注']) else None
-                )
-                
-                # 检查是否已存在
-                existing_standard = session.query(DetectionStandard).filter(
-                    DetectionStandard.standard_code == row['规范编号']
-                ).first()
-                
-                if existing_standard:
-                    # 更新现有记录
-                    existing_standard.standard_name = standard.standard_name
-                    existing_standard.standard_type = standard.standard_type
-                    existing_standard.effective_time = standard.effective_time
-                    existing_standard.invalid_time = standard.invalid_time
-                    existing_standard.status = standard.status
-                    existing_standard.replace_id = standard.replace_id
-                    existing_standard.remark = standard.remark
-                    session.merge(existing_standard)
-                    print(f"更新规范: {row['规范编号']} - {row['规范名称']}")
-                else:
-                    # 插入新记录
-                    session.add(standard)
-                    print(f"插入规范: {row['规范编号']} - {row['规范名称']}")
-                
-                success_count += 1
+                rows.append({
+                    'standard_code': row['规范编号'],
+                    'standard_name': row['规范名称'],
+                    'standard_type': row['规范类型'],
+                    'effective_time': effective_time,
+                    'invalid_time': invalid_time,
+                    'status': int(row['状态']),
+                    'replace_id': replace_id,
+                    'remark': row['备注'] if pd.notna(row['备注']) else None
+                })
                 
             except Exception as e:
                 error_count += 1
@@ -104,11 +87,17 @@ def import_standards(csv_file_path, config_name='default'):
                 print(f"错误信息: {str(e)}")
                 continue
         
-        # 提交事务
-        session.commit()
+        # 按规范编号分块批量插入或更新，整个导入在一个事务中完成
+        standard_dal = DetectionStandardDAL(session, redis_client)
+        result = standard_dal.bulk_upsert(rows, ['standard_code'])
+        for chunk in result['chunks']:
+            if chunk['error']:
+                print(f"第 {chunk['chunk']} 块导入失败: {chunk['error']}")
+        
         print(f"\n数据导入完成！")
-        print(f"成功导入: {success_count} 条")
-        print(f"导入失败: {error_count} 条")
+        print(f"插入规范: {result['inserted']} 条")
+        print(f"更新规范: {result['updated']} 条")
+        print(f"导入失败: {error_count + result['failed']} 条")
         
     except Exception as e:
         print(f"导入过程中发生错误: {str(e)}")
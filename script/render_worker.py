@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片渲染worker
+从Redis渲染队列领取检测项目的图片重新生成任务并执行，与Web服务分开运行，可以启动多个进程
+
+用法：
+    python script/render_worker.py            # 持续运行，收到SIGTERM/SIGINT后执行完当前任务退出
+    python script/render_worker.py --burst    # 执行完所有到期任务后退出
+    python script/render_worker.py --processes 4 --threads 2    # 4个渲染进程，同时处理2个检测项目
+"""
+
+import argparse
+import os
+import sys
+
+# 将项目根目录添加到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from config import config
+from app.extensions import init_db, init_redis
+from app.core.logging_config import setup_logging
+import app.models  # noqa: F401 注册所有模型
+from app.core.render_pool import start_render_pool, shutdown_render_pool
+from app.services.image.image_service import ImageService
+from app.services.image.render_queue_service import RenderQueueService
+
+
+def main():
+    parser = argparse.ArgumentParser(description="图片渲染worker")
+    parser.add_argument('--burst', action='store_true', help="执行完所有到期任务后退出")
+    parser.add_argument('--processes', type=int, default=None, help="渲染进程数，默认RENDER_POOL_SIZE，0表示在worker进程中渲染")
+    parser.add_argument('--threads', type=int, default=None, help="同时处理的任务数量，默认RENDER_WORKER_THREADS")
+    args = parser.parse_args()
+
+    # 与Web服务使用相同的配置
+    app_config = config[os.environ.get('FASTAPI_CONFIG') or 'default']
+    setup_logging()
+    # 在建立数据库和Redis连接之前创建渲染进程池，子进程不继承任何连接
+    start_render_pool(ImageService.DEVICE_CONFIG.keys(), size=args.processes)
+    init_db(app_config)
+    init_redis(app_config)
+
+    try:
+        RenderQueueService.run_worker(burst=args.burst, threads=args.threads)
+    finally:
+        shutdown_render_pool()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+# 测试公共夹具
+# 使用内存SQLite和fakeredis代替MySQL和Redis，单元测试不依赖外部服务
+
+import importlib.util
+import os
+import sys
+
+import fakeredis
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# 获取项目根目录
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import app.extensions as extensions
+import app.models  # noqa: F401 注册所有模型
+from app.extensions import Base, RequestSession
+
+
+def create_test_engine():
+    """创建内存SQLite引擎，所有连接共用同一个数据库"""
+    engine = create_engine(
+        'sqlite://', poolclass=StaticPool, connect_args={'check_same_thread': False}
+    )
+    Base.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture
+def redis_client(monkeypatch):
+    """替换全局Redis客户端为fakeredis，与生产环境一样自动解码响应"""
+    client = fakeredis.FakeRedis(decode_responses=True)
+    client.flushall()
+    monkeypatch.setattr(extensions, 'redis_client', client)
+    return client
+
+
+@pytest.fixture
+def session_factory(monkeypatch):
+    """替换全局数据库会话工厂为内存SQLite，每个测试使用新的数据库"""
+    engine = create_test_engine()
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=RequestSession)
+    monkeypatch.setattr(extensions, 'engine', engine)
+    monkeypatch.setattr(extensions, 'SessionLocal', factory)
+    yield factory
+    engine.dispose()
+
+
+@pytest.fixture
+def query_counter(session_factory):
+    """
+    统计执行的SQL语句数量
+    :return: 记录了语句的列表，len()即执行次数
+    """
+    from sqlalchemy import event
+
+    statements = []
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = session_factory.kw['bind']
+    event.listen(engine, 'before_cursor_execute', before_execute)
+    yield statements
+    event.remove(engine, 'before_cursor_execute', before_execute)
+
+
+@pytest.fixture
+def db(session_factory):
+    """独立的数据库会话"""
+    session = session_factory()
+    yield session
+    session.close()
+
+
+@pytest.fixture(autouse=True)
+def reset_process_state():
+    """清理进程内缓存和快照，测试之间互不影响"""
+    from app.core import concurrency
+    from app.services.detection.catalog_snapshot_service import CatalogSnapshotService
+    from app.utils import redis_utils
+
+    def reset():
+        redis_utils.local_cache.clear()
+        redis_utils._binary_clients.clear()
+        CatalogSnapshotService._snapshot = None
+        concurrency._public_limiter = None
+
+    reset()
+    yield
+    reset()
+
+
+@pytest.fixture(scope='session')
+def app():
+    """加载app.py中的应用实例，数据库和Redis初始化替换为测试实现"""
+    original_init_db = extensions.init_db
+    original_init_redis = extensions.init_redis
+
+    def init_db(app_config):
+        engine = create_test_engine()
+        extensions.engine = engine
+        extensions.SessionLocal = sessionmaker(bind=engine, class_=RequestSession)
+        return engine, extensions.SessionLocal
+
+    def init_redis(app_config):
+        raise RuntimeError("测试中使用fakeredis")
+
+    extensions.init_db = init_db
+    extensions.init_redis = init_redis
+    os.environ['FASTAPI_CONFIG'] = 'testing'
+    try:
+        spec = importlib.util.spec_from_file_location("app_test_module", os.path.join(project_root, "app.py"))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        extensions.init_db = original_init_db
+        extensions.init_redis = original_init_redis
+    return module.app
+
+
+@pytest.fixture
+def client(app, session_factory, redis_client):
+    """测试客户端，请求经过与生产环境相同的中间件"""
+    from fastapi.testclient import TestClient
+    return TestClient(app)
+
+
+@pytest.fixture
+def user_client(app, client):
+    """已登录用户的测试客户端，跳过令牌校验"""
+    from app.models.user.user import User
+    from app.routes.dependencies import get_current_active_user
+
+    app.dependency_overrides[get_current_active_user] = lambda: User(id=1, name='测试', username='tester')
+    yield client
+    app.dependency_overrides.pop(get_current_active_user, None)
+
+
+@pytest.fixture
+def catalog(db):
+    """
+    写入一组最小的目录数据：分类 → 检测对象 → 检测项目 → 检测参数，以及两个检测规范和一个委托单模板
+    :return: 各对象ID的字典
+    """
+    from app.models.detection import (
+        Category, DetectionObject, DetectionItem, DetectionParam, DetectionStandard, DelegationFormTemplate
+    )
+
+    category = Category(category_name='建材', sort_order=1, status=1)
+    db.add(category)
+    db.flush()
+    obj = DetectionObject(object_name='水泥', object_code='SN', category_id=category.category_id, status=1)
+    db.add(obj)
+    db.flush()
+    item = DetectionItem(item_name='物理性能', object_id=obj.object_id, status=1)
+    db.add(item)
+    standard1 = DetectionStandard(standard_code='GB 175-2007', standard_name='通用硅酸盐水泥')
+    standard2 = DetectionStandard(standard_code='GB/T 1346-2011', standard_name='水泥标准稠度用水量')
+    template = DelegationFormTemplate(template_name='水泥委托单', template_code='SN-1', file_type='docx')
+    db.add_all([standard1, standard2, template])
+    db.flush()
+    param = DetectionParam(
+        item_id=item.item_id, param_name='细度', template_id=template.template_id, price='50元', sort_order=1
+    )
+    param.standards.append(standard1)
+    db.add(param)
+    db.commit()
+    return {
+        'category_id': category.category_id,
+        'object_id': obj.object_id,
+        'item_id': item.item_id,
+        'param_id': param.param_id,
+        'standard_ids': [standard1.standard_id, standard2.standard_id],
+        'template_id': template.template_id
+    }
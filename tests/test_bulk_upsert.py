@@ -0,0 +1,60 @@
+# BaseDAL.bulk_upsert 分块插入或更新测试
+
+from app.dal.detection_dal import DetectionStandardDAL
+from app.models.detection import DetectionStandard
+from app.utils.redis_utils import GENERATION_KEY_PREFIX
+
+
+def test_inserts_and_updates_by_unique_key(session_factory, redis_client, catalog):
+    db = session_factory()
+    dal = DetectionStandardDAL(db, redis_client)
+    existing_id = catalog['standard_ids'][0]
+    # 预热缓存，更新后应被删除
+    dal.get_by_id(existing_id)
+    assert redis_client.exists(f"detectionstandard:v2:{existing_id}")
+
+    result = dal.bulk_upsert([
+        {'standard_code': 'GB 175-2007', 'standard_name': '通用硅酸盐水泥（修订）'},
+        {'standard_code': 'JGJ 52-2006', 'standard_name': '普通混凝土用砂'},
+        {'standard_code': 'JGJ 52-2006', 'standard_name': '普通混凝土用砂、石'},
+    ], ['standard_code'], chunk_size=10)
+    db.close()
+
+    assert (result['inserted'], result['updated'], result['failed']) == (1, 1, 0)
+    assert not redis_client.exists(f"detectionstandard:v2:{existing_id}")
+    assert redis_client.get(f"{GENERATION_KEY_PREFIX}{DetectionStandard.__tablename__}") == '1'
+
+    db = session_factory()
+    names = dict(db.query(DetectionStandard.standard_code, DetectionStandard.standard_name).all())
+    assert names['GB 175-2007'] == '通用硅酸盐水泥（修订）'
+    # 同一键出现多次时以最后一条为准
+    assert names['JGJ 52-2006'] == '普通混凝土用砂、石'
+    db.close()
+
+
+def test_failing_chunk_rolls_back_only_itself(session_factory, redis_client):
+    db = session_factory()
+    rows = [
+        {'standard_code': 'A-1', 'standard_name': '一'},
+        {'standard_code': 'A-2', 'standard_name': '二'},
+        {'standard_code': 'B-1', 'standard_name': '三'},
+        {'standard_code': 'B-2', 'standard_name': None},
+        {'standard_code': 'C-1', 'standard_name': '五'},
+    ]
+    result = DetectionStandardDAL(db, redis_client).bulk_upsert(rows, ['standard_code'], chunk_size=2)
+    db.close()
+
+    assert (result['inserted'], result['updated'], result['failed']) == (3, 0, 2)
+    assert [chunk['failed'] for chunk in result['chunks']] == [0, 2, 0]
+    assert result['chunks'][1]['error']
+
+    db = session_factory()
+    codes = sorted(code for (code,) in db.query(DetectionStandard.standard_code).all())
+    assert codes == ['A-1', 'A-2', 'C-1']
+    db.close()
+
+
+def test_empty_rows(db, redis_client):
+    assert DetectionStandardDAL(db, redis_client).bulk_upsert([], ['standard_code']) == {
+        'inserted': 0, 'updated': 0, 'failed': 0, 'chunks': []
+    }
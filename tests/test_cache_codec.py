@@ -0,0 +1,80 @@
+# 缓存值编解码器测试
+
+import json
+from datetime import datetime, date, time
+from decimal import Decimal
+
+import pytest
+
+from app.utils.redis_utils import (
+    CacheCodec, MsgpackCacheCodec, RedisUtils, TaggedJSONCacheCodec, cache_codec, msgpack
+)
+
+VALUE = {
+    'id': 1,
+    'name': '水泥细度',
+    'created_at': datetime(2024, 5, 1, 8, 30, 15, 123456),
+    'day': date(2024, 5, 1),
+    'at': time(8, 30),
+    'price': Decimal('12.50'),
+    'tags': ['a', 'b'],
+    'empty': None,
+}
+
+codecs = [TaggedJSONCacheCodec]
+if msgpack is not None:
+    codecs.append(MsgpackCacheCodec)
+
+
+@pytest.mark.parametrize('codec_class', codecs)
+def test_round_trip_keeps_types(codec_class):
+    codec = codec_class()
+    data = codec.encode(VALUE)
+    assert data[0] == CacheCodec.VERSION
+    assert data[1] == codec_class.codec_id
+    assert data[2] == 0
+    decoded = CacheCodec.decode(data)
+    assert decoded == VALUE
+    assert isinstance(decoded['price'], Decimal)
+    assert type(decoded['created_at']) is datetime
+
+
+def test_tagged_json_keeps_bytes():
+    codec = TaggedJSONCacheCodec()
+    assert CacheCodec.decode(codec.encode({'raw': b'\x00\xff'})) == {'raw': b'\x00\xff'}
+
+
+@pytest.mark.parametrize('codec_class', codecs)
+def test_large_values_are_compressed(codec_class):
+    codec = codec_class(compress_threshold=64)
+    value = {'text': '检测参数' * 200}
+    data = codec.encode(value)
+    assert data[2] & CacheCodec.FLAG_ZLIB
+    assert len(data) < len(codec.dumps_body(value))
+    assert CacheCodec.decode(data) == value
+
+
+def test_meta_is_stored_in_header():
+    data = cache_codec.encode(VALUE, meta=(0.25, 1700000000.0))
+    assert data[2] & CacheCodec.FLAG_META
+    value, meta = CacheCodec.decode_entry(data)
+    assert value == VALUE
+    assert meta == (0.25, 1700000000.0)
+
+
+def test_legacy_json_values_still_decode():
+    legacy = json.dumps({'id': 1, 'name': '旧数据'}, ensure_ascii=False)
+    assert CacheCodec.decode(legacy) == {'id': 1, 'name': '旧数据'}
+    assert CacheCodec.decode(legacy.encode()) == {'id': 1, 'name': '旧数据'}
+
+
+def test_unknown_codec_is_rejected():
+    with pytest.raises(ValueError):
+        CacheCodec.decode(bytes((CacheCodec.VERSION, 99, 0)) + b'{}')
+
+
+def test_redis_round_trip_with_decoding_client(redis_client):
+    """全局客户端自动解码响应，二进制缓存值通过单独的客户端读写"""
+    assert RedisUtils.set_cache(redis_client, 'item:v2:1', VALUE)
+    assert RedisUtils.get_cache(redis_client, 'item:v2:1') == VALUE
+    assert RedisUtils.get_many_cache(redis_client, ['item:v2:1', 'item:v2:2']) == [VALUE, None]
@@ -0,0 +1,70 @@
+# 按表代数缓存列表查询的测试
+
+from app.dal.detection_dal import CategoryDAL, DetectionParamDAL
+from app.models.detection import Category
+from app.utils.redis_utils import GENERATION_KEY_PREFIX, RedisUtils
+
+
+def test_cached_query_reuses_result_until_generation_bumps(db, redis_client):
+    dal = CategoryDAL(db, redis_client)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return len(calls)
+
+    assert dal.cached_query('demo', {'a': 1}, loader) == 1
+    assert dal.cached_query('demo', {'a': 1}, loader) == 1
+    # 参数不同使用不同的键
+    assert dal.cached_query('demo', {'a': 2}, loader) == 2
+
+    RedisUtils.bump_generations(redis_client, Category.__tablename__)
+    assert redis_client.get(f"{GENERATION_KEY_PREFIX}{Category.__tablename__}") == '1'
+    assert dal.cached_query('demo', {'a': 1}, loader) == 3
+
+
+def test_cached_query_key_depends_on_every_listed_table(db, redis_client):
+    dal = CategoryDAL(db, redis_client)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return len(calls)
+
+    tables = ['category', 'detection_object']
+    assert dal.cached_query('tree', None, loader, tables=tables) == 1
+    RedisUtils.bump_generations(redis_client, 'detection_object')
+    assert dal.cached_query('tree', None, loader, tables=tables) == 2
+
+
+def test_get_all_is_cached_and_invalidated_by_writes(session_factory, redis_client, query_counter):
+    db = session_factory()
+    dal = CategoryDAL(db, redis_client)
+    dal.create({'category_name': '建材', 'sort_order': 1, 'status': 1})
+    assert [c.category_name for c in dal.get_all()] == ['建材']
+    db.close()
+
+    query_counter.clear()
+    db = session_factory()
+    dal = CategoryDAL(db, redis_client)
+    assert [c.category_name for c in dal.get_all()] == ['建材']
+    assert query_counter == []
+
+    dal.create({'category_name': '钢材', 'sort_order': 2, 'status': 1})
+    assert sorted(c.category_name for c in dal.get_all()) == ['建材', '钢材']
+    db.close()
+
+
+def test_pending_changes_bypass_cache(db, redis_client):
+    dal = CategoryDAL(db, redis_client)
+    dal.get_all()
+    db.add(Category(category_name='未提交', sort_order=1, status=1))
+    assert dal.cached_query('demo', None, lambda: 'fresh') == 'fresh'
+    assert dal.cached_query('demo', None, lambda: 'again') == 'again'
+
+
+def test_list_caching_can_be_disabled_per_dal(db, redis_client):
+    dal = DetectionParamDAL(db, redis_client)
+    assert not dal.cache_list_queries
+    assert dal.cached_query('demo', None, lambda: 1) == 1
+    assert dal.cached_query('demo', None, lambda: 2) == 2
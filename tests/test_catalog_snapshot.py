@@ -0,0 +1,79 @@
+# 目录快照测试
+
+from app.dal.detection_dal import CategoryDAL, DetectionItemDAL
+from app.models.detection import DetectionItem, DetectionObject
+from app.services.detection.catalog_snapshot_service import CatalogSnapshot, CatalogSnapshotService
+
+
+def test_build_contains_enabled_tree(db, catalog):
+    disabled = DetectionItem(item_name='化学成分', object_id=catalog['object_id'], status=0)
+    db.add(disabled)
+    db.commit()
+
+    snapshot = CatalogSnapshot.build(db, version=(0,) * len(CatalogSnapshot.TABLES))
+    assert snapshot.categories == ({'category_id': catalog['category_id'], 'category_name': '建材'},)
+    assert snapshot.tree[0]['objects'] == [{'id': catalog['object_id'], 'name': '水泥', 'code': 'SN'}]
+    assert snapshot.get_objects(catalog['category_id']) == (
+        {'object_id': catalog['object_id'], 'object_name': '水泥'},
+    )
+    # 禁用的检测项目不在快照中
+    assert [item['item_id'] for item in snapshot.get_items(catalog['object_id'])] == [catalog['item_id']]
+    assert snapshot.get_items(9999) == ()
+    params = snapshot.params_by_item[catalog['item_id']]
+    assert [p['param_name'] for p in params] == ['细度']
+    assert params[0]['standards'] == (('GB 175-2007', '通用硅酸盐水泥'),)
+    templates = snapshot.get_templates(catalog['item_id'])
+    assert [t['id'] for t in templates] == [catalog['template_id']]
+    assert templates[0]['file_path']
+
+
+def test_get_snapshot_reuses_until_generation_changes(session_factory, redis_client, catalog, query_counter):
+    first, error = CatalogSnapshotService.get_snapshot()
+    assert error is None
+
+    query_counter.clear()
+    second, _ = CatalogSnapshotService.get_snapshot()
+    assert second is first
+    assert query_counter == []
+
+    db = session_factory()
+    CategoryDAL(db, redis_client).update(catalog['category_id'], {'category_name': '钢材'})
+    db.close()
+    third, _ = CatalogSnapshotService.get_snapshot()
+    assert third is not first
+    assert third.categories[0]['category_name'] == '钢材'
+
+
+def test_get_snapshot_with_validators_version(redis_client, catalog):
+    version, _, changed_at = CatalogSnapshotService.get_validators()
+    assert version == (0,) * len(CatalogSnapshot.TABLES)
+    assert changed_at is not None
+    snapshot, _ = CatalogSnapshotService.get_snapshot(version)
+    assert snapshot.version == version
+
+
+def test_public_routes_read_from_snapshot(client, session_factory, redis_client, catalog, query_counter):
+    body = client.get('/api/public/detection/categories').json()
+    assert body['data'] == [{'category_id': catalog['category_id'], 'category_name': '建材'}]
+
+    # 第一次请求查询图片版本，不存在的图片也会缓存
+    client.get(f"/api/public/detection/objects/{catalog['object_id']}/items")
+    query_counter.clear()
+    body = client.get(f"/api/public/detection/objects/{catalog['object_id']}/items").json()
+    assert [item['item_name'] for item in body['data']] == ['物理性能']
+    assert body['data'][0]['images'] == {}
+    assert query_counter == []
+
+    db = session_factory()
+    DetectionItemDAL(db, redis_client).update(catalog['item_id'], {'status': 0})
+    db.close()
+    body = client.get(f"/api/public/detection/objects/{catalog['object_id']}/items").json()
+    assert body['data'] == []
+
+
+def test_disabled_object_items_remain_searchable(db, catalog):
+    db.query(DetectionObject).filter(DetectionObject.object_id == catalog['object_id']).update({'status': 0})
+    db.commit()
+    snapshot = CatalogSnapshot.build(db)
+    assert snapshot.get_objects(catalog['category_id']) == ()
+    assert [item['item_id'] for item in snapshot.search_items('水泥')] == [catalog['item_id']]
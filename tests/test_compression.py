@@ -0,0 +1,127 @@
+# 响应压缩测试
+
+import gzip
+import json
+
+import pytest
+from starlette.testclient import TestClient
+
+from app.core import compression
+from app.core.compression import (
+    CompressionMiddleware, choose_encoding, compress, precompress_variants, supported_encodings
+)
+from app.models.image.data_image import DataImage
+
+SVG = '<svg xmlns="http://www.w3.org/2000/svg">' + '<text>检测参数</text>' * 200 + '</svg>'
+
+
+@pytest.mark.parametrize('header, available, expected', [
+    (None, ('br', 'gzip'), None),
+    ('gzip, deflate', ('br', 'gzip'), 'gzip'),
+    ('br, gzip', ('br', 'gzip'), 'br'),
+    ('gzip;q=1.0, br;q=0.5', ('br', 'gzip'), 'gzip'),
+    ('*', ('br', 'gzip'), 'br'),
+    ('gzip;q=0, *;q=0.1', ('gzip',), None),
+    ('identity', ('br', 'gzip'), None),
+    ('GZIP', ('gzip',), 'gzip'),
+])
+def test_choose_encoding(header, available, expected):
+    assert choose_encoding(header, available) == expected
+
+
+def test_precompressed_gzip_is_deterministic():
+    data = SVG.encode('utf-8')
+    variants = precompress_variants(data)
+    assert gzip.decompress(variants['gzip']) == data
+    assert variants['gzip'] == compress(data, 'gzip', precompress=True)
+    if 'br' not in supported_encodings():
+        assert variants['br'] is None
+
+
+def test_large_json_is_compressed(client, catalog, db):
+    from app.models.detection import Category
+    db.add_all(Category(category_name=f"分类{i:04d}", sort_order=i, status=1) for i in range(100))
+    db.commit()
+
+    response = client.get('/api/public/detection/categories', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['content-encoding'] == 'gzip'
+    assert 'accept-encoding' in response.headers['vary'].lower()
+    assert len(response.json()['data']) == 101
+
+    plain = client.get('/api/public/detection/categories', headers={'Accept-Encoding': 'identity'})
+    assert 'content-encoding' not in plain.headers
+
+
+def test_small_json_is_not_compressed(client, catalog):
+    response = client.get('/api/public/detection/categories', headers={'Accept-Encoding': 'gzip'})
+    assert 'content-encoding' not in response.headers
+
+
+def test_precompressed_svg_is_served_as_is(client, db):
+    data = SVG.encode('utf-8')
+    db.add(DataImage(
+        data_unique_id='detection:1', device_type='pc', version=1, svg_content=SVG, png_data=b'png',
+        svg_gzip=precompress_variants(data)['gzip']
+    ))
+    db.commit()
+    url = '/api/image/detection:1/pc/v1.svg'
+
+    response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['content-encoding'] == 'gzip'
+    assert response.headers['etag'].startswith('W/')
+    assert response.text == SVG
+
+    plain = client.get(url, headers={'Accept-Encoding': 'identity'})
+    assert 'content-encoding' not in plain.headers
+    assert plain.text == SVG
+    assert not plain.headers['etag'].startswith('W/')
+
+
+def _asgi_app(status: int, body: bytes, content_length: int = None):
+    """返回固定JSON响应的ASGI应用，content_length默认取响应体长度"""
+    async def app(scope, receive, send):
+        length = len(body) if content_length is None else content_length
+        await send({'type': 'http.response.start', 'status': status, 'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(length).encode('latin-1')),
+            (b'etag', b'"v1"')
+        ]})
+        await send({'type': 'http.response.body', 'body': body})
+    return app
+
+
+@pytest.mark.parametrize('size, offloaded', [(2000, False), (5000, True)])
+def test_large_bodies_are_compressed_in_threadpool(monkeypatch, size, offloaded):
+    calls = []
+
+    async def fake_run_in_threadpool(func, *args):
+        calls.append(len(args[0]))
+        return func(*args)
+
+    monkeypatch.setattr(compression, 'run_in_threadpool', fake_run_in_threadpool)
+    body = json.dumps({'data': 'x' * size}).encode('utf-8')
+    app = CompressionMiddleware(_asgi_app(200, body), minimum_size=1024, threadpool_min_size=4096)
+
+    response = TestClient(app).get('/', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['content-encoding'] == 'gzip'
+    assert response.headers['etag'] == 'W/"v1"'
+    assert response.content == body
+    assert calls == ([len(body)] if offloaded else [])
+
+
+def test_not_modified_keeps_headers():
+    app = CompressionMiddleware(_asgi_app(304, b'', content_length=4096), minimum_size=1)
+    response = TestClient(app).get('/', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 304
+    assert response.headers['content-length'] == '4096'
+    assert response.headers['etag'] == '"v1"'
+    assert 'content-encoding' not in response.headers
+
+
+def test_head_keeps_content_length():
+    app = CompressionMiddleware(_asgi_app(200, b'', content_length=4096), minimum_size=1)
+    response = TestClient(app).head('/', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['content-length'] == '4096'
+    assert 'content-encoding' not in response.headers
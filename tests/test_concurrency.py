@@ -0,0 +1,86 @@
+# 公开接口有界线程池测试
+
+import importlib
+import threading
+import time
+
+import anyio
+
+from app.core import concurrency
+
+
+def test_limiter_size_follows_environment(monkeypatch):
+    monkeypatch.setenv('PUBLIC_THREADPOOL_SIZE', '7')
+    try:
+        module = importlib.reload(concurrency)
+        assert module.PUBLIC_THREADPOOL_SIZE == 7
+        module._public_limiter = None
+
+        async def main():
+            # 限制器需要在事件循环中创建
+            limiter = module.get_public_limiter()
+            # 同一进程只创建一个限制器
+            assert module.get_public_limiter() is limiter
+            return limiter.total_tokens
+
+        assert anyio.run(main) == 7
+    finally:
+        monkeypatch.delenv('PUBLIC_THREADPOOL_SIZE')
+        importlib.reload(concurrency)
+        concurrency._public_limiter = None
+
+
+def test_run_blocking_never_exceeds_limiter_size(monkeypatch):
+    monkeypatch.setattr(concurrency, 'PUBLIC_THREADPOOL_SIZE', 2)
+    lock = threading.Lock()
+    state = {'running': 0, 'peak': 0}
+
+    def blocking(value):
+        with lock:
+            state['running'] += 1
+            state['peak'] = max(state['peak'], state['running'])
+        time.sleep(0.05)
+        with lock:
+            state['running'] -= 1
+        return value * 2
+
+    async def main():
+        results = []
+
+        async def call(value):
+            results.append(await concurrency.run_blocking(blocking, value))
+
+        async with anyio.create_task_group() as group:
+            for value in range(6):
+                group.start_soon(call, value)
+        return sorted(results)
+
+    assert anyio.run(main) == [0, 2, 4, 6, 8, 10]
+    assert state['peak'] == 2
+
+
+def test_public_routes_run_blocking_calls_through_limiter(monkeypatch, client, catalog):
+    """公开接口的快照和Redis读取都在公开接口的限制器下执行，不占用默认线程池"""
+    calls = []
+    run_sync = anyio.to_thread.run_sync
+
+    async def recording_run_sync(func, *args, limiter=None, **kwargs):
+        name = getattr(func, 'func', func).__qualname__
+
+        def wrapped():
+            # 记录执行期间是否占用了公开接口限制器的名额
+            calls.append((name, limiter is concurrency._public_limiter,
+                          limiter.borrowed_tokens if limiter is not None else 0))
+            return func()
+        return await run_sync(wrapped, *args, limiter=limiter, **kwargs)
+
+    monkeypatch.setattr(concurrency.anyio.to_thread, 'run_sync', recording_run_sync)
+    body = client.get('/api/public/detection/categories').json()
+    assert body['code'] == 200
+
+    service_calls = {name: (is_public, borrowed) for name, is_public, borrowed in calls
+                     if name.startswith('CatalogSnapshotService.')}
+    assert service_calls == {
+        'CatalogSnapshotService.get_validators': (True, 1),
+        'CatalogSnapshotService.get_snapshot': (True, 1)
+    }
@@ -0,0 +1,78 @@
+# BaseDAL.get_many / update_many 批量读写测试
+
+import pytest
+
+from app.dal.detection_dal import CategoryDAL
+from app.models.detection import Category
+from app.utils.redis_utils import RedisUtils
+
+
+@pytest.fixture
+def category_ids(db):
+    """写入五个分类"""
+    categories = [Category(category_name=f"分类{i}", sort_order=i, status=1) for i in range(5)]
+    db.add_all(categories)
+    db.commit()
+    return [category.category_id for category in categories]
+
+
+@pytest.fixture
+def mget_calls(monkeypatch):
+    """记录每次MGET读取的键"""
+    calls = []
+    original = RedisUtils.get_many_cache
+
+    def get_many_cache(redis_client, keys):
+        calls.append(list(keys))
+        return original(redis_client, keys)
+
+    monkeypatch.setattr(RedisUtils, 'get_many_cache', staticmethod(get_many_cache))
+    return calls
+
+
+def test_get_many_uses_one_mget_and_one_in_query(session_factory, redis_client, category_ids,
+                                                  mget_calls, query_counter):
+    db = session_factory()
+    dal = CategoryDAL(db, redis_client)
+    # 预热其中两条
+    dal.get_by_id(category_ids[0])
+    dal.get_by_id(category_ids[3])
+    db.close()
+
+    mget_calls.clear()
+    query_counter.clear()
+    db = session_factory()
+    categories = CategoryDAL(db, redis_client).get_many(category_ids)
+    assert [c.category_id for c in categories] == category_ids
+    assert len(mget_calls) == 1
+    assert len(query_counter) == 1
+    assert ' IN ' in query_counter[0]
+    db.close()
+
+    # 未命中的三条已回填，再次读取不查数据库
+    query_counter.clear()
+    db = session_factory()
+    CategoryDAL(db, redis_client).get_many(category_ids)
+    assert query_counter == []
+    db.close()
+
+
+def test_get_many_keeps_order_dedups_and_skips_missing(db, redis_client, category_ids):
+    ids = [category_ids[2], 9999, category_ids[0], category_ids[2]]
+    categories = CategoryDAL(db, redis_client).get_many(ids)
+    assert [c.category_id for c in categories] == [category_ids[2], category_ids[0]]
+    assert CategoryDAL(db, redis_client).get_many([]) == []
+
+
+def test_update_many_updates_rows_and_cache(session_factory, redis_client, category_ids):
+    db = session_factory()
+    updated = CategoryDAL(db, redis_client).update_many(category_ids[:3], {'status': 0})
+    assert [c.status for c in updated] == [0, 0, 0]
+    db.close()
+
+    db = session_factory()
+    rows = db.query(Category).filter(Category.category_id.in_(category_ids[:3])).all()
+    assert {c.status for c in rows} == {0}
+    cached = RedisUtils.get_many_cache(redis_client, [f"category:v2:{i}" for i in category_ids])
+    assert [value['status'] for value in cached[:3]] == [0, 0, 0]
+    db.close()
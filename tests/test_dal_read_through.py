@@ -0,0 +1,55 @@
+# BaseDAL.get_by_id 读穿透缓存测试
+
+from app.dal.detection_dal import CategoryDAL
+from app.models.detection import Category
+
+
+def test_get_by_id_fills_cache_then_skips_database(session_factory, redis_client, catalog, query_counter):
+    """首次读取回填Redis，之后的读取直接从缓存还原实例，不查询数据库"""
+    category_id = catalog['category_id']
+    db = session_factory()
+    category = CategoryDAL(db, redis_client).get_by_id(category_id)
+    assert category.category_name == '建材'
+    db.close()
+    assert redis_client.exists(f"category:v2:{category_id}")
+
+    query_counter.clear()
+    db = session_factory()
+    cached = CategoryDAL(db, redis_client).get_by_id(category_id)
+    assert query_counter == []
+    assert cached.category_name == '建材'
+    assert cached.category_id == category_id
+    # 还原的实例与会话关联，可以直接修改并提交
+    assert cached in db
+    db.close()
+
+
+def test_get_by_id_missing_row_is_not_cached(db, redis_client, catalog):
+    """不存在的记录返回None且不写入缓存"""
+    assert CategoryDAL(db, redis_client).get_by_id(9999) is None
+    assert not redis_client.exists("category:v2:9999")
+
+
+def test_update_refreshes_cached_row(session_factory, redis_client, catalog):
+    """更新后缓存中是新值"""
+    category_id = catalog['category_id']
+    db = session_factory()
+    CategoryDAL(db, redis_client).update(category_id, {'category_name': '钢材'})
+    db.close()
+
+    db = session_factory()
+    assert CategoryDAL(db, redis_client).get_by_id(category_id).category_name == '钢材'
+    db.close()
+
+
+def test_incomplete_cache_entry_falls_back_to_database(session_factory, redis_client, catalog):
+    """缓存中的数据缺少列时（旧版本格式）视为未命中，从数据库读取"""
+    from app.utils.redis_utils import RedisUtils
+
+    category_id = catalog['category_id']
+    RedisUtils.set_cache(redis_client, f"category:v2:{category_id}", {'category_id': category_id})
+    db = session_factory()
+    category = CategoryDAL(db, redis_client).get_by_id(category_id)
+    assert isinstance(category, Category)
+    assert category.category_name == '建材'
+    db.close()
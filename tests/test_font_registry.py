@@ -0,0 +1,134 @@
+# 字体注册表测试
+
+import os
+from typing import Optional
+
+import pytest
+from PIL import ImageFont
+
+from app.utils import font_registry as font_registry_module
+from app.utils.font_registry import FontRegistry
+
+
+def _source_font() -> Optional[bytes]:
+    """PIL自带的FreeType默认字体内容，复制为各候选文件名；解析只看文件名，不检查字体本身是否包含中文"""
+    path = getattr(ImageFont.load_default(), 'path', None)
+    return path.getvalue() if hasattr(path, 'getvalue') else None
+
+
+SOURCE_FONT = _source_font()
+
+
+@pytest.fixture
+def font_dir(tmp_path):
+    """
+    创建临时字体目录，返回写入字体文件的函数
+    :return: write(文件名, 子目录, 是否为有效字体) → 文件路径
+    """
+    if SOURCE_FONT is None:
+        pytest.skip('PIL没有可用的FreeType默认字体')
+
+    def write(name: str, subdir: str = '', valid: bool = True) -> str:
+        directory = tmp_path / subdir
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / name
+        path.write_bytes(SOURCE_FONT if valid else b'not a font')
+        return str(path)
+    return write
+
+
+def test_resolve_prefers_cjk_fonts_by_priority(tmp_path, font_dir):
+    font_dir('DejaVuSans.ttf')
+    wqy = font_dir('wqy-microhei.ttc', 'wenquanyi')
+    noto_bold = font_dir('NotoSansCJKsc-Bold.otf')
+    registry = FontRegistry([str(tmp_path)])
+
+    # 子目录中的中文字体优先于西文字体
+    assert registry.resolve('body') == wqy
+    assert registry.resolve('watermark') == wqy
+    assert registry.resolve('bold') == noto_bold
+
+
+def test_resolve_skips_broken_fonts_and_keeps_search_order(tmp_path, font_dir):
+    font_dir('simhei.ttf', 'first', valid=False)
+    msyh = font_dir('msyh.ttc', 'first')
+    font_dir('msyh.ttc', 'second')
+    registry = FontRegistry([str(tmp_path / 'first'), str(tmp_path / 'second')])
+    # 无法加载的字体跳过，同名文件取搜索路径中先出现的
+    assert registry.resolve('body') == msyh
+
+
+def test_search_path_from_environment(tmp_path, font_dir, monkeypatch):
+    wqy = font_dir('wqy-zenhei.ttc')
+    monkeypatch.setenv('FONT_SEARCH_PATH', os.pathsep.join([str(tmp_path / 'missing'), str(tmp_path)]))
+    assert FontRegistry().resolve('bold') == wqy
+
+
+def test_falls_back_to_default_font(tmp_path, monkeypatch):
+    default = object()
+    monkeypatch.setattr(ImageFont, 'load_default', lambda: default)
+    registry = FontRegistry([str(tmp_path)])
+    assert registry.resolve('body') is None
+    assert registry.get_font('body', 14) is default
+    assert registry.diagnostics()['roles']['body'] == {'path': None, 'file': None, 'cjk': False}
+
+
+def test_scans_and_loads_once_per_process(tmp_path, font_dir, monkeypatch):
+    font_dir('simhei.ttf')
+    walks, loads = [], []
+    real_walk, real_truetype = os.walk, ImageFont.truetype
+
+    def walk(path, *args, **kwargs):
+        walks.append(path)
+        return real_walk(path, *args, **kwargs)
+
+    def truetype(path, size, *args, **kwargs):
+        loads.append(size)
+        return real_truetype(path, size, *args, **kwargs)
+
+    monkeypatch.setattr(font_registry_module.os, 'walk', walk)
+    monkeypatch.setattr(ImageFont, 'truetype', truetype)
+    registry = FontRegistry([str(tmp_path)])
+    registry.preload({'body': [14, 16], 'bold': [16]})
+    first = registry.get_font('body', 14)
+    assert registry.get_font('body', 14) is first
+    # 黑体同时用作正文和表头，同一文件和字号只加载一次
+    assert registry.get_font('bold', 16) is registry.get_font('body', 16)
+    registry.diagnostics()
+    assert walks == [str(tmp_path)]
+    # 每个用途解析时试加载一次（12号），之后每个字号加载一次
+    assert sorted(loads) == [12, 12, 12, 14, 16]
+
+
+@pytest.fixture
+def admin_client(app, client):
+    """管理员测试客户端，跳过令牌和权限校验"""
+    from app.models.user.user import User
+    from app.routes.admin.dependencies import get_current_admin
+
+    app.dependency_overrides[get_current_admin] = lambda: User(id=1, name='管理员', username='admin')
+    yield client
+    app.dependency_overrides.pop(get_current_admin, None)
+
+
+def test_diagnostics_route(admin_client, tmp_path, font_dir, monkeypatch):
+    from app.routes.admin import diagnostics
+
+    font_dir('simhei.ttf')
+    registry = FontRegistry([str(tmp_path), str(tmp_path / 'missing')])
+    monkeypatch.setattr(diagnostics, 'font_registry', registry)
+    registry.get_font('body', 14)
+
+    response = admin_client.get('/api/admin/diagnostics/fonts')
+    assert response.status_code == 200
+    data = response.json()['data']
+    assert data['search_path'] == [
+        {'path': str(tmp_path), 'exists': True}, {'path': str(tmp_path / 'missing'), 'exists': False}
+    ]
+    assert data['font_files'] == 1
+    assert data['roles']['body'] == {'path': str(tmp_path / 'simhei.ttf'), 'file': 'simhei.ttf', 'cjk': True}
+    assert data['loaded'] == [{'file': 'simhei.ttf', 'size': 14}]
+
+
+def test_diagnostics_route_requires_login(client):
+    assert client.get('/api/admin/diagnostics/fonts').status_code in (401, 403)
@@ -0,0 +1,103 @@
+# RedisUtils.get_or_compute 防击穿与锁续期测试
+
+import threading
+import time
+
+import pytest
+
+from app.utils.redis_utils import COMPUTE_LOCK_PREFIX, RedisUtils, cache_codec, get_binary_client, lock_renewer
+
+
+@pytest.fixture
+def renew_calls(monkeypatch):
+    """记录锁续期调用"""
+    calls = []
+    original = RedisUtils.renew_lock
+
+    def renew_lock(redis_client, key, lock_id, expire=30):
+        calls.append(key)
+        return original(redis_client, key, lock_id, expire)
+
+    monkeypatch.setattr(RedisUtils, 'renew_lock', staticmethod(renew_lock))
+    return calls
+
+
+def renewer_threads():
+    return [thread for thread in threading.enumerate() if thread.name == 'lock-renewer']
+
+
+def test_miss_computes_once_and_caches(redis_client):
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return {'value': 1}
+
+    assert RedisUtils.get_or_compute(redis_client, 'q:1', loader, ttl=60) == {'value': 1}
+    assert RedisUtils.get_or_compute(redis_client, 'q:1', loader, ttl=60) == {'value': 1}
+    assert len(calls) == 1
+    assert not redis_client.exists(f"{COMPUTE_LOCK_PREFIX}q:1")
+
+
+def test_none_is_not_cached(redis_client):
+    assert RedisUtils.get_or_compute(redis_client, 'q:none', lambda: None) is None
+    assert not redis_client.exists('q:none')
+
+
+def test_fast_loaders_do_not_start_threads_or_renew(redis_client, renew_calls):
+    for i in range(20):
+        RedisUtils.get_or_compute(redis_client, f"q:{i}", lambda: i, lock_timeout=30)
+    assert renew_calls == []
+    assert lock_renewer.pending() == 0
+    assert len(renewer_threads()) <= 1
+
+
+def test_slow_loader_keeps_lock_alive(redis_client, renew_calls):
+    lock_key = f"{COMPUTE_LOCK_PREFIX}q:slow"
+
+    def loader():
+        time.sleep(0.6)
+        # 锁时间只有0.3秒，没有续期的话此时已经过期
+        assert redis_client.exists(lock_key)
+        return 'done'
+
+    assert RedisUtils.get_or_compute(redis_client, 'q:slow', loader, lock_timeout=0.3) == 'done'
+    assert lock_key in renew_calls
+    assert lock_renewer.pending() == 0
+    assert not redis_client.exists(lock_key)
+
+
+def test_concurrent_misses_compute_once(redis_client):
+    calls = []
+    results = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.2)
+        return 'shared'
+
+    def worker():
+        results.append(RedisUtils.get_or_compute(redis_client, 'q:shared', loader, wait_timeout=5))
+
+    threads = [threading.Thread(target=worker) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert results == ['shared'] * 5
+
+
+def test_should_refresh_early():
+    now = time.time()
+    assert not RedisUtils._should_refresh_early(None, 1.0)
+    assert not RedisUtils._should_refresh_early((1.0, now - 10), 0)
+    assert RedisUtils._should_refresh_early((0.1, now - 1), 1.0)
+    assert not RedisUtils._should_refresh_early((0.001, now + 3600), 1.0)
+
+
+def test_hit_near_expiry_recomputes(redis_client):
+    """逻辑过期时间已到的缓存值由获得锁的请求提前刷新"""
+    get_binary_client(redis_client).set('q:early', cache_codec.encode('old', meta=(0.5, time.time() - 1)), ex=60)
+    assert RedisUtils.get_or_compute(redis_client, 'q:early', lambda: 'new', ttl=60) == 'new'
+    assert RedisUtils.get_cache(redis_client, 'q:early') == 'new'
@@ -0,0 +1,117 @@
+# 条件请求（ETag / Last-Modified / 304）测试
+
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from app.core.http_cache import format_http_date, make_etag
+from app.dal.detection_dal import CategoryDAL
+from app.utils.redis_utils import GENERATION_TIME_KEY_PREFIX, RedisUtils, time as redis_time
+
+CATEGORIES = '/api/public/detection/categories'
+
+
+def test_make_etag_and_http_date():
+    assert make_etag('catalog', (1, 2)) == make_etag('catalog', (1, 2))
+    assert make_etag('catalog', (1, 2)) != make_etag('catalog', (1, 3))
+    assert make_etag('x', weak=True).startswith('W/"')
+    assert format_http_date(datetime(2024, 1, 2, 3, 4, 5)) == 'Tue, 02 Jan 2024 03:04:05 GMT'
+
+
+def test_bump_records_monotonic_change_time(redis_client, monkeypatch):
+    monkeypatch.setattr(redis_time, 'time', lambda: 1700000000.5)
+    RedisUtils.bump_generations(redis_client, 'category')
+    assert redis_client.get(f"{GENERATION_TIME_KEY_PREFIX}category") == '1700000000'
+    # 同一秒内再次变更，时间向后推进1秒
+    RedisUtils.bump_generations(redis_client, 'category')
+    assert redis_client.get(f"{GENERATION_TIME_KEY_PREFIX}category") == '1700000001'
+    assert redis_client.get('gen:category') == '2'
+
+    generations, changed_at = RedisUtils.get_generations_with_time(redis_client, ['category', 'standard'])
+    assert generations == [2, 0]
+    # 没有记录时间的表以当前时间补记，之后读取不变
+    assert changed_at == 1700000001
+    assert redis_client.get(f"{GENERATION_TIME_KEY_PREFIX}standard") == '1700000000'
+
+
+def test_etag_round_trip(client, catalog):
+    first = client.get(CATEGORIES)
+    assert first.status_code == 200
+    assert first.headers['cache-control'] == 'public, no-cache'
+    etag = first.headers['etag']
+
+    second = client.get(CATEGORIES, headers={'If-None-Match': etag})
+    assert second.status_code == 304
+    assert second.content == b''
+    assert second.headers['etag'] == etag
+
+
+def test_if_modified_since_unchanged_returns_304(client, catalog):
+    last_modified = client.get(CATEGORIES).headers['last-modified']
+    response = client.get(CATEGORIES, headers={'If-Modified-Since': last_modified})
+    assert response.status_code == 304
+
+
+def test_delete_invalidates_if_modified_since(client, session_factory, redis_client, catalog):
+    """删除记录不会改变剩余记录的update_time，Last-Modified仍需前进"""
+    session = session_factory()
+    extra = CategoryDAL(session, redis_client).create({'category_name': '钢材', 'sort_order': 2, 'status': 1})
+    extra_id = extra.category_id
+    session.close()
+
+    first = client.get(CATEGORIES)
+    last_modified = first.headers['last-modified']
+    etag = first.headers['etag']
+    assert len(first.json()['data']) == 2
+
+    session = session_factory()
+    CategoryDAL(session, redis_client).delete(extra_id)
+    session.close()
+
+    response = client.get(CATEGORIES, headers={'If-Modified-Since': last_modified})
+    assert response.status_code == 200
+    assert len(response.json()['data']) == 1
+    assert parsedate_to_datetime(response.headers['last-modified']) > parsedate_to_datetime(last_modified)
+    assert client.get(CATEGORIES, headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_association_change_invalidates_if_modified_since(client, session_factory, redis_client, catalog):
+    from app.dal.detection_dal import DetectionParamDAL
+
+    last_modified = client.get(CATEGORIES).headers['last-modified']
+    session = session_factory()
+    DetectionParamDAL(session, redis_client).update_standards(catalog['param_id'], catalog['standard_ids'])
+    session.close()
+    response = client.get(CATEGORIES, headers={'If-Modified-Since': last_modified})
+    assert response.status_code == 200
+
+
+def test_templates_ignore_if_modified_since(client, catalog):
+    url = f"/api/public/detection/items/{catalog['item_id']}/templates"
+    response = client.get(url)
+    assert 'last-modified' not in response.headers
+    future = format_http_date(datetime(2100, 1, 1, tzinfo=timezone.utc))
+    assert client.get(url, headers={'If-Modified-Since': future}).status_code == 200
+    assert client.get(url, headers={'If-None-Match': response.headers['etag']}).status_code == 304
+
+
+def test_stale_snapshot_is_served_with_its_own_etag(client, session_factory, redis_client, catalog):
+    """其他线程正在重建快照时返回旧快照，校验器不能使用新代数"""
+    from app.services.detection.catalog_snapshot_service import CatalogSnapshotService
+
+    first = client.get(CATEGORIES)
+    session = session_factory()
+    CategoryDAL(session, redis_client).update(catalog['category_id'], {'category_name': '钢材'})
+    session.close()
+
+    with CatalogSnapshotService._build_lock:
+        stale = client.get(CATEGORIES)
+    assert stale.json()['data'][0]['category_name'] == '建材'
+    assert stale.headers['etag'] == first.headers['etag']
+    assert 'last-modified' not in stale.headers
+
+    # 重建完成后旧ETag不再命中
+    fresh = client.get(CATEGORIES, headers={'If-None-Match': stale.headers['etag']})
+    assert fresh.status_code == 200
+    assert fresh.json()['data'][0]['category_name'] == '钢材'
+    assert fresh.headers['etag'] != first.headers['etag']
+    assert 'last-modified' in fresh.headers
@@ -0,0 +1,65 @@
+# 公开检测项目详情接口测试
+
+import hashlib
+
+from app.dal.detection_dal import DetectionParamDAL
+from app.services.detection.catalog_snapshot_service import CatalogSnapshotService
+from app.services.utils.link_generator import LinkGeneratorService
+
+
+def _bundle_url(item_id: int) -> str:
+    return f'/api/public/detection/items/{item_id}/bundle'
+
+
+def test_bundle_combines_item_params_templates_and_images(client, catalog):
+    response = client.get(_bundle_url(catalog['item_id']))
+    assert response.status_code == 200
+    data = response.json()['data']
+    assert data['item'] == {
+        'item_id': catalog['item_id'], 'item_name': '物理性能',
+        'object_id': catalog['object_id'], 'object_name': '水泥'
+    }
+    assert [param['param_name'] for param in data['params']] == ['细度']
+    assert data['params'][0]['standards'] == '通用硅酸盐水泥\nGB 175-2007'
+    assert data['params'][0]['template_code'] == 'SN-1'
+    assert [template['id'] for template in data['templates']] == [catalog['template_id']]
+    assert data['templates'][0]['download_url'] == LinkGeneratorService.generate_window_signed_url(
+        CatalogSnapshotService.get_snapshot()[0].get_templates(catalog['item_id'])[0]['file_path']
+    )
+    assert data['images'] == {}
+
+
+def test_missing_item_returns_404(client, catalog, redis_client):
+    response = client.get(_bundle_url(9999))
+    assert response.status_code == 404
+    assert 'etag' not in response.headers
+    assert redis_client.keys('item_bundle:*') == []
+
+
+def test_bundle_is_cached_by_snapshot_version_and_link_window(client, catalog, redis_client, query_counter):
+    client.get(_bundle_url(catalog['item_id']))
+    snapshot, _ = CatalogSnapshotService.get_snapshot()
+    _, link_expire = LinkGeneratorService.get_signed_url_window()
+    digest = hashlib.md5(f"{snapshot.version}|{link_expire}".encode('utf-8')).hexdigest()[:16]
+    assert redis_client.keys('item_bundle:*') == [f"item_bundle:{catalog['item_id']}:{digest}"]
+
+    query_counter.clear()
+    assert client.get(_bundle_url(catalog['item_id'])).status_code == 200
+    assert query_counter == []
+
+
+def test_bundle_etag(client, session_factory, redis_client, catalog):
+    url = _bundle_url(catalog['item_id'])
+    first = client.get(url)
+    assert first.headers['cache-control'] == 'public, no-cache'
+    assert 'last-modified' not in first.headers
+    etag = first.headers['etag']
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+    session = session_factory()
+    DetectionParamDAL(session, redis_client).update(catalog['param_id'], {'price': '80元'})
+    session.close()
+    changed = client.get(url, headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['etag'] != etag
+    assert changed.json()['data']['params'][0]['price'] == '80元'
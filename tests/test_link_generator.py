@@ -0,0 +1,85 @@
+# 按时间段复用的下载链接测试
+
+from datetime import datetime
+from urllib.parse import parse_qsl, urlparse
+
+import pytest
+
+from app.services.utils import link_generator
+from app.services.utils.link_generator import LinkGeneratorService
+
+EXPIRE = 3600
+WINDOW = EXPIRE // 2
+FILE_PATH = 'uploads/templates/委托单 A.docx'
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """固定链接生成和验证使用的当前时间，返回设置时间的函数"""
+    now = {'timestamp': 1700000000}
+
+    class FakeDatetime(datetime):
+        @classmethod
+        def utcnow(cls):
+            return datetime.fromtimestamp(now['timestamp'])
+
+    monkeypatch.setattr(link_generator, 'datetime', FakeDatetime)
+    monkeypatch.setenv('DEFAULT_DOWNLOAD_LINK_EXPIRE', str(EXPIRE))
+    LinkGeneratorService._build_window_signed_url.cache_clear()
+
+    def set_time(timestamp: int):
+        now['timestamp'] = timestamp
+    return set_time
+
+
+def _params(url: str) -> dict:
+    return dict(parse_qsl(urlparse(url).query))
+
+
+def test_links_are_identical_within_window(clock):
+    start = 1700000000 // WINDOW * WINDOW
+    clock(start)
+    first = LinkGeneratorService.generate_window_signed_url(FILE_PATH)
+    clock(start + WINDOW - 1)
+    second = LinkGeneratorService.generate_window_signed_url(FILE_PATH)
+    assert second.encode('utf-8') == first.encode('utf-8')
+    # 同一时间段内只计算一次签名
+    assert LinkGeneratorService._build_window_signed_url.cache_info().hits == 1
+
+
+def test_links_change_at_window_boundary(clock):
+    start = 1700000000 // WINDOW * WINDOW
+    clock(start + WINDOW - 1)
+    index, expire = LinkGeneratorService.get_signed_url_window()
+    before = LinkGeneratorService.generate_window_signed_url(FILE_PATH)
+    clock(start + WINDOW)
+    next_index, next_expire = LinkGeneratorService.get_signed_url_window()
+    after = LinkGeneratorService.generate_window_signed_url(FILE_PATH)
+    assert next_index == index + 1
+    assert next_expire == expire + WINDOW
+    assert after != before
+    assert _params(after)['expire'] == str(next_expire)
+
+
+@pytest.mark.parametrize('offset', [0, 1, WINDOW // 2, WINDOW - 1])
+def test_links_keep_half_lifetime(clock, offset):
+    now = 1700000000 // WINDOW * WINDOW + offset
+    clock(now)
+    expire = int(_params(LinkGeneratorService.generate_window_signed_url(FILE_PATH))['expire'])
+    assert expire - now >= EXPIRE // 2
+    assert expire - now <= EXPIRE
+
+
+def test_window_links_pass_validation(clock):
+    start = 1700000000 // WINDOW * WINDOW
+    clock(start)
+    params = _params(LinkGeneratorService.generate_window_signed_url(FILE_PATH))
+    assert params['file_path'] == FILE_PATH
+    assert LinkGeneratorService.validate_signed_url(params)
+    assert not LinkGeneratorService.validate_signed_url(dict(params, file_path='uploads/other.docx'))
+
+    # 时间段结束后链接仍在有效期内，过期时间之后失效
+    clock(start + WINDOW * 2)
+    assert LinkGeneratorService.validate_signed_url(params)
+    clock(start + WINDOW * 2 + 1)
+    assert not LinkGeneratorService.validate_signed_url(params)
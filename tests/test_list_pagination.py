@@ -0,0 +1,61 @@
+# 列表接口分页测试
+
+import pytest
+
+from app.models.detection import DetectionStandard, DelegationFormTemplate
+
+LIST_ROUTES = ['/api/detection/params', '/api/detection/standards', '/api/detection/templates']
+
+
+def row_id(row):
+    """列表行的主键"""
+    for field in ('param_id', 'standard_id', 'template_id', 'id'):
+        if row.get(field) is not None:
+            return row[field]
+
+
+@pytest.fixture
+def many_rows(db, catalog):
+    """再写入若干检测规范和委托单模板，便于翻页"""
+    for i in range(5):
+        db.add(DetectionStandard(standard_code=f"JGJ {i}", standard_name=f"规范{i}"))
+        db.add(DelegationFormTemplate(template_name=f"模板{i}", template_code=f"T-{i}", file_type='docx'))
+    db.commit()
+
+
+@pytest.mark.parametrize('url', LIST_ROUTES)
+def test_invalid_cursor_returns_400(user_client, catalog, url):
+    response = user_client.get(url, params={'mode': 'cursor', 'cursor': 'not-a-cursor'})
+    assert response.status_code == 400
+    assert '游标' in response.json()['detail']
+
+
+@pytest.mark.parametrize('url', LIST_ROUTES)
+def test_cursor_walk(user_client, many_rows, url):
+    first = user_client.get(url, params={'mode': 'page', 'limit': 1000}).json()
+    expected = [row_id(row) for row in first['data']]
+
+    seen, cursor = [], None
+    while True:
+        params = {'mode': 'cursor', 'limit': 2}
+        if cursor:
+            params['cursor'] = cursor
+        body = user_client.get(url, params=params).json()
+        assert body['total'] == -1
+        seen.extend(row_id(row) for row in body['data'])
+        cursor = body['next_cursor']
+        if cursor is None:
+            break
+    assert sorted(seen) == sorted(expected)
+    assert len(seen) == len(set(seen)) == first['total']
+
+
+@pytest.mark.parametrize('url', LIST_ROUTES)
+def test_cursor_total_on_request(user_client, many_rows, url):
+    body = user_client.get(url, params={'mode': 'cursor', 'limit': 2, 'include_total': True}).json()
+    assert body['total'] == user_client.get(url).json()['total']
+
+
+def test_other_lists_have_no_cursor_field(client, catalog):
+    body = client.get('/api/public/detection/categories').json()
+    assert 'next_cursor' not in body
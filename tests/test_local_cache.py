@@ -0,0 +1,128 @@
+# 进程内一级缓存与失效通知订阅测试
+
+import json
+import time
+
+import pytest
+from redis.exceptions import ConnectionError
+
+from app.utils import redis_utils
+from app.utils.redis_utils import (
+    CACHE_INVALIDATION_CHANNEL, LocalLRUCache, RedisUtils, get_process_id, local_cache
+)
+
+
+def wait_until(predicate, timeout=3.0):
+    """等待条件成立，超时返回False"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+@pytest.fixture
+def listener(redis_client):
+    """启动失效通知订阅线程，测试结束后停止"""
+    assert RedisUtils.start_invalidation_listener(redis_client)
+    yield redis_utils._invalidation_thread
+    RedisUtils.stop_invalidation_listener()
+
+
+def test_lru_evicts_least_recently_used_per_prefix():
+    cache = LocalLRUCache()
+    cache.configure('item', 2, 60)
+    cache.set('item:1', 'a')
+    cache.set('item:2', 'b')
+    cache.get('item:1')
+    cache.set('item:3', 'c')
+    assert cache.get('item:2') is None
+    assert cache.get('item:1') == 'a'
+    # 其他前缀不受影响
+    cache.set('object:1', 'x')
+    assert cache.stats() == {'item': 2, 'object': 1}
+
+
+def test_lru_respects_ttl_and_disabled_prefix(monkeypatch):
+    cache = LocalLRUCache()
+    cache.configure('image', 0, 60)
+    cache.set('image:1', 'a')
+    assert cache.get('image:1') is None
+
+    cache.configure('item', 10, 5)
+    now = time.monotonic()
+    monkeypatch.setattr(redis_utils.time, 'monotonic', lambda: now)
+    cache.set('item:1', 'a')
+    monkeypatch.setattr(redis_utils.time, 'monotonic', lambda: now + 6)
+    assert cache.get('item:1') is None
+
+
+def test_message_from_other_process_deletes_local_key():
+    local_cache.set('item:v2:1', 'cached')
+    RedisUtils._handle_invalidation_message(
+        {'data': json.dumps({'origin': 'other:worker', 'keys': ['item:v2:1']})}
+    )
+    assert local_cache.get('item:v2:1') is None
+
+
+def test_message_from_own_process_is_ignored():
+    local_cache.set('item:v2:1', 'cached')
+    RedisUtils._handle_invalidation_message(
+        {'data': json.dumps({'origin': get_process_id(), 'keys': ['item:v2:1']})}
+    )
+    assert local_cache.get('item:v2:1') == 'cached'
+
+
+def test_process_id_is_regenerated_after_fork(monkeypatch):
+    parent_id = get_process_id()
+    assert get_process_id() == parent_id
+    # 预加载后fork出的worker进程ID不同，生成自己的标识
+    monkeypatch.setattr(redis_utils.os, 'getpid', lambda: -1)
+    child_id = get_process_id()
+    assert child_id != parent_id
+    assert child_id.startswith('-1:')
+    assert get_process_id() == child_id
+
+
+def test_message_from_parent_process_is_handled_in_forked_worker(monkeypatch):
+    parent_id = get_process_id()
+    monkeypatch.setattr(redis_utils.os, 'getpid', lambda: -1)
+    local_cache.set('item:v2:1', 'cached')
+    RedisUtils._handle_invalidation_message(
+        {'data': json.dumps({'origin': parent_id, 'keys': ['item:v2:1']})}
+    )
+    assert local_cache.get('item:v2:1') is None
+
+
+def test_published_invalidation_reaches_listener(redis_client, listener):
+    assert RedisUtils.is_invalidation_listening()
+    local_cache.set('item:v2:1', 'cached')
+    redis_client.publish(
+        CACHE_INVALIDATION_CHANNEL, json.dumps({'origin': 'other:worker', 'keys': ['item:v2:1']})
+    )
+    assert wait_until(lambda: local_cache.get('item:v2:1') is None)
+
+
+def test_listener_error_clears_local_cache_and_disables_it(listener):
+    local_cache.set('item:v2:1', 'cached')
+    listener.exception_handler(ConnectionError('连接断开'), listener.pubsub, listener)
+    assert redis_utils._invalidation_thread is None
+    assert not RedisUtils.is_invalidation_listening()
+    assert local_cache.get('item:v2:1') is None
+    assert wait_until(lambda: not listener.is_alive())
+
+
+def test_dead_listener_thread_is_not_listening(listener):
+    listener.stop()
+    listener.join(timeout=3)
+    assert redis_utils._invalidation_thread is listener
+    assert not RedisUtils.is_invalidation_listening()
+
+
+def test_restart_after_listener_died(redis_client, listener):
+    listener.stop()
+    listener.join(timeout=3)
+    assert RedisUtils.start_invalidation_listener(redis_client)
+    assert redis_utils._invalidation_thread is not listener
+    assert RedisUtils.is_invalidation_listening()
@@ -0,0 +1,62 @@
+# 检测参数游标分页测试
+
+import pytest
+
+from app.dal.detection_dal import DetectionParamDAL
+from app.models.detection import DetectionParam
+
+
+@pytest.fixture
+def params(db, catalog):
+    """在catalog的参数之外再写入排序序号包含NULL和重复值的参数"""
+    for name, sort_order in [('安定性', None), ('凝结时间', 2), ('强度', None), ('比表面积', 1), ('烧失量', 2)]:
+        db.add(DetectionParam(item_id=catalog['item_id'], param_name=name, sort_order=sort_order))
+    db.flush()
+    # 列默认值为0，NULL需要显式更新
+    db.query(DetectionParam).filter(DetectionParam.param_name.in_(['安定性', '强度'])).update(
+        {'sort_order': None}, synchronize_session=False
+    )
+    db.commit()
+    rows = db.query(DetectionParam).all()
+    assert sum(p.sort_order is None for p in rows) == 2
+    # 期望顺序：sort_order升序（NULL在前），相同时按param_id升序
+    rows.sort(key=lambda p: (p.sort_order is not None, p.sort_order or 0, p.param_id))
+    return [p.param_id for p in rows]
+
+
+def walk(dal, limit, **kwargs):
+    """沿游标读取所有页面"""
+    ids, cursor, pages = [], None, 0
+    while True:
+        items, cursor, _ = dal.get_page_by_cursor(cursor=cursor, limit=limit, **kwargs)
+        ids.extend(p.param_id for p in items)
+        pages += 1
+        if cursor is None:
+            return ids, pages
+
+
+@pytest.mark.parametrize('limit', [1, 2, 4, 10])
+def test_cursor_walk_visits_every_row_once_in_order(db, redis_client, params, limit):
+    ids, pages = walk(DetectionParamDAL(db, redis_client), limit)
+    assert ids == params
+    assert pages == max(1, -(-len(params) // limit))
+
+
+def test_cursor_walk_with_condition_and_total(db, redis_client, params, catalog):
+    dal = DetectionParamDAL(db, redis_client)
+    items, cursor, total = dal.get_page_by_cursor(limit=2, condition={'item_id': catalog['item_id']}, with_total=True)
+    assert total == len(params)
+    assert [p.param_id for p in items] == params[:2]
+    assert DetectionParamDAL.decode_cursor(cursor) == (None, params[1])
+
+
+def test_cursor_round_trip():
+    assert DetectionParamDAL.decode_cursor(DetectionParamDAL.encode_cursor(None, 7)) == (None, 7)
+    assert DetectionParamDAL.decode_cursor(DetectionParamDAL.encode_cursor(3, 7)) == (3, 7)
+
+
+@pytest.mark.parametrize('cursor', ['not-a-cursor', 'WyJhIiwxXQ', 'WzEsbnVsbF0'])
+def test_invalid_cursor_is_rejected(cursor):
+    # 依次为：非base64、排序序号不是整数、参数ID为null
+    with pytest.raises(ValueError):
+        DetectionParamDAL.decode_cursor(cursor)
@@ -0,0 +1,32 @@
+# 公开批量接口测试
+
+BATCH = '/api/public/detection/items/templates:batch'
+
+
+def test_templates_batch_matches_single_item_route(client, catalog):
+    item_id = catalog['item_id']
+    response = client.post(BATCH, json={'item_ids': [item_id, 9999, item_id]})
+    assert response.status_code == 200
+    data = response.json()['data']
+    assert set(data) == {str(item_id), '9999'}
+    assert data['9999'] == []
+    single = client.get(f'/api/public/detection/items/{item_id}/templates').json()['data']
+    assert data[str(item_id)] == single
+
+
+def test_templates_batch_sets_validators(client, catalog):
+    item_id = catalog['item_id']
+    first = client.post(BATCH, json={'item_ids': [item_id, 9999]})
+    assert first.headers['cache-control'] == 'public, no-cache'
+    assert 'last-modified' not in first.headers
+    etag = first.headers['etag']
+    # ETag与检测项目ID的顺序和重复无关，与ID集合有关
+    assert client.post(BATCH, json={'item_ids': [9999, item_id, item_id]}).headers['etag'] == etag
+    assert client.post(BATCH, json={'item_ids': [item_id]}).headers['etag'] != etag
+    # POST请求不返回304
+    assert client.post(BATCH, json={'item_ids': [item_id, 9999]}, headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_templates_batch_validates_size(client):
+    assert client.post(BATCH, json={'item_ids': []}).status_code == 422
+    assert client.post(BATCH, json={'item_ids': list(range(101))}).status_code == 422
@@ -0,0 +1,68 @@
+# 渲染进程池测试
+
+import os
+
+import pytest
+
+from app.core import render_pool
+from app.core.render_pool import collect_pngs, pack_rows, shutdown_render_pool, start_render_pool, submit_pngs
+
+PARAMS = [
+    {'param_name': '细度', 'standards': '通用硅酸盐水泥\nGB 175-2007', 'is_regular_param': 1, 'sort_order': 1},
+    {'param_name': '凝结时间', 'standards': '', 'is_regular_param': 0, 'sort_order': 2},
+]
+DEVICE_TYPES = ('pc', 'phone')
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+@pytest.fixture
+def pool():
+    """启动两个进程的渲染进程池，测试结束后关闭"""
+    assert start_render_pool(DEVICE_TYPES, size=2)
+    yield render_pool._pool
+    shutdown_render_pool()
+
+
+def _render_in_process(device_type: str) -> bytes:
+    return render_pool._render_png(pack_rows(PARAMS), device_type)
+
+
+def test_pool_renders_in_child_processes(pool):
+    # 不从已启动线程的进程fork子进程
+    assert pool._mp_context.get_start_method() in ('forkserver', 'spawn')
+    pids = {pool.submit(os.getpid).result() for _ in range(4)}
+    assert os.getpid() not in pids
+
+    pngs = collect_pngs(submit_pngs(PARAMS, DEVICE_TYPES))
+    assert set(pngs) == set(DEVICE_TYPES)
+    for device_type, png in pngs.items():
+        assert png.startswith(PNG_SIGNATURE)
+        assert png == _render_in_process(device_type)
+
+
+def test_without_pool_renders_in_process(monkeypatch):
+    assert render_pool._pool is None
+    assert not start_render_pool(DEVICE_TYPES, size=0)
+    futures = submit_pngs(PARAMS, DEVICE_TYPES)
+    assert all(future.done() for future in futures.values())
+    assert collect_pngs(futures) == {device_type: _render_in_process(device_type) for device_type in DEVICE_TYPES}
+
+    def broken(packed, device_type):
+        raise RuntimeError(f'字体缺失: {device_type}')
+
+    monkeypatch.setattr(render_pool, '_render_png', broken)
+    with pytest.raises(RuntimeError, match='字体缺失'):
+        collect_pngs(submit_pngs(PARAMS, DEVICE_TYPES))
+
+
+def test_broken_pool_is_rebuilt(pool):
+    # 子进程异常退出后进程池不可再用
+    crashed = pool.submit(os._exit, 1)
+    with pytest.raises(Exception, match='渲染进程异常退出'):
+        collect_pngs({'pc': crashed})
+    assert render_pool._pool is None
+
+    # 下次渲染时按启动参数重建
+    pngs = collect_pngs(submit_pngs(PARAMS, DEVICE_TYPES))
+    assert render_pool._pool is not None and render_pool._pool is not pool
+    assert pngs['pc'] == _render_in_process('pc')
@@ -0,0 +1,179 @@
+# 图片渲染队列测试
+
+import pytest
+
+from app.services.image.render_queue_service import (
+    RenderQueueService, _CLAIM_SCRIPT, _COMPLETE_SCRIPT, _ENQUEUE_SCRIPT, _FAIL_SCRIPT, _REAP_SCRIPT
+)
+
+PENDING = RenderQueueService.PENDING_KEY
+RUNNING = RenderQueueService.RUNNING_KEY
+PREFIX = RenderQueueService.JOB_PREFIX
+T0 = 1700000000.0
+
+
+def enqueue(redis, item_id, now, debounce=2, max_delay=30, name='物理性能'):
+    return redis.eval(_ENQUEUE_SCRIPT, 2, PENDING, f"{PREFIX}{item_id}", item_id, name, now, debounce, max_delay)
+
+
+def claim(redis, now, lease=300, worker='w1'):
+    return redis.eval(_CLAIM_SCRIPT, 2, PENDING, RUNNING, now, lease, PREFIX, worker)
+
+
+def complete(redis, item_id, requested, now, ttl=60):
+    return redis.eval(_COMPLETE_SCRIPT, 2, RUNNING, f"{PREFIX}{item_id}", item_id, requested, now, ttl)
+
+
+def fail(redis, item_id, requested, now, retriable=True, max_attempts=3, base=5, max_delay=300, ttl=60):
+    return redis.eval(
+        _FAIL_SCRIPT, 3, RUNNING, PENDING, f"{PREFIX}{item_id}", item_id, requested, now, '渲染失败',
+        '1' if retriable else '0', max_attempts, base, max_delay, ttl
+    )
+
+
+def reap(redis, now, max_attempts=3, ttl=60):
+    return redis.eval(_REAP_SCRIPT, 2, RUNNING, PENDING, now, PREFIX, max_attempts, ttl)
+
+
+def test_enqueue_debounces_and_coalesces(redis_client):
+    assert enqueue(redis_client, 1, T0) == 1
+    assert redis_client.zscore(PENDING, '1') == T0 + 2
+    # 再次变更合并为同一任务并推迟执行时间
+    assert enqueue(redis_client, 1, T0 + 1) == 2
+    assert redis_client.zcard(PENDING) == 1
+    assert redis_client.zscore(PENDING, '1') == T0 + 3
+    job = redis_client.hgetall(f"{PREFIX}1")
+    assert job['status'] == 'pending'
+    assert float(job['first_enqueued_at']) == T0
+
+
+def test_enqueue_respects_max_delay(redis_client):
+    for offset in range(0, 40, 1):
+        enqueue(redis_client, 1, T0 + offset, debounce=2, max_delay=10)
+    assert redis_client.zscore(PENDING, '1') == T0 + 10
+
+
+def test_claim_only_due_jobs_and_skips_running_items(redis_client):
+    enqueue(redis_client, 1, T0)
+    assert claim(redis_client, T0 + 1) is None
+    assert claim(redis_client, T0 + 2) == ['1', '1', '物理性能', '1']
+    assert redis_client.zscore(RUNNING, '1') == T0 + 302
+    assert redis_client.hget(f"{PREFIX}1", 'status') == 'running'
+
+    # 执行期间再次变更：重新入队但不会被第二个worker同时领取
+    enqueue(redis_client, 1, T0 + 3, debounce=0)
+    assert claim(redis_client, T0 + 4, worker='w2') is None
+
+
+def test_complete_marks_done_unless_requested_again(redis_client):
+    enqueue(redis_client, 1, T0)
+    _, requested, _, _ = claim(redis_client, T0 + 2)
+    assert complete(redis_client, 1, requested, T0 + 3) == 'done'
+    assert redis_client.hget(f"{PREFIX}1", 'status') == 'done'
+    assert redis_client.ttl(f"{PREFIX}1") > 0
+    assert redis_client.zcard(RUNNING) == 0
+
+    enqueue(redis_client, 2, T0)
+    _, requested, _, _ = claim(redis_client, T0 + 2)
+    enqueue(redis_client, 2, T0 + 2.5)
+    assert complete(redis_client, 2, requested, T0 + 3) == 'pending'
+    # 渲染期间有新的变更，任务保持pending并等待下一次渲染
+    assert redis_client.hget(f"{PREFIX}2", 'status') == 'pending'
+    assert redis_client.zscore(PENDING, '2') == T0 + 4.5
+    assert redis_client.ttl(f"{PREFIX}2") == -1
+
+
+def test_complete_after_job_state_expired(redis_client):
+    enqueue(redis_client, 1, T0)
+    _, requested, _, _ = claim(redis_client, T0 + 2)
+    redis_client.delete(f"{PREFIX}1")
+    assert complete(redis_client, 1, requested, T0 + 3) == 'done'
+    # 不会重新创建没有过期时间的任务状态
+    assert not redis_client.exists(f"{PREFIX}1")
+    assert redis_client.zcard(RUNNING) == 0
+
+
+def test_fail_retries_with_backoff_then_gives_up(redis_client):
+    enqueue(redis_client, 1, T0)
+    now = T0 + 2
+    delays = []
+    for _ in range(2):
+        _, requested, _, attempts = claim(redis_client, now)
+        assert fail(redis_client, 1, requested, now) == 'retrying'
+        due = redis_client.zscore(PENDING, '1')
+        delays.append(due - now)
+        now = due
+    assert delays == [5, 10]
+    _, requested, _, attempts = claim(redis_client, now)
+    assert attempts == '3'
+    assert fail(redis_client, 1, requested, now) == 'failed'
+    assert redis_client.hget(f"{PREFIX}1", 'last_error') == '渲染失败'
+    assert redis_client.zcard(PENDING) == 0
+
+
+def test_fail_non_retriable_and_requested_during_run(redis_client):
+    enqueue(redis_client, 1, T0)
+    _, requested, _, _ = claim(redis_client, T0 + 2)
+    assert fail(redis_client, 1, requested, T0 + 3, retriable=False) == 'failed'
+
+    enqueue(redis_client, 2, T0)
+    _, requested, _, _ = claim(redis_client, T0 + 2)
+    enqueue(redis_client, 2, T0 + 2.5)
+    assert fail(redis_client, 2, requested, T0 + 3) == 'pending'
+    assert redis_client.hget(f"{PREFIX}2", 'status') == 'pending'
+
+
+def test_reap_requeues_expired_leases(redis_client):
+    enqueue(redis_client, 1, T0)
+    claim(redis_client, T0 + 2, lease=10)
+    assert reap(redis_client, T0 + 5) == 0
+    assert reap(redis_client, T0 + 13) == 1
+    assert redis_client.hget(f"{PREFIX}1", 'status') == 'retrying'
+    assert redis_client.zscore(PENDING, '1') == T0 + 13
+
+    # 达到最大尝试次数后标记为失败
+    redis_client.hset(f"{PREFIX}1", 'attempts', 2)
+    claim(redis_client, T0 + 13, lease=10)
+    assert reap(redis_client, T0 + 30) == 1
+    assert redis_client.hget(f"{PREFIX}1", 'status') == 'failed'
+    assert redis_client.zcard(PENDING) == 0
+
+
+@pytest.mark.parametrize('error, expected', [(None, 'done'), (RuntimeError('字体缺失'), 'retrying'),
+                                             (RuntimeError('没有启用的检测参数'), 'failed')])
+def test_run_once(redis_client, monkeypatch, error, expected):
+    rendered = []
+
+    def render(item_id, item_name=''):
+        rendered.append((item_id, item_name))
+        if error:
+            raise error
+
+    monkeypatch.setattr(RenderQueueService, 'render', staticmethod(render))
+    assert RenderQueueService.run_once(redis_client) is None
+    RenderQueueService.enqueue(redis_client, 1, '物理性能', delay=0)
+    assert RenderQueueService.run_once(redis_client, 'w1') == expected
+    assert rendered == [(1, '物理性能')]
+
+
+def test_render_job_endpoint(user_client, redis_client, catalog):
+    item_id = catalog['item_id']
+    body = user_client.post(f'/api/detection/items/{item_id}/render-job').json()
+    assert body['code'] == 202, body
+    assert body['data']['status'] == 'pending'
+    assert body['data']['item_name'] == '物理性能'
+    assert redis_client.zscore(PENDING, str(item_id)) is not None
+
+    body = user_client.get(f'/api/detection/items/{item_id}/render-job').json()
+    assert body['data']['status'] == 'pending'
+    assert user_client.post('/api/detection/items/9999/render-job').json()['code'] == 404
+
+
+def test_run_once_when_job_state_expires_during_render(redis_client, monkeypatch):
+    def render(item_id, item_name=''):
+        redis_client.delete(RenderQueueService._job_key(item_id))
+
+    monkeypatch.setattr(RenderQueueService, 'render', staticmethod(render))
+    RenderQueueService.enqueue(redis_client, 1, '物理性能', delay=0)
+    assert RenderQueueService.run_once(redis_client, 'w1') == 'done'
+    assert RenderQueueService.get_job(redis_client, 1) is None
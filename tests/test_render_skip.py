@@ -0,0 +1,125 @@
+# 检测参数图片内容指纹测试
+# 表格内容未变化时跳过渲染，相同表格复用其他检测项目已渲染的图片
+
+from concurrent.futures import Future
+
+import pytest
+
+from app.models.detection import DetectionItem, DetectionParam
+from app.models.image.data_image import DataImage
+from app.services.image import image_service as image_service_module
+from app.services.image.image_service import ImageService
+
+
+@pytest.fixture
+def rendered(monkeypatch, redis_client):
+    """
+    替换PNG渲染，不启动渲染进程
+    :return: 每次调用提交的设备类型列表
+    """
+    calls = []
+
+    def submit_pngs(params, device_types):
+        device_types = list(device_types)
+        calls.append(device_types)
+        futures = {}
+        for device_type in device_types:
+            future = Future()
+            future.set_result(f'png:{device_type}'.encode())
+            futures[device_type] = future
+        return futures
+
+    monkeypatch.setattr(image_service_module, 'submit_pngs', submit_pngs)
+    return calls
+
+
+def versions(db, data_unique_id):
+    db.expire_all()
+    images = db.query(DataImage).filter_by(data_unique_id=data_unique_id).all()
+    return {image.device_type: image.version for image in images}
+
+
+def test_fingerprint_is_stable_and_tracks_content(db, catalog):
+    from app.services.detection.detection_param_service import DetectionParamService
+
+    params, error = DetectionParamService.get_enabled_by_item_id(catalog['item_id'])
+    assert error is None
+    fingerprint = ImageService.render_fingerprint(ImageService.clean_detection_params(params))
+    assert fingerprint == ImageService.render_fingerprint(ImageService.clean_detection_params(params))
+
+    changed = [dict(param, price='60元') for param in params]
+    assert ImageService.render_fingerprint(ImageService.clean_detection_params(changed)) != fingerprint
+
+
+def test_fingerprint_includes_render_version(monkeypatch, db, catalog):
+    from app.services.detection.detection_param_service import DetectionParamService
+
+    params, _ = DetectionParamService.get_enabled_by_item_id(catalog['item_id'])
+    cleaned = ImageService.clean_detection_params(params)
+    fingerprint = ImageService.render_fingerprint(cleaned)
+    monkeypatch.setattr(ImageService, 'RENDER_VERSION', ImageService.RENDER_VERSION + 1)
+    assert ImageService.render_fingerprint(cleaned) != fingerprint
+
+
+def test_unchanged_table_is_skipped(db, catalog, rendered):
+    item_id = catalog['item_id']
+    data_unique_id = f'detection:{item_id}'
+
+    first = ImageService.generate_detection_image(item_id, '物理性能')
+    assert first['skipped'] is False
+    assert sorted(rendered[0]) == sorted(ImageService.DEVICE_CONFIG)
+    assert versions(db, data_unique_id) == {device_type: 1 for device_type in ImageService.DEVICE_CONFIG}
+
+    second = ImageService.generate_detection_image(item_id, '物理性能')
+    assert second['skipped'] is True
+    assert len(rendered) == 1
+    assert versions(db, data_unique_id) == {device_type: 1 for device_type in ImageService.DEVICE_CONFIG}
+
+
+def test_changed_table_is_rendered_again(db, catalog, rendered):
+    item_id = catalog['item_id']
+    data_unique_id = f'detection:{item_id}'
+    ImageService.generate_detection_image(item_id, '物理性能')
+
+    param = db.get(DetectionParam, catalog['param_id'])
+    param.price = '80元'
+    db.commit()
+
+    result = ImageService.generate_detection_image(item_id, '物理性能')
+    assert result['skipped'] is False
+    assert len(rendered) == 2
+    assert versions(db, data_unique_id) == {device_type: 2 for device_type in ImageService.DEVICE_CONFIG}
+
+
+def test_identical_table_reuses_other_item_images(db, catalog, rendered):
+    item_id = catalog['item_id']
+    ImageService.generate_detection_image(item_id, '物理性能')
+
+    # 另一个检测项目下的参数与第一个完全相同
+    source = db.get(DetectionParam, catalog['param_id'])
+    other_item = DetectionItem(item_name='化学性能', object_id=catalog['object_id'], status=1)
+    db.add(other_item)
+    db.flush()
+    copy = DetectionParam(
+        item_id=other_item.item_id, param_name=source.param_name, template_id=source.template_id,
+        price=source.price, sort_order=source.sort_order
+    )
+    copy.standards.extend(source.standards)
+    db.add(copy)
+    db.commit()
+
+    result = ImageService.generate_detection_image(other_item.item_id, '化学性能')
+    assert result['skipped'] is False
+    # 所有设备类型都复用已有图片，没有提交新的渲染任务
+    assert rendered[1] == []
+
+    db.expire_all()
+    original = {
+        image.device_type: image for image in db.query(DataImage).filter_by(data_unique_id=f'detection:{item_id}')
+    }
+    reused = db.query(DataImage).filter_by(data_unique_id=f'detection:{other_item.item_id}').all()
+    assert len(reused) == len(ImageService.DEVICE_CONFIG)
+    for image in reused:
+        assert image.png_data == original[image.device_type].png_data
+        assert image.svg_content == original[image.device_type].svg_content
+        assert image.content_hash == original[image.device_type].content_hash
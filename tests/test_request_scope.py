@@ -0,0 +1,201 @@
+# 请求级工作单元测试
+
+import pytest
+
+from app.extensions import begin_request_scope, end_request_scope, run_after_commit
+from app.models.detection import Category, DetectionParam
+
+
+def test_param_create_and_update_return_new_standards(user_client, catalog):
+    """服务在同一会话中先更新关联再重新加载，返回的必须是本次写入的规范"""
+    standard1, standard2 = catalog['standard_ids']
+    response = user_client.post('/api/detection/params', json={
+        'item_id': catalog['item_id'], 'param_name': '密度', 'standard_ids': [standard1]
+    })
+    body = response.json()
+    assert body['code'] == 201, body
+    assert body['data']['standard_ids'] == [standard1]
+    param_id = body['data']['param_id']
+
+    body = user_client.put(f'/api/detection/params/{param_id}', json={'standard_ids': [standard2]}).json()
+    assert body['code'] == 200, body
+    assert body['data']['standard_ids'] == [standard2]
+
+    body = user_client.get(f'/api/detection/params/{param_id}').json()
+    assert body['data']['standard_ids'] == [standard2]
+
+
+def test_deferred_commit_flushes_and_expires(session_factory, catalog):
+    scope, token = begin_request_scope()
+    try:
+        db = scope.get_db()
+        category = db.get(Category, catalog['category_id'])
+        category.category_name = '钢材'
+        db.commit()
+        assert scope.has_writes
+        assert not db.dirty
+        # 与真正提交一样，实例属性已过期，下次访问重新加载
+        assert 'category_name' not in category.__dict__
+        scope.commit()
+    finally:
+        scope.close()
+        end_request_scope(token)
+
+    other = session_factory()
+    assert other.get(Category, catalog['category_id']).category_name == '钢材'
+    other.close()
+
+
+def test_rollback_discards_writes_and_callbacks(session_factory, catalog):
+    calls = []
+    scope, token = begin_request_scope()
+    try:
+        db = scope.get_db()
+        db.get(Category, catalog['category_id']).category_name = '钢材'
+        db.commit()
+        scope.invalidate(keys=['category:v2:1'], tables=['category'])
+        run_after_commit(lambda: calls.append('after'))
+        scope.rollback()
+    finally:
+        scope.close()
+        end_request_scope(token)
+
+    assert calls == []
+    db = session_factory()
+    assert db.get(Category, catalog['category_id']).category_name == '建材'
+    db.close()
+
+
+def test_invalidation_and_callbacks_run_after_commit(redis_client, catalog):
+    calls = []
+    redis_client.set('category:v2:1', 'stale')
+    scope, token = begin_request_scope()
+    try:
+        db = scope.get_db()
+        db.get(Category, catalog['category_id']).category_name = '钢材'
+        db.commit()
+        scope.invalidate(keys=['category:v2:1'], tables=['category'])
+        run_after_commit(lambda: calls.append(redis_client.exists('category:v2:1')))
+        # 提交前不执行
+        assert calls == []
+        assert redis_client.exists('category:v2:1')
+        scope.commit()
+    finally:
+        scope.close()
+        end_request_scope(token)
+
+    assert calls == [0]
+    assert redis_client.get('gen:category') == '1'
+
+
+def test_run_after_commit_outside_request_runs_immediately():
+    calls = []
+    run_after_commit(lambda: calls.append(1))
+    assert calls == [1]
+
+
+@pytest.fixture
+def write_route(app):
+    """
+    注册测试路由：先写入分类名称，可选再写入检测对象名称后失败回滚，最后按参数返回状态码
+    """
+    from fastapi import HTTPException
+    from app.extensions import get_db_redis_direct
+    from app.models.detection import DetectionObject
+
+    def rename_category(category_id: int, name: str, fail: bool = False, code: int = 200,
+                        object_id: int = None, commit: bool = True):
+        db, _, close_db_func = get_db_redis_direct()
+        db.get(Category, category_id).category_name = name
+        if commit:
+            db.commit()
+        else:
+            db.flush()
+        if object_id is not None:
+            # 与DAL的写法一致：出错后rollback并按失败处理，但路由仍返回成功
+            try:
+                db.get(DetectionObject, object_id).object_name = name
+                db.flush()
+                raise ValueError("写入检测对象失败")
+            except ValueError:
+                db.rollback()
+        close_db_func()
+        if fail:
+            raise HTTPException(status_code=400, detail="写入后失败")
+        return {"code": code, "message": "", "data": None}
+
+    app.add_api_route('/test/rename-category/{category_id}', rename_category, methods=['POST'])
+    yield
+    app.router.routes.pop()
+
+
+def category_and_object_names(session_factory, catalog):
+    from app.models.detection import DetectionObject
+
+    db = session_factory()
+    try:
+        return (db.get(Category, catalog['category_id']).category_name,
+                db.get(DetectionObject, catalog['object_id']).object_name)
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize('fail, expected', [(False, '钢材'), (True, '建材')])
+def test_middleware_commits_success_and_rolls_back_failure(client, session_factory, catalog, write_route,
+                                                            fail, expected):
+    response = client.post(f"/test/rename-category/{catalog['category_id']}",
+                           params={'name': '钢材', 'fail': fail})
+    assert response.status_code == (400 if fail else 200)
+    db = session_factory()
+    assert db.get(Category, catalog['category_id']).category_name == expected
+    db.close()
+
+
+@pytest.mark.parametrize('code, expected', [(201, '钢材'), (400, '建材'), (500, '建材')])
+def test_middleware_rolls_back_on_envelope_error_code(client, session_factory, catalog, write_route,
+                                                      code, expected):
+    """路由以HTTP 200返回失败的业务状态码时同样回滚，响应体原样返回"""
+    response = client.post(f"/test/rename-category/{catalog['category_id']}",
+                           params={'name': '钢材', 'code': code})
+    assert response.status_code == 200
+    assert response.json() == {"code": code, "message": "", "data": None}
+    db = session_factory()
+    assert db.get(Category, catalog['category_id']).category_name == expected
+    db.close()
+
+
+def test_inner_rollback_keeps_earlier_commits(client, session_factory, catalog, write_route):
+    """请求中的rollback只撤销上一次commit之后的修改，之前commit的修改随请求一起提交"""
+    response = client.post(f"/test/rename-category/{catalog['category_id']}",
+                           params={'name': '钢材', 'object_id': catalog['object_id']})
+    assert response.json()['code'] == 200
+    assert category_and_object_names(session_factory, catalog) == ('钢材', '水泥')
+
+
+def test_inner_rollback_keeps_registered_invalidation(redis_client, session_factory, catalog):
+    redis_client.set('category:v2:1', 'stale')
+    scope, token = begin_request_scope()
+    try:
+        db = scope.get_db()
+        db.get(Category, catalog['category_id']).category_name = '钢材'
+        db.commit()
+        scope.invalidate(keys=['category:v2:1'], tables=['category'])
+        db.get(Category, catalog['category_id']).category_name = '铝材'
+        db.rollback()
+        assert not scope.failed
+        assert db.get(Category, catalog['category_id']).category_name == '钢材'
+        scope.commit()
+    finally:
+        scope.close()
+        end_request_scope(token)
+
+    assert not redis_client.exists('category:v2:1')
+    assert category_and_object_names(session_factory, catalog)[0] == '钢材'
+
+
+def test_request_without_commit_is_not_committed(client, session_factory, catalog, write_route):
+    """只flush没有commit的修改在请求结束时丢弃，与不共用会话时关闭会话的行为一致"""
+    response = client.post(f"/test/rename-category/{catalog['category_id']}",
+                           params={'name': '钢材', 'commit': False})
+    assert response.json()['code'] == 200
+    assert category_and_object_names(session_factory, catalog)[0] == '建材'
@@ -0,0 +1,57 @@
+# 检测项目n-gram倒排索引测试
+
+from app.services.detection.search_index import ItemSearchIndex, normalize_text, text_grams
+
+DOCUMENTS = [
+    (1, [('item_name', '物理性能'), ('object_name', '水泥'), ('param_name', '细度'),
+         ('standard_code', 'GB 175-2007'), ('standard_name', '通用硅酸盐水泥')]),
+    (2, [('item_name', '水泥胶砂强度'), ('object_name', '水泥'), ('param_name', '抗压强度')]),
+    (3, [('item_name', '颗粒级配'), ('object_name', '砂'), ('standard_code', 'JGJ 52-2006')]),
+    (4, [('item_name', '水泥'), ('object_name', '外加剂')]),
+]
+
+
+def test_normalize_text():
+    assert normalize_text('GB/T 175-2007') == 'gbt1752007'
+    assert normalize_text('ＧＢ　１７５') == 'gb175'
+    assert normalize_text(None) == ''
+    assert text_grams('水泥砂') == frozenset({'水', '泥', '砂', '水泥', '泥砂'})
+
+
+def test_search_ranks_by_field_weight():
+    index = ItemSearchIndex.build(DOCUMENTS)
+    # 检测项目名称完全匹配 > 项目名称前缀匹配 > 检测对象名称完全匹配
+    assert index.search('水泥') == [4, 2, 1]
+    assert index.search('强度') == [2]
+
+
+def test_search_matches_codes_and_single_characters():
+    index = ItemSearchIndex.build(DOCUMENTS)
+    assert index.search('gb175') == [1]
+    assert index.search('GB/T175') == []
+    assert index.search('jgj52') == [3]
+    # 项目名称包含 (100) 高于检测对象名称完全匹配 (60+20)
+    assert index.search('砂') == [2, 3]
+    assert index.search('') == []
+    assert index.search('不存在') == []
+
+
+def test_bigrams_must_appear_in_one_field():
+    """查询的两字组合分别出现在不同字段时，由子串校验排除"""
+    index = ItemSearchIndex.build(DOCUMENTS)
+    assert index.search('细度水泥') == []
+
+
+def test_rebuild_reuses_unchanged_documents():
+    previous = ItemSearchIndex.build(DOCUMENTS)
+    changed = DOCUMENTS[:3] + [(4, [('item_name', '减水率'), ('object_name', '外加剂')])]
+    index = ItemSearchIndex.build(changed, previous=previous)
+    assert index._doc_grams[0] is previous._doc_grams[0]
+    assert index.search('减水') == [4]
+    assert 4 not in index.search('水泥')
+
+
+def test_public_search_endpoint(client, catalog):
+    body = client.get('/api/public/detection/items/search', params={'keyword': 'gb 175'}).json()
+    assert [item['item_id'] for item in body['data']] == [catalog['item_id']]
+    assert body['total'] == 1
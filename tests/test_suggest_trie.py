@@ -0,0 +1,61 @@
+# 输入联想前缀补全索引测试
+
+from app.services.detection.search_index import SuggestTrie
+
+ENTRIES = [
+    ('水泥', 'object'),
+    ('水泥胶砂强度', 'item'),
+    ('水泥细度', 'param'),
+    ('水泥', 'param'),
+    ('GB/T 1346-2011', 'standard_code'),
+    ('GB 175-2007', 'standard_code'),
+    ('通用硅酸盐水泥', 'standard_name'),
+]
+
+
+def test_build_dedups_by_kind_weight():
+    trie = SuggestTrie.build(ENTRIES)
+    assert len(trie) == 6
+    # 同名的检测对象和检测参数只保留权重高的检测对象
+    assert {'text': '水泥', 'type': 'object'} in trie.complete('水泥')
+    assert {'text': '水泥', 'type': 'param'} not in trie.complete('水泥')
+
+
+def test_complete_orders_by_kind_then_length():
+    trie = SuggestTrie.build(ENTRIES)
+    assert [s['text'] for s in trie.complete('水泥')] == ['水泥胶砂强度', '水泥', '水泥细度']
+    assert [s['text'] for s in trie.complete('gb')] == ['GB 175-2007', 'GB/T 1346-2011']
+    assert [s['text'] for s in trie.complete('GB/T')] == ['GB/T 1346-2011']
+    assert trie.complete('钢') == []
+    assert trie.complete('') == []
+    assert trie.complete('水泥', limit=0) == []
+
+
+def test_popularity_overrides_static_rank():
+    trie = SuggestTrie.build(ENTRIES)
+    result = trie.complete('水泥', popularity={'水泥细度': 5})
+    assert result[0] == {'text': '水泥细度', 'type': 'param'}
+
+
+def test_long_ranges_use_static_top_and_popular_keys():
+    entries = [(f"参数{i:04d}", 'param') for i in range(1000)] + [('参数', 'item')]
+    trie = SuggestTrie.build(entries)
+    assert [s['text'] for s in trie.complete('参数', limit=3)] == ['参数', '参数0000', '参数0001']
+    # 热门词条不在静态前列中也能返回
+    popularity = {'参数0999': 3.0}
+    result = trie.complete('参数', limit=2, popularity=popularity, popular_keys=tuple(sorted(popularity)))
+    assert [s['text'] for s in result] == ['参数0999', '参数']
+    assert len(trie.complete('参数', limit=100)) == SuggestTrie.MAX_LIMIT
+
+
+def test_contains():
+    trie = SuggestTrie.build(ENTRIES)
+    assert trie.contains('gb 175-2007')
+    assert not trie.contains('水')
+    assert not trie.contains('')
+
+
+def test_suggest_endpoint(client, catalog):
+    body = client.get('/api/public/detection/suggest', params={'q': '水'}).json()
+    assert {'text': '水泥', 'type': 'object'} in body['data']
+    assert body['total'] == len(body['data'])
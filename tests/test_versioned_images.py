@@ -0,0 +1,79 @@
+# 带版本号的图片地址测试
+
+import pytest
+
+from app.dal.data_image_dal import DataImageDAL
+from app.models.image.data_image import DataImage
+from app.services.detection.catalog_snapshot_service import CatalogSnapshotService
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+@pytest.fixture
+def image(db):
+    """写入检测项目1的PC端图片，当前版本为2"""
+    db.add(DataImage(
+        data_unique_id='detection:1', device_type='pc', version=2,
+        svg_content='<svg xmlns="http://www.w3.org/2000/svg"></svg>', png_data=b'\x89PNG-v2'
+    ))
+    db.commit()
+    return '/api/image/detection:1/pc/v2.png'
+
+
+def test_unversioned_url_redirects_to_current_version(client, image):
+    response = client.get('/api/image/detection:1', params={'device_type': 'pc'}, follow_redirects=False)
+    assert response.status_code == 302
+    assert response.headers['location'] == image
+    assert response.headers['cache-control'] == 'public, no-cache'
+
+
+def test_versioned_url_is_immutable(client, image):
+    response = client.get(image)
+    assert response.status_code == 200
+    assert response.content == b'\x89PNG-v2'
+    assert response.headers['content-type'] == 'image/png'
+    assert response.headers['cache-control'] == IMMUTABLE
+
+    revalidated = client.get(image, headers={'If-None-Match': response.headers['etag']})
+    assert revalidated.status_code == 304
+    assert revalidated.headers['cache-control'] == IMMUTABLE
+
+
+def test_old_version_redirects_and_future_version_is_missing(client, image):
+    response = client.get('/api/image/detection:1/pc/v1.png', follow_redirects=False)
+    assert response.status_code == 302
+    assert response.headers['location'] == image
+    assert response.headers['cache-control'] == 'public, no-cache'
+    assert client.get('/api/image/detection:1/pc/v3.png').status_code == 404
+
+
+def test_batch_returns_versioned_urls(client, image):
+    body = client.post('/api/image:batch', json={'item_ids': [1, 2], 'device_type': 'pc'}).json()
+    assert body['data'] == {'1': image, '2': None}
+
+
+def test_snapshot_items_carry_versioned_urls(client, image, catalog):
+    body = client.get(f"/api/public/detection/objects/{catalog['object_id']}/items").json()
+    assert body['data'][0]['images'] == {'pc': image}
+
+
+def test_image_write_changes_etag_without_rebuilding_snapshot(client, session_factory, redis_client, catalog):
+    items_url = f"/api/public/detection/objects/{catalog['object_id']}/items"
+    before = client.get(items_url)
+    categories_etag = client.get('/api/public/detection/categories').headers['etag']
+    snapshot, _ = CatalogSnapshotService.get_snapshot()
+    assert before.json()['data'][0]['images'] == {}
+
+    db = session_factory()
+    DataImageDAL(db, redis_client).create({
+        'data_unique_id': f"detection:{catalog['item_id']}", 'device_type': 'pc', 'version': 1,
+        'svg_content': '<svg xmlns="http://www.w3.org/2000/svg"></svg>', 'png_data': b'\x89PNG-v1'
+    })
+    db.close()
+
+    after = client.get(items_url)
+    assert after.headers['etag'] != before.headers['etag']
+    assert after.json()['data'][0]['images'] == {'pc': f"/api/image/detection:{catalog['item_id']}/pc/v1.png"}
+    # 图片不属于目录快照，不带图片地址的接口ETag不变，快照不重建
+    assert client.get('/api/public/detection/categories').headers['etag'] == categories_etag
+    assert CatalogSnapshotService.get_snapshot()[0] is snapshot
@@ -0,0 +1,73 @@
+# 水印测试
+# PNG水印条按宽度缓存，合成结果与逐个绘制水印相同；SVG水印只输出一个平铺图案
+
+from PIL import Image, ImageChops, ImageDraw
+
+from app.utils.data_to_png_direct_converter import DataToPNGDirectConverter
+from app.utils.svg_generator import svg_generator
+
+
+def draw_each_tile(converter, width, height):
+    """按原来的方式逐个粘贴旋转后的水印，作为对照"""
+    image = Image.new('RGB', (width, height), color='white')
+    tile = converter._render_watermark_tile()
+    spacing = converter.watermark_spacing
+    for y in range(0, height + spacing, spacing):
+        for x in range(0, width + spacing, spacing):
+            image.paste(tile, (x - tile.width // 2, y - tile.height // 2), tile)
+    return image
+
+
+def draw_with_strip(converter, width, height):
+    image = Image.new('RGB', (width, height), color='white')
+    converter._add_watermark(ImageDraw.Draw(image), width, height, None)
+    return image
+
+
+def test_strip_matches_per_tile_drawing():
+    converter = DataToPNGDirectConverter()
+    # 高度分别为间距的整数倍和非整数倍
+    for width, height in [(1200, 900), (375, 1037), (768, 149)]:
+        expected = draw_each_tile(converter, width, height)
+        actual = draw_with_strip(converter, width, height)
+        # 确认确实绘制了水印，避免两张空白图片相等
+        assert ImageChops.difference(expected, Image.new('RGB', (width, height), 'white')).getbbox() is not None
+        assert ImageChops.difference(expected, actual).getbbox() is None, (width, height)
+
+
+def test_strip_is_cached_per_width(monkeypatch):
+    converter = DataToPNGDirectConverter()
+    calls = []
+    render_tile = converter._render_watermark_tile
+
+    def counting_render_tile():
+        calls.append(1)
+        return render_tile()
+
+    monkeypatch.setattr(converter, '_render_watermark_tile', counting_render_tile)
+
+    strip = converter._get_watermark_strip(1200)
+    assert strip.size == (1200, converter.watermark_spacing)
+    assert converter._get_watermark_strip(1200) is strip
+    assert len(calls) == 1
+
+    assert converter._get_watermark_strip(375) is not strip
+    assert len(calls) == 2
+
+
+def test_strip_cache_follows_watermark_config():
+    converter = DataToPNGDirectConverter()
+    strip = converter._get_watermark_strip(768)
+    converter.watermark_spacing = 200
+    changed = converter._get_watermark_strip(768)
+    assert changed is not strip
+    assert changed.size == (768, 200)
+
+
+def test_svg_watermark_is_single_pattern():
+    svg = '<svg xmlns="http://www.w3.org/2000/svg" width="1200" height="900"></svg>'
+    result = svg_generator.add_text_watermark_to_svg(svg)
+    assert result.count('<pattern id="text-watermark"') == 1
+    assert result.count('<text') == 1
+    assert 'fill="url(#text-watermark)"' in result
+    assert 'width="1200" height="900" fill="url(#text-watermark)"' in result